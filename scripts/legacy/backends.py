@@ -0,0 +1,225 @@
+"""
+Evaluation backends for FB Marketplace Scout
+
+Wraps each LLM call in retries with exponential backoff (for rate limits,
+timeouts and 5xx) and a circuit breaker per backend. When a backend's recent
+error rate spikes the breaker opens and calls are skipped outright for a
+cooldown, so the evaluator falls straight back to heuristics instead of
+waiting out timeouts. After the cooldown one probe call is let through; if it
+works the breaker closes again.
+
+A backend can also have a gate - the daily spend budget for paid ones (see
+usage.py) - that switches it off the same way an open breaker does.
+
+Listings scored by the heuristic fallback are queued for re-evaluation (see
+database.update_evaluation) and picked up again once a backend is available.
+"""
+import random
+import threading
+import time
+from collections import deque
+from metrics import counter, gauge
+
+# Attempts per call (the first try included) and the backoff between them
+RETRY_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 20.0
+
+# Breaker: look at the last BREAKER_WINDOW calls, open if at least
+# BREAKER_ERROR_RATE of them failed (once BREAKER_MIN_CALLS have been made)
+BREAKER_WINDOW = 20
+BREAKER_MIN_CALLS = 5
+BREAKER_ERROR_RATE = 0.5
+
+# Seconds an open breaker waits before letting a probe call through
+BREAKER_COOLDOWN = 60
+
+# HTTP statuses worth retrying (timeout, conflict, rate limit; 5xx are retried too)
+RETRY_STATUSES = {408, 409, 429}
+
+# Exception class names worth retrying, matched by name so the SDKs don't
+# have to be imported here
+TRANSIENT_ERRORS = {
+    'APIConnectionError', 'APITimeoutError', 'RateLimitError', 'InternalServerError',
+    'OverloadedError', 'ConnectionError', 'ConnectTimeout', 'ReadTimeout', 'Timeout',
+    'TimeoutError', 'ConnectionResetError',
+}
+
+BACKEND_CALLS = counter('scout_backend_calls_total', 'Evaluation backend calls, by backend and outcome')
+BACKEND_ERRORS = counter('scout_backend_errors_total', 'Failed backend attempts, by backend and error type')
+BREAKER_OPEN = gauge('scout_backend_breaker_open', '1 while a backend circuit breaker is open')
+
+
+class BackendUnavailable(Exception):
+    """The backend failed (after retries) or its breaker is open"""
+
+
+def is_transient(error):
+    """True for errors a retry might get past (rate limits, timeouts, 5xx)"""
+    status = getattr(error, 'status_code', None)
+    if status is not None:
+        return status in RETRY_STATUSES or status >= 500
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+def retry_delay(error, attempt):
+    """
+    Seconds to wait before the next attempt: the server's Retry-After if it
+    sent one, else exponential backoff with full jitter
+    """
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return min(RETRY_MAX_SECONDS, float(headers.get('retry-after')))
+    except (TypeError, ValueError):
+        return random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Tracks a backend's recent calls and decides whether to make the next one
+
+    closed: calls go through. open: calls are refused until the cooldown
+    passes. half-open: one probe call goes through, and its result closes or
+    re-opens the breaker.
+    """
+
+    def __init__(self, name, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS,
+                 error_rate=BREAKER_ERROR_RATE, cooldown=BREAKER_COOLDOWN, clock=time.monotonic):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self.clock = clock
+        self.results = deque(maxlen=window)  # True = success
+        self.state = 'closed'
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """
+        Whether to make a call now (in half-open, only the first caller gets through)
+
+        Returns:
+            bool
+        """
+        with self.lock:
+            if self.state == 'open' and self.clock() - self.opened_at >= self.cooldown:
+                self.state = 'half-open'
+                self.probing = False
+            if self.state == 'closed':
+                return True
+            if self.state == 'half-open' and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def available(self):
+        """Like allow(), without claiming the half-open probe"""
+        with self.lock:
+            return self.state == 'closed' or self.clock() - self.opened_at >= self.cooldown
+
+    def record(self, ok):
+        with self.lock:
+            if self.state == 'half-open':
+                if ok:
+                    self._close()
+                else:
+                    self._open()
+                return
+
+            self.results.append(ok)
+            failures = self.results.count(False)
+            if len(self.results) >= self.min_calls and failures >= self.error_rate * len(self.results):
+                self._open()
+
+    def _open(self):
+        if self.state != 'open':
+            print(f"🔌 {self.name} breaker open - skipping calls for {self.cooldown}s")
+        self.state = 'open'
+        self.opened_at = self.clock()
+        self.probing = False
+        BREAKER_OPEN.set(1, backend=self.name)
+
+    def _close(self):
+        print(f"🔌 {self.name} breaker closed - backend is answering again")
+        self.state = 'closed'
+        self.results.clear()
+        self.probing = False
+        BREAKER_OPEN.set(0, backend=self.name)
+
+
+class Backend:
+    """
+    An evaluation backend: a function that scores one listing, plus the
+    retries and breaker around it
+
+    Args:
+        name (str): label for metrics and messages
+        evaluate (callable): listing -> evaluation dict; raises on failure
+        gate (callable): returns False while the backend shouldn't be used
+            (e.g. over budget)
+    """
+
+    def __init__(self, name, evaluate, attempts=RETRY_ATTEMPTS, breaker=None, gate=None, sleep=time.sleep):
+        self.name = name
+        self._evaluate = evaluate
+        self.attempts = attempts
+        self.breaker = breaker or CircuitBreaker(name)
+        self.gate = gate
+        self.gated = False
+        self.sleep = sleep
+
+    def _gate_open(self):
+        if self.gate is None:
+            return True
+        allowed = self.gate()
+        if allowed == self.gated:  # changed since the last check
+            self.gated = not allowed
+            print(f"💸 {self.name} {'resumed' if allowed else 'paused - over its daily budget'}")
+        return allowed
+
+    def available(self):
+        return self._gate_open() and self.breaker.available()
+
+    def evaluate(self, listing):
+        """
+        Score a listing, retrying transient errors
+
+        Returns:
+            dict: the evaluation
+
+        Raises:
+            BackendUnavailable: gated, breaker open, or every attempt failed
+        """
+        if not self._gate_open():
+            BACKEND_CALLS.inc(backend=self.name, outcome='gated')
+            raise BackendUnavailable(f"{self.name} is over its budget")
+        if not self.breaker.allow():
+            BACKEND_CALLS.inc(backend=self.name, outcome='rejected')
+            raise BackendUnavailable(f"{self.name} breaker is open")
+
+        for attempt in range(self.attempts):
+            try:
+                result = self._evaluate(listing)
+            except Exception as e:
+                BACKEND_ERRORS.inc(backend=self.name, error=e.__class__.__name__)
+                if getattr(e, 'answered', False):
+                    # It answered, just not usefully (e.g. no valid JSON) - not an outage
+                    self.breaker.record(True)
+                    BACKEND_CALLS.inc(backend=self.name, outcome='bad_response')
+                    print(f"   ⚠️  {self.name} response unusable: {e}")
+                    raise BackendUnavailable(str(e)) from e
+                if attempt + 1 < self.attempts and is_transient(e):
+                    delay = retry_delay(e, attempt)
+                    print(f"   ⚠️  {self.name} error ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                    self.sleep(delay)
+                    continue
+                self.breaker.record(False)
+                BACKEND_CALLS.inc(backend=self.name, outcome='error')
+                print(f"   ⚠️  {self.name} error: {e}")
+                raise BackendUnavailable(str(e)) from e
+
+            self.breaker.record(True)
+            BACKEND_CALLS.inc(backend=self.name, outcome='ok')
+            return result
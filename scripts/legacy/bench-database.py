@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark the database ingest and lookup paths as the table grows
+
+Usage:
+    python3 bench-database.py                          # 10k and 100k rows
+    python3 bench-database.py --sizes 10000,100000,1000000 --json db-bench.json
+    python3 bench-database.py --only like_contains,exact_url
+
+Each size gets a synthetic scratch database (fixed seed, so runs are
+comparable). Every operation is timed on its own, then the watcher+evaluator
+write mix runs with both sides in threads against the same file. Each read
+query's plan is recorded too - "full_scan": true is the regression to look for.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+import database
+
+DEFAULT_SIZES = '10000,100000'
+
+# Per operation: stop after this many calls or this many seconds, whichever first
+MAX_ITERATIONS = 300
+TIME_BUDGET_SECONDS = 2.0
+
+TITLE_WORDS = ['vintage', 'tektronix', 'oscilloscope', 'enlarger', 'darkroom', 'lamp', 'chair',
+               'table', 'receiver', 'turntable', 'camera', 'lens', 'synth', 'amp', 'drill', 'bike']
+
+
+def item_url(item_id):
+    return f'https://www.facebook.com/marketplace/item/{item_id}/'
+
+
+def build_database(path, rows, seed):
+    """Synthesize a listings table of the given size (plus details for a third of it)"""
+    rng = random.Random(seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.DB_PATH = path
+        database.init_db()
+
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+
+    def listing_rows():
+        for i in range(rows):
+            evaluated = rng.random() < 0.9
+            yield (
+                item_url(1000000000 + i),
+                ' '.join(rng.choices(TITLE_WORDS, k=4)),
+                f'${rng.randint(0, 900)}',
+                f'Seller {rng.randint(0, rows // 5)}',
+                'Seymour, CT',
+                f'2026-{rng.randint(1, 9):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00:00',
+                evaluated,
+                rng.randint(1, 10) if evaluated else None,
+                rng.randint(1, 10) if evaluated else None,
+                # Half the listings have a thumbnail hash; ~2% share one with another listing
+                f'{rng.randint(0, rows // 50):016x}' if rng.random() < 0.02 else
+                (f'{rng.getrandbits(64):016x}' if rng.random() < 0.5 else None)
+            )
+
+    c.executemany('''
+        INSERT INTO listings (listing_url, title, price, seller_name, location, discovered_at,
+                              evaluated, flip_score, scam_likelihood, thumbnail_phash)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', listing_rows())
+
+    c.executemany('''
+        INSERT INTO listing_details (item_id, description, condition, photo_count)
+        VALUES (?, ?, 'Used - Good', ?)
+    ''', ((str(1000000000 + i), 'Works fine, pickup only.', rng.randint(1, 8))
+          for i in range(0, rows, 3)))
+
+    c.executemany('''
+        INSERT INTO listing_history (listing_id, changed_at, field, old_value, new_value, price_delta)
+        VALUES (?, datetime('now', ?), 'price', '$100', '$80', -20)
+    ''', ((rng.randint(1, rows), f'-{rng.randint(0, 72)} hours') for _ in range(rows // 100)))
+
+    conn.commit()
+    conn.close()
+
+
+def query_plan(path, sql, params):
+    """EXPLAIN QUERY PLAN details, and whether listings is scanned in full"""
+    conn = sqlite3.connect(path)
+    plan = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+    conn.close()
+    full_scan = any(step.startswith('SCAN') and 'listings' in step and 'USING' not in step for step in plan)
+    return {'plan': plan, 'full_scan': full_scan}
+
+
+def run_sql(path, sql, params):
+    conn = sqlite3.connect(path)
+    conn.execute(sql, params).fetchall()
+    conn.close()
+
+
+def time_operation(fn, args_for):
+    """
+    Call fn(*args_for(i)) repeatedly
+
+    Returns:
+        dict: iterations, ops/s and latency percentiles in ms
+    """
+    latencies = []
+    deadline = time.perf_counter() + TIME_BUDGET_SECONDS
+    i = 0
+    while i < MAX_ITERATIONS and (i < 3 or time.perf_counter() < deadline):
+        args = args_for(i)
+        started = time.perf_counter()
+        fn(*args)
+        latencies.append((time.perf_counter() - started) * 1000)
+        i += 1
+
+    latencies.sort()
+    return {
+        'iterations': len(latencies),
+        'ops_per_s': round(len(latencies) / (sum(latencies) / 1000), 1),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'p50_ms': round(latencies[len(latencies) // 2], 3),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3)
+    }
+
+
+def operations(path, rows, rng):
+    """
+    Operation name -> (callable, args for call i, SQL to explain or None)
+
+    The LIKE lookups are the ones the overlay/server code runs today; exact_url
+    is the normalized-URL lookup on the unique index, for comparison.
+    """
+    new_ids = iter(range(2000000000, 3000000000))
+
+    def existing_url():
+        return item_url(1000000000 + rng.randrange(rows))
+
+    def new_listing(_):
+        return ({
+            'listing_url': item_url(next(new_ids)),
+            'title': 'Benchmark listing', 'price': '$50',
+            'seller_name': 'Bench Seller', 'location': 'Seymour, CT'
+        },)
+
+    def repriced_listing(_):
+        return ({'listing_url': existing_url(), 'price': f'${rng.randint(1, 999)}'},)
+
+    contains_sql = 'SELECT evaluated, flip_score FROM listings WHERE listing_url LIKE ?'
+    exact_sql = 'SELECT evaluated, flip_score FROM listings WHERE listing_url = ?'
+
+    return {
+        'add_listing': (database.add_listing, new_listing, None),
+        'upsert_changed': (database.upsert_listing, repriced_listing, None),
+        'get_unevaluated_listings': (database.get_unevaluated_listings, lambda i: (10,), '''
+            SELECT id FROM listings WHERE evaluated = 0 ORDER BY discovered_at DESC LIMIT 10'''),
+        'like_contains': (
+            lambda url: run_sql(path, contains_sql, (f"%{database.extract_item_id(url)}%",)),
+            lambda i: (existing_url(),), contains_sql),
+        'like_prefix': (
+            lambda url: run_sql(path, contains_sql, (f"{url.split('?')[0]}%",)),
+            lambda i: (existing_url(),), contains_sql),
+        'exact_url': (
+            lambda url: run_sql(path, exact_sql, (database.normalize_listing_url(url),)),
+            lambda i: (existing_url(),), exact_sql),
+        'get_listing_stats': (database.get_listing_stats, lambda i: (),
+                              'SELECT COUNT(*) FROM listings WHERE scam_likelihood > 7'),
+        'find_duplicate_images': (database.find_duplicate_images, lambda i: (), '''
+            SELECT thumbnail_phash, COUNT(*) FROM listings WHERE thumbnail_phash IS NOT NULL
+            GROUP BY thumbnail_phash HAVING COUNT(*) > 1'''),
+        'get_recent_price_drops': (database.get_recent_price_drops, lambda i: (24, 50), None),
+    }
+
+
+def write_mix(path, rows, seconds, seed):
+    """
+    Watcher and evaluator writing at the same time, each in its own thread
+
+    The watcher upserts as fast as it can; the evaluator claims pending rows
+    and writes scores. Lock errors are counted, not raised.
+    """
+    stop = threading.Event()
+    results = {}
+
+    def watcher():
+        rng = random.Random(seed)
+        latencies, errors = [], 0
+        new_id = 3000000000
+        while not stop.is_set():
+            if rng.random() < 0.7:
+                new_id += 1
+                data = {'listing_url': item_url(new_id), 'title': 'Mix listing', 'price': '$20'}
+            else:
+                data = {'listing_url': item_url(1000000000 + rng.randrange(rows)),
+                        'price': f'${rng.randint(1, 999)}'}
+            started = time.perf_counter()
+            try:
+                database.upsert_listing(data)
+            except sqlite3.OperationalError:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+        results['watcher'] = (latencies, errors)
+
+    def evaluator():
+        latencies, errors = [], 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                for listing in database.get_unevaluated_listings(limit=5):
+                    database.update_evaluation(listing['id'], {
+                        'flip_score': 5, 'weirdness_score': 5, 'scam_likelihood': 2,
+                        'evaluation_data': 'bench', 'notes': 'bench'
+                    })
+            except sqlite3.OperationalError:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+        results['evaluator'] = (latencies, errors)
+
+    threads = [threading.Thread(target=watcher), threading.Thread(target=evaluator)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+
+    summary = {}
+    for side, (latencies, errors) in results.items():
+        latencies.sort()
+        summary[side] = {
+            'ops': len(latencies),
+            'ops_per_s': round(len(latencies) / seconds, 1),
+            'p50_ms': round(latencies[len(latencies) // 2], 3) if latencies else None,
+            'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3) if latencies else None,
+            'lock_errors': errors
+        }
+    return summary
+
+
+def bench_size(rows, args, scratch_dir):
+    path = os.path.join(scratch_dir, f'bench-{rows}.db')
+    started = time.perf_counter()
+    build_database(path, rows, args.seed)
+    build_seconds = time.perf_counter() - started
+    database.DB_PATH = path
+
+    rng = random.Random(args.seed)
+    ops = operations(path, rows, rng)
+    wanted = [name for name in ops if not args.only or name in args.only]
+
+    result = {
+        'rows': rows,
+        'build_seconds': round(build_seconds, 2),
+        'db_bytes': os.path.getsize(path),
+        'operations': {}
+    }
+    for name in wanted:
+        fn, args_for, sql = ops[name]
+        with contextlib.redirect_stdout(io.StringIO()):
+            timing = time_operation(fn, args_for)
+        if sql:
+            timing.update(query_plan(path, sql, ('x',) if '?' in sql else ()))
+        result['operations'][name] = timing
+        flag = '  ⚠️ full scan' if timing.get('full_scan') else ''
+        print(f"   {name:<26} p50 {timing['p50_ms']:>9.3f} ms | p99 {timing['p99_ms']:>9.3f} ms | "
+              f"{timing['ops_per_s']:>9.1f}/s{flag}")
+
+    if args.mix_seconds > 0 and not args.only:
+        mix = write_mix(path, rows, args.mix_seconds, args.seed)
+        result['write_mix'] = mix
+        for side, stats in mix.items():
+            print(f"   mix:{side:<22} p50 {stats['p50_ms'] or 0:>9.3f} ms | p99 {stats['p99_ms'] or 0:>9.3f} ms | "
+                  f"{stats['ops_per_s']:>9.1f}/s | {stats['lock_errors']} lock errors")
+
+    if not args.keep_db:
+        os.remove(path)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Database micro-benchmarks')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='comma-separated row counts')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--only', type=lambda s: set(s.split(',')), help='comma-separated operation names')
+    parser.add_argument('--mix-seconds', type=float, default=5, help='length of the write-mix run (0 to skip)')
+    parser.add_argument('--json', metavar='PATH', help='write results as JSON')
+    parser.add_argument('--keep-db', action='store_true', help="keep the scratch databases")
+    args = parser.parse_args()
+
+    scratch_dir = tempfile.mkdtemp(prefix='scout-db-bench-')
+    report = {
+        'sqlite_version': sqlite3.sqlite_version,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'sizes': []
+    }
+
+    print("🗄️  Database benchmark")
+    try:
+        for rows in [int(s) for s in args.sizes.split(',')]:
+            print(f"\n📊 {rows:,} rows")
+            report['sizes'].append(bench_size(rows, args, scratch_dir))
+    finally:
+        if not args.keep_db:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""
+Benchmark the evaluator's scoring quality and throughput on a labeled corpus
+
+Usage:
+    python3 bench-evaluator.py                        # 3000 synthetic listings, all modes
+    python3 bench-evaluator.py --size 10000 --json bench.json
+    python3 bench-evaluator.py --corpus labeled.jsonl --modes heuristic,cached
+    python3 bench-evaluator.py --save-corpus corpus.jsonl   # write the synthetic corpus out
+
+The corpus is ingested into a scratch database through the same path the
+watcher uses (listing, details, comparables, seller and near-duplicate index),
+so heuristic features are real. The live marketplace.db is never touched.
+
+Modes:
+    heuristic   evaluate_with_heuristics()
+    llm         evaluate_with_claude() against a stub client - one call per listing
+    batched     same stub answers, billed and timed as --batch-size listings per call
+    cached      llm, with repeat listings (same title/price/description) served from memory
+
+LLM latency is simulated (added to measured prompt-building time, not slept),
+so a full run takes seconds. Costs are estimates from the token counts.
+
+Corpus lines (JSONL): {"title", "price", "location", "seller_name", "description",
+"condition", "photo_count", "hours_ago", "labels": {"flip": bool, "scam": bool}}
+"""
+import argparse
+import atexit
+import contextlib
+import hashlib
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# Sonnet list prices, USD per million tokens
+PRICE_INPUT_PER_MTOK = 3.0
+PRICE_OUTPUT_PER_MTOK = 15.0
+
+# Simulated API latency: time to first token + per output token
+LLM_FIRST_TOKEN_MS = 650
+LLM_PER_TOKEN_MS = 12
+LLM_OUTPUT_TOKENS = 60
+
+# Scores at or above this count as a positive prediction
+POSITIVE_SCORE = 7
+
+ITEMS = [
+    # (name, typical price, bait for scammers)
+    ('Tektronix 465 oscilloscope', 250, False),
+    ('Beseler 23C darkroom enlarger', 150, False),
+    ('Fluke 87 multimeter', 120, False),
+    ('Technics SL-1200 turntable', 500, False),
+    ('Marantz 2230 receiver', 400, False),
+    ('Canon AE-1 film camera', 180, False),
+    ('HP 3478A bench multimeter', 150, False),
+    ('Nikon F3 camera body', 300, False),
+    ('Yamaha DX7 synthesizer', 450, False),
+    ('KitchenAid stand mixer', 200, False),
+    ('Craftsman rolling tool chest', 180, False),
+    ('Trek mountain bike', 250, False),
+    ('Solid oak dining table', 150, False),
+    ('Herman Miller office chair', 300, False),
+    ('iPhone 14 Pro 256GB', 700, True),
+    ('PS5 console with controller', 450, True),
+    ('MacBook Air M2', 850, True),
+    ('AirPods Pro 2nd gen', 180, True),
+    ('Xbox Series X', 400, True),
+]
+
+PREFIXES = ['', '', 'Vintage ', 'Used ', 'Nice ']
+SUFFIXES = ['', '', ' - works great', ' OBO', ' (like new)', ' for parts']
+TOWNS = ['Seymour, CT', 'New Haven, CT', 'Hamden, CT', 'Milford, CT', 'Shelton, CT',
+         'Derby, CT', 'Ansonia, CT', 'Orange, CT', 'Waterbury, CT', 'Naugatuck, CT']
+CONDITIONS = ['Used - Good', 'Used - Like New', 'Used - Fair', 'New']
+
+# Honest listings are written from scratch, so they're assembled from a few
+# sentences each rather than one template (which would read as a cross-post)
+NORMAL_SENTENCES = [
+    "Selling my {item}.", "Used it for a few years and it has been reliable.",
+    "Some light wear on the case, everything else works.", "Comes from a smoke free home.",
+    "Happy to demo it working before you buy.", "Price is firm.", "Original box and manual included.",
+    "Upgraded so this needs a new home.", "Minor scuffs shown in the photos.", "No holds, first come first served.",
+    "Bought it new around {year}.", "Message me with any questions.", "Can meet somewhere public in {town}.",
+    "Cash or Venmo at pickup.", "Pickup in {town} only.", "Serious buyers please.", "Recently cleaned and tested.",
+    "Spare parts and cables included.", "Paid {paid} new.", "It's been sitting in the basement since we moved.",
+]
+DEAL_SENTENCES = [
+    "Cleaning out my late father's garage and don't know much about this {item}.",
+    "It powered on last time I checked.", "Just want it gone this weekend.",
+    "Estate sale leftovers, there's a box of cables and manuals with it.", "Priced to move.",
+    "Everything must go by Sunday.", "Moving across the country and can't take it.",
+    "No time to list it properly.", "Cheap for a quick pickup in {town}.", "Bring help to load it.",
+]
+SCAM_DESCRIPTIONS = [
+    "Brand new {item} still sealed in the box. I only do shipping, no pickup. Payment by "
+    "Zelle or Cash App before shipping. Text me at my number for a quick deal.",
+    "{item} available now, never used, gift I do not need. Shipping only, pay first with "
+    "Zelle and I ship same day with tracking. Text me for faster reply.",
+    "Selling {item} brand new in box, price is low because I need money fast. I am out of "
+    "town so shipping only, deposit required by Cash App. Text me now.",
+]
+
+
+def mutate(text, rng):
+    """Small edits scammers make when cross-posting the same text"""
+    words = text.split()
+    for _ in range(rng.randint(0, 2)):
+        i = rng.randrange(len(words))
+        words[i] = rng.choice(['very', 'really', 'asap', 'today', words[i].upper()])
+    return ' '.join(words)
+
+
+def generate_corpus(size, seed=42):
+    """Deterministic synthetic corpus with known flip/scam labels"""
+    rng = random.Random(seed)
+    legit_sellers = [f"{rng.choice(['Mike', 'Sara', 'Dave', 'Ana', 'Tom', 'Lisa', 'Raj', 'Kim'])} "
+                     f"{rng.choice(['Smith', 'Lopez', 'Nguyen', 'Brown', 'Patel', 'Kowalski'])} {i}"
+                     for i in range(size // 4)]
+    scam_sellers = [f"Deals Outlet {i}" for i in range(8)]
+    legit_items = [item for item in ITEMS if not item[2]]
+
+    corpus = []
+    for i in range(size):
+        roll = rng.random()
+
+        if corpus and roll < 0.08:
+            # Exact repost of an earlier listing under a new URL
+            record = dict(rng.choice(corpus))
+            record['hours_ago'] = rng.uniform(0, 48)
+            corpus.append(record)
+            continue
+
+        town = rng.choice(TOWNS)
+        if roll < 0.26:
+            name, market, _ = rng.choice(ITEMS)
+            price = market * rng.uniform(0.05, 0.25)
+            description = mutate(rng.choice(SCAM_DESCRIPTIONS).format(item=name), rng)
+            record = {
+                'title': f"{name}{rng.choice(['', ' brand new', ' sealed', ' NEW'])}",
+                'price': price,
+                'location': town if rng.random() < 0.6 else '',
+                'seller_name': rng.choice(scam_sellers),
+                'description': description,
+                'condition': 'New',
+                'photo_count': rng.randint(0, 1),
+                'hours_ago': rng.uniform(0, 48),  # scam rings post in bursts
+                'labels': {'flip': False, 'scam': True}
+            }
+        else:
+            deal = roll < 0.44
+            name, market, _ = rng.choice(legit_items)
+            price = market * (rng.uniform(0.15, 0.45) if deal else rng.uniform(0.8, 1.3))
+            if rng.random() < 0.04:
+                price = 0  # free curb alerts
+            sentences = rng.sample(DEAL_SENTENCES, 3) if deal else []
+            sentences += rng.sample(NORMAL_SENTENCES, rng.randint(3, 5))
+            template = ' '.join(sentences)
+            record = {
+                'title': f"{rng.choice(PREFIXES)}{name}{rng.choice(SUFFIXES)}",
+                'price': price,
+                'location': town,
+                'seller_name': rng.choice(legit_sellers),
+                'description': template.format(item=name, town=town.split(',')[0],
+                                               year=rng.randint(2005, 2022), paid=f"${market * 2}"),
+                'condition': rng.choice(CONDITIONS),
+                'photo_count': rng.randint(2, 10),
+                'hours_ago': rng.uniform(0, 30 * 24),
+                'labels': {'flip': deal or price == 0, 'scam': False}
+            }
+
+        record['price'] = 'Free' if record['price'] == 0 else f"${record['price']:.0f}"
+        corpus.append(record)
+
+    return corpus
+
+
+def load_corpus(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def ingest_corpus(corpus):
+    """
+    Load the corpus into the scratch database through the watcher's ingest path
+
+    Returns:
+        (listings as get_unevaluated_listings() returns them, labels by listing id, seconds)
+    """
+    from database import init_db, upsert_listing, save_listing_details, get_unevaluated_listings
+    from comparables import observe_listing, price_against_comparables
+    from near_duplicates import index_listing
+    from sellers import observe_seller_listing
+
+    init_db()
+    labels = {}
+    now = time.time()
+    started = time.perf_counter()
+
+    # Oldest first, so seller velocity and comparables build up in order
+    order = sorted(range(len(corpus)), key=lambda i: -corpus[i].get('hours_ago', 0))
+    for n, i in enumerate(order):
+        record = corpus[i]
+        url = f"https://www.facebook.com/marketplace/item/{9000000000 + n}/"
+        result = upsert_listing({
+            'listing_url': url,
+            'title': record['title'],
+            'price': record['price'],
+            'seller_name': record.get('seller_name'),
+            'location': record.get('location')
+        })
+        save_listing_details(url, {
+            'description': record.get('description'),
+            'condition': record.get('condition'),
+            'photo_count': record.get('photo_count')
+        })
+        observe_listing(result['listing_id'], record['title'], record['price'])
+        comparables = price_against_comparables(record['title'], record['price'], result['listing_id'])
+        observe_seller_listing(record.get('seller_name'), comparables and comparables['price_ratio'],
+                               seen_at=now - record.get('hours_ago', 0) * 3600)
+        index_listing(result['listing_id'], record['title'], record.get('description'))
+        labels[result['listing_id']] = record['labels']
+
+    elapsed = time.perf_counter() - started
+    listings = get_unevaluated_listings(limit=len(corpus))
+    return listings, labels, elapsed
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class StubMessages:
+    """Stands in for client.messages - answers like a decent but imperfect model"""
+
+    def __init__(self, labels_by_item, seed):
+        self.labels_by_item = labels_by_item
+        self.rng = random.Random(seed)
+        self.last_prompt = None
+
+    def create(self, model, max_tokens, messages, system=(), **kwargs):
+        prompt = messages[-1]['content']
+        self.last_prompt = prompt + '\n' + ''.join(block['text'] for block in system)
+        item = prompt.split('Item: ', 1)[1].split('\n', 2)
+        labels = self.labels_by_item.get((item[0], item[1].replace('Price: ', '', 1)),
+                                         {'flip': False, 'scam': False})
+
+        def score(positive):
+            if self.rng.random() < 0.08:
+                positive = not positive  # the model gets ~8% wrong
+            return self.rng.randint(7, 10) if positive else self.rng.randint(1, 5)
+
+        answer = json.dumps({
+            'flip_score': score(labels['flip']),
+            'weirdness_score': self.rng.randint(1, 10),
+            'scam_likelihood': score(labels['scam']),
+            'notes': 'stub evaluation'
+        })
+        return _Response(answer, estimate_tokens(self.last_prompt), estimate_tokens(answer))
+
+
+class _Response:
+    def __init__(self, text, input_tokens, output_tokens):
+        self.content = [type('Block', (), {'text': text})()]
+        self.usage = type('Usage', (), {'input_tokens': input_tokens, 'output_tokens': output_tokens})()
+
+
+class StubClient:
+    def __init__(self, labels_by_item, seed=7):
+        self.messages = StubMessages(labels_by_item, seed)
+
+
+def llm_latency_ms(rng, output_tokens):
+    """Simulated API round trip - lognormal time to first token plus generation"""
+    return LLM_FIRST_TOKEN_MS * rng.lognormvariate(0, 0.35) + output_tokens * LLM_PER_TOKEN_MS
+
+
+def cache_key(listing):
+    details = listing.get('details') or {}
+    text = f"{listing['title']}|{listing['price']}|{details.get('description') or ''}"
+    return hashlib.sha1(' '.join(text.lower().split()).encode()).hexdigest()
+
+
+def run_mode(mode, listings, labels_by_item, batch_size, seed):
+    """
+    Evaluate every listing in one mode
+
+    Returns:
+        dict: results by listing id, per-listing latencies (ms), total seconds, cost (USD)
+    """
+    import evaluator
+
+    rng = random.Random(seed)
+    results = {}
+    latencies = []
+    cost = 0.0
+    total_ms = 0.0
+
+    if mode == 'heuristic':
+        for listing in listings:
+            started = time.perf_counter()
+            results[listing['id']] = evaluator.evaluate_with_heuristics(listing)
+            ms = (time.perf_counter() - started) * 1000
+            latencies.append(ms)
+            total_ms += ms
+        return {'results': results, 'latencies': latencies, 'seconds': total_ms / 1000, 'cost': 0.0}
+
+    client = StubClient(labels_by_item, seed)
+    evaluator.client = client
+    # Everything from here on in the prompt (the system prompt, which the stub
+    # appends after the listing) is the same for every listing - a batched
+    # request only pays for it once
+    shared_marker = evaluator.current_rubric().header
+    cache = {}
+    batch = []  # (listing id, compute ms, listing tokens) waiting for the batched call
+    shared_tokens = 0
+
+    def flush_batch():
+        nonlocal cost, total_ms
+        if not batch:
+            return
+        output_tokens = LLM_OUTPUT_TOKENS * len(batch)
+        call_ms = llm_latency_ms(rng, output_tokens)
+        cost_in = shared_tokens + sum(tokens for _, _, tokens in batch)
+        cost += (cost_in * PRICE_INPUT_PER_MTOK + output_tokens * PRICE_OUTPUT_PER_MTOK) / 1_000_000
+        compute_ms = sum(ms for _, ms, _ in batch)
+        total_ms += compute_ms + call_ms
+        for _, ms, _ in batch:
+            latencies.append(compute_ms + call_ms)  # everyone in the batch waits for the call
+        batch.clear()
+
+    for listing in listings:
+        if mode == 'cached':
+            key = cache_key(listing)
+            if key in cache:
+                started = time.perf_counter()
+                results[listing['id']] = cache[key]
+                ms = (time.perf_counter() - started) * 1000
+                latencies.append(ms)
+                total_ms += ms
+                continue
+
+        started = time.perf_counter()
+        result = evaluator.evaluate_with_claude(listing)
+        compute_ms = (time.perf_counter() - started) * 1000
+        results[listing['id']] = result
+
+        prompt = client.messages.last_prompt
+        prompt_tokens = estimate_tokens(prompt)
+
+        if mode == 'batched':
+            shared = prompt[prompt.index(shared_marker):] if shared_marker in prompt else ''
+            shared_tokens = estimate_tokens(shared)
+            batch.append((listing['id'], compute_ms, prompt_tokens - shared_tokens))
+            if len(batch) >= batch_size:
+                flush_batch()
+            continue
+
+        call_ms = llm_latency_ms(rng, LLM_OUTPUT_TOKENS)
+        cost += (prompt_tokens * PRICE_INPUT_PER_MTOK + LLM_OUTPUT_TOKENS * PRICE_OUTPUT_PER_MTOK) / 1_000_000
+        latencies.append(compute_ms + call_ms)
+        total_ms += compute_ms + call_ms
+        if mode == 'cached' and result:
+            cache[cache_key(listing)] = result
+
+    flush_batch()
+    return {'results': results, 'latencies': latencies, 'seconds': total_ms / 1000, 'cost': cost}
+
+
+def classification(results, labels, score_field, label_field):
+    """Precision / recall / F1 of score >= POSITIVE_SCORE against a label"""
+    tp = fp = fn = 0
+    for listing_id, result in results.items():
+        if not result:
+            continue
+        predicted = result[score_field] >= POSITIVE_SCORE
+        actual = labels[listing_id][label_field]
+        tp += predicted and actual
+        fp += predicted and not actual
+        fn += actual and not predicted
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {'precision': round(precision, 3), 'recall': round(recall, 3), 'f1': round(f1, 3)}
+
+
+def agreement(results, baseline):
+    """Share of listings where two modes make the same scam call"""
+    both = [i for i in results if results[i] and baseline.get(i)]
+    if not both:
+        return None
+    same = sum(
+        (results[i]['scam_likelihood'] >= POSITIVE_SCORE) == (baseline[i]['scam_likelihood'] >= POSITIVE_SCORE)
+        for i in both
+    )
+    return round(same / len(both), 3)
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(mode, run, labels, baseline):
+    n = len(run['results'])
+    return {
+        'mode': mode,
+        'listings': n,
+        'throughput_per_s': round(n / run['seconds'], 1) if run['seconds'] else None,
+        'p50_ms': round(percentile(run['latencies'], 0.50), 2),
+        'p99_ms': round(percentile(run['latencies'], 0.99), 2),
+        'mean_ms': round(statistics.fmean(run['latencies']), 2) if run['latencies'] else 0.0,
+        'cost_usd': round(run['cost'], 4),
+        'cost_per_1k_usd': round(run['cost'] / n * 1000, 4) if n else 0.0,
+        'scam': classification(run['results'], labels, 'scam_likelihood', 'scam'),
+        'flip': classification(run['results'], labels, 'flip_score', 'flip'),
+        'scam_agreement_with_heuristic': agreement(run['results'], baseline) if baseline else None
+    }
+
+
+def print_report(ingest, summaries):
+    print(f"\n📥 Ingested {ingest['listings']} listings in {ingest['seconds']:.1f}s "
+          f"({ingest['per_listing_ms']:.2f} ms/listing)\n")
+    print(f"{'mode':<10} {'thru/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'$/1k':>8} "
+          f"{'scam P/R/F1':>17} {'flip P/R/F1':>17} {'agree':>6}")
+    print('-' * 92)
+    for s in summaries:
+        scam = s['scam']
+        flip = s['flip']
+        agree = s['scam_agreement_with_heuristic']
+        print(f"{s['mode']:<10} {s['throughput_per_s'] or 0:>9.1f} {s['p50_ms']:>9.2f} {s['p99_ms']:>9.2f} "
+              f"{s['cost_per_1k_usd']:>8.3f} "
+              f"{scam['precision']:>5.2f}/{scam['recall']:.2f}/{scam['f1']:.2f} "
+              f"{flip['precision']:>5.2f}/{flip['recall']:.2f}/{flip['f1']:.2f} "
+              f"{'-' if agree is None else f'{agree:.2f}':>6}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluator quality/throughput benchmark')
+    parser.add_argument('--corpus', help='labeled JSONL corpus (default: synthetic)')
+    parser.add_argument('--size', type=int, default=3000, help='synthetic corpus size')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--modes', default='heuristic,llm,batched,cached',
+                        help='comma-separated: heuristic,llm,batched,cached')
+    parser.add_argument('--batch-size', type=int, default=10, help='listings per call in batched mode')
+    parser.add_argument('--json', metavar='PATH', help='also write results as JSON')
+    parser.add_argument('--save-corpus', metavar='PATH', help='write the synthetic corpus and exit')
+    parser.add_argument('--keep-db', action='store_true', help="don't delete the scratch database")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else generate_corpus(args.size, args.seed)
+    if args.save_corpus:
+        with open(args.save_corpus, 'w') as f:
+            for record in corpus:
+                f.write(json.dumps(record) + '\n')
+        print(f"✅ Wrote {len(corpus)} listings to {args.save_corpus}")
+        return
+
+    # Point every module at a scratch database before any of them import DB_PATH
+    scratch_dir = tempfile.mkdtemp(prefix='scout-bench-')
+    if not args.keep_db:
+        atexit.register(shutil.rmtree, scratch_dir, ignore_errors=True)
+    os.environ['SCOUT_DB_PATH'] = os.path.join(scratch_dir, 'bench.db')
+    os.environ.pop('ANTHROPIC_API_KEY', None)
+
+    print(f"🧪 Evaluator benchmark - {len(corpus)} listings, scratch DB in {scratch_dir}")
+    with contextlib.redirect_stdout(io.StringIO()):
+        import evaluator  # quietly, so run_mode reuses the loaded module
+        listings, labels, ingest_seconds = ingest_corpus(corpus)
+    labels_by_item = {(l['title'], l['price']): labels[l['id']] for l in listings}
+
+    ingest = {
+        'listings': len(listings),
+        'seconds': round(ingest_seconds, 3),
+        'per_listing_ms': round(ingest_seconds / max(1, len(listings)) * 1000, 3)
+    }
+
+    summaries = []
+    baseline = None
+    for mode in [m.strip() for m in args.modes.split(',') if m.strip()]:
+        if mode not in ('heuristic', 'llm', 'batched', 'cached'):
+            print(f"❌ Unknown mode: {mode}")
+            sys.exit(1)
+        run = run_mode(mode, listings, labels_by_item, args.batch_size, args.seed)
+        if mode == 'heuristic':
+            baseline = run['results']
+        summaries.append(summarize(mode, run, labels, baseline if mode != 'heuristic' else None))
+
+    print_report(ingest, summaries)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'corpus': args.corpus or f'synthetic:{args.size}:{args.seed}',
+                'ingest': ingest,
+                'modes': summaries,
+                'llm_model': {
+                    'first_token_ms': LLM_FIRST_TOKEN_MS,
+                    'per_token_ms': LLM_PER_TOKEN_MS,
+                    'price_input_per_mtok': PRICE_INPUT_PER_MTOK,
+                    'price_output_per_mtok': PRICE_OUTPUT_PER_MTOK
+                }
+            }, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
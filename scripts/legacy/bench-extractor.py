@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark the description extractors against saved listing pages
+
+Usage:
+    python3 bench-extractor.py                  # run against fixtures/listing-pages/*.html
+    python3 bench-extractor.py --inflate 2000   # append 2000 extra feed cards to each page
+    python3 bench-extractor.py --capture URL    # save a live listing page as a new fixture
+
+Fixtures carry the expected description in a
+<meta name="scout-expected-description"> tag so accuracy is checked alongside speed.
+Captured pages contain real seller data - anonymize them before committing.
+"""
+import argparse
+import asyncio
+import glob
+import os
+import statistics
+from playwright.async_api import async_playwright
+from extractors import DESCRIPTION_EXTRACT_JS, LEGACY_DESCRIPTION_EXTRACT_JS
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'listing-pages')
+USER_DATA_DIR = os.path.expanduser('~/.fb-marketplace-scout-profile')
+
+EXTRACTORS = {
+    'treewalker': DESCRIPTION_EXTRACT_JS,
+    'legacy': LEGACY_DESCRIPTION_EXTRACT_JS
+}
+
+# Appends N feed cards nested like FB's markup, to see how extractors scale
+INFLATE_JS = '''
+    (count) => {
+        const main = document.querySelector('div[role="main"]') || document.body;
+        const grid = document.createElement('div');
+        for (let i = 0; i < count; i++) {
+            let card = document.createElement('div');
+            card.innerHTML = `<a href="/marketplace/item/${8000000000 + i}/"><img src="data:,"></a>` +
+                `<span dir="auto">$${i % 500}</span><span dir="auto">Filler listing ${i} - lightly used</span>`;
+            for (let d = 0; d < 8; d++) {
+                const wrapper = document.createElement('div');
+                wrapper.appendChild(card);
+                card = wrapper;
+            }
+            grid.appendChild(card);
+        }
+        main.appendChild(grid);
+    }
+'''
+
+
+def timed(extractor_js):
+    """Wrap an extractor so it reports its own in-page run time"""
+    return f'''
+        () => {{
+            const started = performance.now();
+            const result = ({extractor_js.strip()})();
+            return [result, performance.now() - started];
+        }}
+    '''
+
+
+async def bench(runs, inflate):
+    fixtures = sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html')))
+    if not fixtures:
+        print(f"❌ No fixtures found in {FIXTURES_DIR}")
+        return
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+
+        print(f"📊 Extractor benchmark - {runs} runs per page"
+              + (f", +{inflate} inflated cards" if inflate else ""))
+        print("=" * 78)
+        print(f"{'fixture':<34} {'extractor':<11} {'median ms':>10} {'max ms':>8}  result")
+        print("-" * 78)
+
+        for path in fixtures:
+            with open(path) as f:
+                html = f.read()
+
+            for name, js in EXTRACTORS.items():
+                await page.set_content(html)
+                if inflate:
+                    await page.evaluate(INFLATE_JS, inflate)
+
+                expected = await page.evaluate('''
+                    () => document.querySelector('meta[name="scout-expected-description"]')?.content || null
+                ''')
+
+                timings = []
+                result = None
+                for _ in range(runs):
+                    result, elapsed = await page.evaluate(timed(js))
+                    timings.append(elapsed)
+
+                if expected is None:
+                    verdict = '(no expectation)'
+                elif result and ' '.join(result.split()) == ' '.join(expected.split()):
+                    verdict = '✅ match'
+                else:
+                    verdict = f"❌ got {(result or '')[:30]!r}"
+
+                print(f"{os.path.basename(path):<34} {name:<11} "
+                      f"{statistics.median(timings):>10.2f} {max(timings):>8.2f}  {verdict}")
+
+        await browser.close()
+
+
+async def capture(url):
+    """Save a live listing page (rendered DOM) into the fixtures directory"""
+    async with async_playwright() as p:
+        context = await p.chromium.launch_persistent_context(USER_DATA_DIR, headless=False)
+        page = context.pages[0] if context.pages else await context.new_page()
+        await page.goto(url, wait_until='networkidle')
+        await asyncio.sleep(3)
+
+        html = await page.content()
+        item_id = url.split('/marketplace/item/')[-1].split('/')[0] or 'page'
+        path = os.path.join(FIXTURES_DIR, f'captured-{item_id}.html')
+        os.makedirs(FIXTURES_DIR, exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(html)
+
+        await context.close()
+        print(f"✅ Saved {path}")
+        print("   Anonymize seller details and add a scout-expected-description meta tag before committing")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark listing description extractors')
+    parser.add_argument('--runs', type=int, default=20, help='runs per fixture/extractor')
+    parser.add_argument('--inflate', type=int, default=0, help='extra feed cards to append')
+    parser.add_argument('--capture', metavar='URL', help='save a live listing page as a fixture')
+    args = parser.parse_args()
+
+    if args.capture:
+        asyncio.run(capture(args.capture))
+    else:
+        asyncio.run(bench(args.runs, args.inflate))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Market-comparable price index for FB Marketplace Scout
+Groups listings into item clusters by title (MinHash/LSH) and keeps a streaming
+price digest per cluster, so a new listing can be priced against what similar
+items are listed for without scanning the listings table
+
+Usage:
+    python3 comparables.py --rebuild             # index every listing already in the DB
+    python3 comparables.py --lookup "Tektronix 465 oscilloscope"
+"""
+import argparse
+import json
+import sqlite3
+from bisect import bisect_left
+from collections import Counter
+from database import DB_PATH, init_db, parse_price
+from minhash import MinHasher, tokenize
+
+# Words that describe condition/packaging rather than the item - ignored for clustering
+CLUSTER_STOPWORDS = {
+    'vintage', 'used', 'new', 'brand', 'working', 'works', 'great', 'good', 'excellent',
+    'condition', 'parts', 'repair', 'broken', 'rare', 'nice', 'like', 'mint', 'lot',
+    'set', 'complete', 'free', 'cheap', 'old', 'antique'
+}
+
+# 16 bands of 2 rows: items sharing roughly 25%+ of title words become candidates,
+# and a candidate joins the cluster only at MATCH_THRESHOLD estimated similarity
+HASHER = MinHasher(num_perm=32, bands=16, seed=1)
+MATCH_THRESHOLD = 0.45
+
+# Comparables are only trusted once a cluster has this many priced listings
+MIN_COMPARABLES = 5
+
+
+class PriceDigest:
+    """
+    Small merging t-digest for streaming price quantiles
+
+    Keeps at most ~2x compression centroids no matter how many prices are added;
+    accuracy is best in the tails, which is where "cheap for what it is" lives.
+    """
+
+    def __init__(self, compression=40, centroids=None, count=0):
+        self.compression = compression
+        self.centroids = centroids or []  # sorted [mean, weight] pairs
+        self.count = count
+
+    def add(self, value, weight=1):
+        means = [c[0] for c in self.centroids]
+        self.centroids.insert(bisect_left(means, value), [value, weight])
+        self.count += weight
+        if len(self.centroids) > 2 * self.compression:
+            self.compress()
+
+    def remove(self, value, weight=1):
+        """
+        Take a value back out (exact while the digest is small enough to keep
+        one centroid per price; otherwise from the nearest centroid)
+        """
+        if not self.centroids:
+            return
+        nearest = min(self.centroids, key=lambda c: abs(c[0] - value))
+        if nearest[1] <= weight:
+            self.centroids.remove(nearest)
+        else:
+            nearest[0] = (nearest[0] * nearest[1] - value * weight) / (nearest[1] - weight)
+            nearest[1] -= weight
+        self.count = max(0, self.count - weight)
+
+    def compress(self):
+        merged = []
+        before = 0  # total weight left of the centroid being grown
+        for mean, weight in self.centroids:
+            if merged:
+                last = merged[-1]
+                q = (before + (last[1] + weight) / 2) / self.count
+                limit = max(1, 4 * self.count * q * (1 - q) / self.compression)
+                if last[1] + weight <= limit:
+                    total = last[1] + weight
+                    last[0] = (last[0] * last[1] + mean * weight) / total
+                    last[1] = total
+                    continue
+                before += last[1]
+            merged.append([mean, weight])
+        self.centroids = merged
+
+    def quantile(self, q):
+        if not self.centroids:
+            return None
+        if len(self.centroids) == 1:
+            return self.centroids[0][0]
+
+        target = q * self.count
+        cumulative = 0
+        for i, (mean, weight) in enumerate(self.centroids):
+            midpoint = cumulative + weight / 2
+            if target <= midpoint:
+                if i == 0:
+                    return mean
+                prev_mean, prev_weight = self.centroids[i - 1]
+                prev_mid = cumulative - prev_weight / 2
+                span = midpoint - prev_mid
+                return prev_mean + (mean - prev_mean) * (target - prev_mid) / span if span else mean
+            cumulative += weight
+        return self.centroids[-1][0]
+
+    def to_json(self):
+        return json.dumps({'c': [[round(m, 2), w] for m, w in self.centroids], 'n': self.count})
+
+    @classmethod
+    def from_json(cls, text):
+        if not text:
+            return cls()
+        data = json.loads(text)
+        return cls(centroids=data['c'], count=data['n'])
+
+
+def find_cluster(c, signature):
+    """
+    Look up the cluster for a signature - one indexed probe per band
+
+    Returns:
+        (cluster_id, similarity) or (None, 0.0)
+    """
+    keys = HASHER.band_keys(signature)
+    candidates = Counter()
+    for band, bucket in keys:
+        c.execute('SELECT cluster_id FROM cluster_lsh WHERE band = ? AND bucket = ?', (band, bucket))
+        row = c.fetchone()
+        if row:
+            candidates[row[0]] += 1
+
+    # Most band hits first - usually the first candidate is the answer
+    for cluster_id, _ in candidates.most_common(3):
+        c.execute('SELECT signature FROM item_clusters WHERE id = ?', (cluster_id,))
+        row = c.fetchone()
+        if row:
+            similarity = HASHER.similarity(signature, MinHasher.from_blob(row[0]))
+            if similarity >= MATCH_THRESHOLD:
+                return cluster_id, similarity
+    return None, 0.0
+
+
+def observe_listing(listing_id, title, price, conn=None):
+    """
+    Add a listing to its cluster (creating one if needed) and fold its price
+    in - or, for a listing already counted whose price changed, swap the old
+    price for the new one
+
+    Returns:
+        int: cluster_id, or None if the title has no usable words
+    """
+    own_conn = conn is None
+    conn = conn or sqlite3.connect(DB_PATH)
+    try:
+        c = conn.cursor()
+        price_num = parse_price(price) or None  # free/unpriced listings would drag the distribution to zero
+
+        c.execute('SELECT cluster_id, price FROM listing_clusters WHERE listing_id = ?', (listing_id,))
+        row = c.fetchone()
+        if row:
+            cluster_id, old_price = row
+            if price_num != old_price:
+                c.execute('SELECT price_digest FROM item_clusters WHERE id = ?', (cluster_id,))
+                digest = PriceDigest.from_json(c.fetchone()[0])
+                if old_price:
+                    digest.remove(old_price)
+                if price_num:
+                    digest.add(price_num)
+                c.execute('UPDATE item_clusters SET price_digest = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                          (digest.to_json(), cluster_id))
+                c.execute('UPDATE listing_clusters SET price = ? WHERE listing_id = ?', (price_num, listing_id))
+                conn.commit()
+            return cluster_id
+
+        tokens = tokenize(title, CLUSTER_STOPWORDS)
+        if not tokens:
+            return None
+        signature = HASHER.signature(set(tokens))
+
+        cluster_id, _ = find_cluster(c, signature)
+        if cluster_id is None:
+            c.execute('INSERT INTO item_clusters (label, signature) VALUES (?, ?)',
+                      (' '.join(tokens[:6]), MinHasher.to_blob(signature)))
+            cluster_id = c.lastrowid
+            c.executemany('INSERT OR IGNORE INTO cluster_lsh (band, bucket, cluster_id) VALUES (?, ?, ?)',
+                          [(band, bucket, cluster_id) for band, bucket in HASHER.band_keys(signature)])
+
+        c.execute('SELECT price_digest FROM item_clusters WHERE id = ?', (cluster_id,))
+        digest = PriceDigest.from_json(c.fetchone()[0])
+        if price_num:
+            digest.add(price_num)
+
+        c.execute('''
+            UPDATE item_clusters
+            SET listing_count = listing_count + 1, price_digest = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (digest.to_json(), cluster_id))
+        c.execute('INSERT INTO listing_clusters (listing_id, cluster_id, price) VALUES (?, ?, ?)',
+                  (listing_id, cluster_id, price_num))
+        conn.commit()
+        return cluster_id
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def price_against_comparables(title, price, listing_id=None):
+    """
+    Compare a listing's price with its cluster
+
+    Args:
+        listing_id (int): the listing being priced, if it's in the index -
+            its own price is left out of the comparison
+
+    Returns:
+        dict or None if there aren't enough comparables: {
+            'cluster_id': int,
+            'label': str,
+            'count': int (priced comparables),
+            'p25', 'median', 'p75': float,
+            'price_ratio': float (price / median, None if unpriced)
+        }
+    """
+    tokens = tokenize(title, CLUSTER_STOPWORDS)
+    if not tokens:
+        return None
+
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        c = conn.cursor()
+        own_price = None
+        c.execute('SELECT cluster_id, price FROM listing_clusters WHERE listing_id = ?', (listing_id,))
+        row = c.fetchone()
+        if row:
+            cluster_id, own_price = row
+        else:
+            cluster_id, _ = find_cluster(c, HASHER.signature(set(tokens)))
+        if cluster_id is None:
+            return None
+
+        c.execute('SELECT label, price_digest FROM item_clusters WHERE id = ?', (cluster_id,))
+        label, digest_json = c.fetchone()
+    except sqlite3.OperationalError:
+        return None  # comparables tables not created yet (run database.py)
+    finally:
+        conn.close()
+
+    digest = PriceDigest.from_json(digest_json)
+    if own_price:
+        # A cheap listing would otherwise pull p25 toward its own price
+        digest.remove(own_price)
+    if digest.count < MIN_COMPARABLES:
+        return None
+
+    median = digest.quantile(0.5)
+    price_num = parse_price(price)
+    return {
+        'cluster_id': cluster_id,
+        'label': label,
+        'count': digest.count,
+        'p25': digest.quantile(0.25),
+        'median': median,
+        'p75': digest.quantile(0.75),
+        'price_ratio': price_num / median if price_num is not None and median else None
+    }
+
+
+def rebuild_index():
+    """Drop and rebuild clusters from every listing in the database"""
+    init_db()
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    for table in ('item_clusters', 'cluster_lsh', 'listing_clusters'):
+        c.execute(f'DELETE FROM {table}')
+
+    c.execute('SELECT id, title, price FROM listings ORDER BY id')
+    rows = c.fetchall()
+    for listing_id, title, price in rows:
+        observe_listing(listing_id, title, price, conn)
+
+    c.execute('SELECT COUNT(*) FROM item_clusters')
+    clusters = c.fetchone()[0]
+    conn.close()
+    print(f"✅ Indexed {len(rows)} listings into {clusters} clusters")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Market-comparable price index')
+    parser.add_argument('--rebuild', action='store_true', help='rebuild clusters from all listings')
+    parser.add_argument('--lookup', metavar='TITLE', help='show comparables for a title')
+    parser.add_argument('--price', default='', help='price to compare with --lookup')
+    args = parser.parse_args()
+
+    if args.rebuild:
+        rebuild_index()
+    if args.lookup:
+        result = price_against_comparables(args.lookup, args.price)
+        if not result:
+            print("ℹ️  Not enough comparables for that title yet")
+        else:
+            print(f"📦 Cluster #{result['cluster_id']}: {result['label']} ({result['count']} priced)")
+            print(f"   💰 p25 ${result['p25']:.0f} | median ${result['median']:.0f} | p75 ${result['p75']:.0f}")
+            if result['price_ratio'] is not None:
+                print(f"   📊 {result['price_ratio']:.2f}x median")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Headless scheduled crawler for FB Marketplace Scout
+Runs saved searches across several headless browser contexts and feeds the same
+ingest path as the watcher (scan_feed -> upsert_listing)
+
+Usage:
+    python3 crawler.py --config crawl.json           # crawl on a schedule
+    python3 crawler.py --config crawl.json --once    # one round, then exit
+    python3 crawler.py --query oscilloscope --query enlarger --location newhaven --once
+
+    # Against the local stand-in feed (no Facebook login needed)
+    python3 -m http.server 8000 --directory fixtures &
+    python3 crawler.py --query test --once --no-login \\
+        --url-template 'http://localhost:8000/feed.html?q={query}&loc={location}'
+
+Config file (JSON): see crawl.example.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from urllib.parse import quote_plus
+from database import init_db, get_listing_stats
+from page_cleanup import CLEANUP_INIT_SCRIPT
+from seen_items import SeenItems
+from watcher import USER_DATA_DIR, scan_feed
+
+# Cookies/localStorage exported from the watcher's persistent profile
+STORAGE_STATE_PATH = USER_DATA_DIR + '-state.json'
+
+SEARCH_URL_TEMPLATE = 'https://www.facebook.com/marketplace/{location}/search?query={query}'
+
+DEFAULTS = {
+    'searches': [],
+    'location': 'newhaven',
+    'contexts': 2,              # headless browser contexts
+    'max_concurrent': 2,        # searches loading at the same time
+    'scroll_rounds': 15,        # scrolls per search
+    'idle_rounds': 3,           # stop a search after this many scrolls with nothing new
+    'pace_seconds': [2.5, 6.0],  # random pause between scrolls, per context
+    'interval_minutes': 60,     # time between crawl rounds
+    'url_template': SEARCH_URL_TEMPLATE
+}
+
+
+def load_config(args):
+    """Merge config file and command-line overrides"""
+    config = dict(DEFAULTS)
+    if args.config:
+        with open(args.config) as f:
+            config.update(json.load(f))
+
+    if args.query:
+        config['searches'] = [{'query': q} for q in args.query]
+    for key in ('location', 'contexts', 'max_concurrent', 'scroll_rounds', 'interval_minutes', 'url_template'):
+        value = getattr(args, key)
+        if value is not None:
+            config[key] = value
+
+    # Searches may be plain strings or {"query": ..., "location": ...}
+    config['searches'] = [
+        s if isinstance(s, dict) else {'query': s}
+        for s in config['searches']
+    ]
+    return config
+
+
+async def export_storage_state(p):
+    """
+    Copy cookies from the persistent watcher profile so headless contexts are logged in
+
+    Chrome locks the profile while the headed watcher is running - in that case
+    the last exported state is reused.
+    """
+    try:
+        context = await p.chromium.launch_persistent_context(USER_DATA_DIR, headless=True)
+        await context.storage_state(path=STORAGE_STATE_PATH)
+        await context.close()
+        print(f"🍪 Exported session cookies to {STORAGE_STATE_PATH}")
+    except Exception as e:
+        if os.path.exists(STORAGE_STATE_PATH):
+            print(f"⚠️  Profile busy ({e.__class__.__name__}) - reusing saved session cookies")
+        else:
+            print(f"⚠️  Couldn't read browser profile: {e}")
+            print("   Run watcher.py once and log in, or pass --no-login for a local feed")
+            return None
+    return STORAGE_STATE_PATH
+
+
+async def crawl_search(page, search, config, seen):
+    """
+    Load one search and auto-scroll it, ingesting cards as they appear
+
+    Returns:
+        int: new listings saved
+    """
+    url = config['url_template'].format(
+        query=quote_plus(search['query']),
+        location=search.get('location', config['location'])
+    )
+    await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+
+    pace_min, pace_max = config['pace_seconds']
+    saved = 0
+    idle = 0
+
+    for _ in range(config['scroll_rounds']):
+        new = await scan_feed(page, seen)
+        saved += len(new)
+        for listing_data in new:
+            print(f"📦 [{search['query']}] {listing_data['title']} - {listing_data['price']}")
+
+        idle = idle + 1 if not new else 0
+        if idle >= config['idle_rounds']:
+            break
+
+        await page.mouse.wheel(0, random.randint(2500, 4000))
+        await asyncio.sleep(random.uniform(pace_min, pace_max))
+
+    return saved
+
+
+async def context_worker(name, context, queue, semaphore, config, seen, totals):
+    """Pull searches off the queue and crawl them in this context's tab"""
+    page = await context.new_page()
+    try:
+        while True:
+            try:
+                search = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            started = time.monotonic()
+            try:
+                async with semaphore:
+                    saved = await crawl_search(page, search, config, seen)
+                totals[search['query']] = totals.get(search['query'], 0) + saved
+                print(f"✅ [{name}] '{search['query']}' - {saved} new in {time.monotonic() - started:.0f}s")
+            except Exception as e:
+                print(f"⚠️  [{name}] '{search['query']}' failed: {e}")
+            finally:
+                queue.task_done()
+    finally:
+        await page.close()
+
+
+async def crawl_round(browser, storage_state, config, seen):
+    """Run every configured search once across the context pool"""
+    queue = asyncio.Queue()
+    for search in config['searches']:
+        queue.put_nowait(search)
+
+    semaphore = asyncio.Semaphore(config['max_concurrent'])
+    totals = {}
+
+    contexts = []
+    for _ in range(min(config['contexts'], len(config['searches']))):
+        context = await browser.new_context(
+            storage_state=storage_state,
+            viewport={'width': 1366, 'height': 900}
+        )
+        await context.add_init_script(CLEANUP_INIT_SCRIPT)
+        contexts.append(context)
+
+    try:
+        await asyncio.gather(*(
+            context_worker(f'ctx{i}', context, queue, semaphore, config, seen, totals)
+            for i, context in enumerate(contexts)
+        ))
+    finally:
+        for context in contexts:
+            await context.close()
+
+    return totals
+
+
+async def run_crawler(config, once=False, login=True):
+    from playwright.async_api import async_playwright
+    init_db()
+
+    if not config['searches']:
+        print("❌ No searches configured (use --query or a config file)")
+        return
+
+    print("🕷️  FB Marketplace Scout Crawler")
+    print("=" * 60)
+    print(f"Searches: {', '.join(s['query'] for s in config['searches'])}")
+    print(f"Contexts: {config['contexts']} | Concurrent: {config['max_concurrent']}")
+    print("=" * 60)
+
+    seen = SeenItems()
+
+    async with async_playwright() as p:
+        storage_state = await export_storage_state(p) if login else None
+        if login and not storage_state:
+            return
+
+        browser = await p.chromium.launch(
+            headless=True,
+            args=['--disable-blink-features=AutomationControlled']
+        )
+        try:
+            while True:
+                started = time.monotonic()
+                totals = await crawl_round(browser, storage_state, config, seen)
+
+                stats = get_listing_stats()
+                print(f"\n📊 Round done in {time.monotonic() - started:.0f}s - "
+                      f"{sum(totals.values())} new | {stats['total']} total | {stats['pending']} pending\n")
+
+                if once:
+                    break
+
+                # Jitter the schedule so rounds don't fire on an exact cadence
+                delay = config['interval_minutes'] * 60 * random.uniform(0.85, 1.15)
+                print(f"⏱️  Next round in {delay / 60:.0f} min...")
+                await asyncio.sleep(delay)
+        finally:
+            await browser.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless scheduled Marketplace crawler')
+    parser.add_argument('--config', help='JSON config file')
+    parser.add_argument('--query', action='append', help='search query (repeatable)')
+    parser.add_argument('--location', help='Marketplace location slug, e.g. newhaven')
+    parser.add_argument('--contexts', type=int, help='number of headless browser contexts')
+    parser.add_argument('--max-concurrent', dest='max_concurrent', type=int,
+                        help='searches loading at the same time')
+    parser.add_argument('--scroll-rounds', dest='scroll_rounds', type=int, help='scrolls per search')
+    parser.add_argument('--interval-minutes', dest='interval_minutes', type=float,
+                        help='minutes between crawl rounds')
+    parser.add_argument('--url-template', dest='url_template',
+                        help='search URL with {query} and {location} placeholders')
+    parser.add_argument('--once', action='store_true', help='run a single round and exit')
+    parser.add_argument('--no-login', action='store_true',
+                        help="don't load the browser profile's cookies (local stand-in feeds)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_crawler(load_config(args), once=args.once, login=not args.no_login))
+    except KeyboardInterrupt:
+        print("\n👋 Crawler stopped")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,9 +3,24 @@ SQLite database setup for FB Marketplace Scout
 """
 import sqlite3
 import os
+import time
 from datetime import datetime
+from metrics import counter, histogram
+from payloads import load_payload, store_payload
 
-DB_PATH = os.path.join(os.path.dirname(__file__), 'marketplace.db')
+# SCOUT_DB_PATH points tools (benchmarks, tests) at a scratch database
+DB_PATH = os.environ.get('SCOUT_DB_PATH') or os.path.join(os.path.dirname(__file__), 'marketplace.db')
+
+DB_WRITE_SECONDS = histogram('scout_db_write_seconds', 'Time spent in database write calls')
+LISTINGS_UPSERTED = counter('scout_listings_upserted_total', 'Listings passed to upsert_listing, by outcome')
+
+
+# (table, column, declaration) added after release - init_db adds them to
+# older databases
+COLUMNS_ADDED = (
+    ('listings', 'rubric_version', 'TEXT'),  # rubric.py version the scores came from
+    ('listing_clusters', 'price', 'REAL'),   # price folded into the cluster digest
+)
 
 
 def init_db():
@@ -32,7 +47,8 @@ def init_db():
             thumbnail_phash TEXT,
             is_duplicate BOOLEAN DEFAULT 0,
             is_screenshot BOOLEAN DEFAULT 0,
-            notes TEXT
+            notes TEXT,
+            rubric_version TEXT
         )
     ''')
 
@@ -41,11 +57,451 @@ def init_db():
     c.execute('CREATE INDEX IF NOT EXISTS idx_discovered ON listings(discovered_at)')
     c.execute('CREATE INDEX IF NOT EXISTS idx_phash ON listings(thumbnail_phash)')
 
+    # Detail-page data, keyed by Marketplace item ID so it can be stored on
+    # first view even before the feed watcher has picked the listing up
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS listing_details (
+            item_id TEXT PRIMARY KEY,
+            description TEXT,
+            condition TEXT,
+            photo_count INTEGER,
+            posted_at TIMESTAMP,
+            extracted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Append-only log of field changes on listings we already have
+    # (price_delta is set for price changes, negative = price drop)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS listing_history (
+            id INTEGER PRIMARY KEY,
+            listing_id INTEGER NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            field TEXT NOT NULL,
+            old_value TEXT,
+            new_value TEXT,
+            price_delta REAL
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_history_listing ON listing_history(listing_id, changed_at)')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_history_price_drops
+        ON listing_history(changed_at) WHERE price_delta < 0
+    ''')
+
+    # Comparables engine (comparables.py): title clusters with a streaming
+    # price digest, LSH buckets pointing at them, and listing membership
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS item_clusters (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            label TEXT,
+            signature BLOB NOT NULL,
+            listing_count INTEGER DEFAULT 0,
+            price_digest TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS cluster_lsh (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            cluster_id INTEGER NOT NULL,
+            PRIMARY KEY (band, bucket)
+        ) WITHOUT ROWID
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS listing_clusters (
+            listing_id INTEGER PRIMARY KEY,
+            cluster_id INTEGER NOT NULL,
+            price REAL
+        )
+    ''')
+
+    # Near-duplicate text index (near_duplicates.py): one MinHash signature per
+    # listing, and every LSH bucket the listing falls in
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS text_signatures (
+            listing_id INTEGER PRIMARY KEY,
+            signature BLOB NOT NULL
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS text_lsh (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            listing_id INTEGER NOT NULL,
+            PRIMARY KEY (band, bucket, listing_id)
+        ) WITHOUT ROWID
+    ''')
+
+    # Raw evaluation responses (payloads.py), compressed and kept out of the
+    # listings rows that every scan touches
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS evaluation_payloads (
+            listing_id INTEGER PRIMARY KEY,
+            dict_id INTEGER,
+            codec TEXT NOT NULL,
+            size INTEGER,
+            payload BLOB NOT NULL
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS payload_dictionaries (
+            id INTEGER PRIMARY KEY,
+            codec TEXT NOT NULL,
+            dictionary BLOB NOT NULL,
+            trained_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Listings scored by the heuristic fallback while the LLM backends were
+    # down - re-scored once one is back (see backends.py)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS reevaluation_queue (
+            listing_id INTEGER PRIMARY KEY,
+            reason TEXT,
+            queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Scores per buyer profile when the rubric has several (rubric.py); the
+    # first profile's scores are also the listing's own
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS profile_scores (
+            listing_id INTEGER NOT NULL,
+            profile TEXT NOT NULL,
+            flip_score INTEGER,
+            weirdness_score INTEGER,
+            scam_likelihood INTEGER,
+            notes TEXT,
+            rubric_version TEXT,
+            evaluated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (listing_id, profile)
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_profile_scores ON profile_scores(profile, flip_score)')
+
+    # One row per LLM call (usage.py): tokens, prompt-cache hits and cost
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS llm_usage (
+            id INTEGER PRIMARY KEY,
+            listing_id INTEGER,
+            backend TEXT NOT NULL,
+            model TEXT,
+            input_tokens INTEGER DEFAULT 0,
+            output_tokens INTEGER DEFAULT 0,
+            cache_read_tokens INTEGER DEFAULT 0,
+            cache_write_tokens INTEGER DEFAULT 0,
+            cost_usd REAL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_usage_created ON llm_usage(created_at)')
+
+    # Seller reputation (sellers.py): running aggregates updated on ingest and
+    # evaluation, so scoring never has to scan a seller's listings
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS sellers (
+            seller_key TEXT PRIMARY KEY,
+            seller_name TEXT,
+            listing_count INTEGER DEFAULT 0,
+            duplicate_count INTEGER DEFAULT 0,
+            evaluated_count INTEGER DEFAULT 0,
+            scam_total REAL DEFAULT 0,
+            velocity REAL DEFAULT 0,
+            velocity_at REAL,
+            price_ratio_digest TEXT,
+            first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    ''')
+
+    # Columns added since the tables were first created
+    added = set()
+    for table, column, declaration in COLUMNS_ADDED:
+        if column not in {row[1] for row in c.execute(f'PRAGMA table_info({table})')}:
+            c.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
+            added.add((table, column))
+    if ('listing_clusters', 'price') in added:
+        # Clustered listings had their price folded in at ingest - the
+        # listing's price is the best record left of what it was
+        c.execute('SELECT lc.listing_id, l.price FROM listing_clusters lc JOIN listings l ON l.id = lc.listing_id')
+        c.executemany('UPDATE listing_clusters SET price = ? WHERE listing_id = ?',
+                      [(parse_price(price) or None, listing_id) for listing_id, price in c.fetchall()])
+
+    # One-off data migrations, tracked in the user_version pragma
+    if c.execute('PRAGMA user_version').fetchone()[0] < URLS_NORMALIZED_VERSION:
+        normalize_stored_urls(c)
+        c.execute(f'PRAGMA user_version = {URLS_NORMALIZED_VERSION}')
+
     conn.commit()
     conn.close()
     print(f"✅ Database initialized at: {DB_PATH}")
 
 
+# user_version once normalize_stored_urls() has run on a database
+URLS_NORMALIZED_VERSION = 1
+
+# Tables with rows belonging to a listing, by listing_id
+LISTING_DEPENDENTS = (
+    'listing_history', 'listing_clusters', 'text_signatures', 'text_lsh', 'evaluation_payloads',
+    'reevaluation_queue', 'profile_scores', 'llm_usage',
+)
+
+
+def normalize_stored_urls(c):
+    """
+    Rewrite listing URLs stored before normalize_listing_url() (with ?ref=...
+    tracking strings) to the canonical form, merging rows that turn out to be
+    the same item into the oldest one
+
+    Runs once from init_db (see URLS_NORMALIZED_VERSION), or again with
+    `python3 database.py --normalize-urls`.
+
+    Args:
+        c: cursor; the caller commits
+
+    Returns:
+        int: rows rewritten or merged away
+    """
+    from sellers import seller_key
+
+    c.execute('''
+        SELECT id, listing_url FROM listings
+        WHERE listing_url LIKE '%/marketplace/item/%'
+          AND (listing_url GLOB '*[?#]*' OR listing_url NOT GLOB 'https://www.facebook.com/marketplace/item/*/')
+    ''')
+    items = {}
+    for listing_id, listing_url in c.fetchall():
+        canonical = normalize_listing_url(listing_url)
+        if canonical != listing_url:
+            items.setdefault(canonical, []).append(listing_id)
+    if not items:
+        return 0
+
+    merged_count = 0
+    reindex = []
+    fields = ', '.join(TRACKED_FIELDS)
+    for canonical, ids in items.items():
+        c.execute('SELECT id FROM listings WHERE listing_url = ?', (canonical,))
+        row = c.fetchone()
+        ids = sorted(ids + ([row[0]] if row else []))
+        keep, merged = ids[0], ids[1:]
+
+        # The oldest row keeps its scores and price history; the others' rows
+        # move over to it where it has none of its own
+        if merged:
+            placeholders = ','.join('?' * len(merged))
+
+            # ...but the newest row has the price/title/location last seen -
+            # if they differ, the kept scores are out of date
+            c.execute(f'SELECT {fields} FROM listings WHERE id = ?', (keep,))
+            kept = c.fetchone()
+            c.execute(f'SELECT {fields} FROM listings WHERE id = ?', (merged[-1],))
+            newest = c.fetchone()
+            if newest != kept:
+                c.execute(f'''
+                    UPDATE listings SET {", ".join(f"{field} = ?" for field in TRACKED_FIELDS)}, evaluated = 0
+                    WHERE id = ?
+                ''', (*newest, keep))
+
+            # Take the merged listings back out of their sellers' aggregates
+            c.execute(f'''
+                SELECT seller_name, is_duplicate, evaluated, scam_likelihood
+                FROM listings WHERE id IN ({placeholders})
+            ''', merged)
+            for seller_name, is_duplicate, evaluated, scam in c.fetchall():
+                key = seller_key(seller_name)
+                if not key:
+                    continue
+                scored = bool(evaluated) and scam is not None
+                c.execute('''
+                    UPDATE sellers
+                    SET listing_count = MAX(0, listing_count - 1),
+                        duplicate_count = MAX(0, duplicate_count - ?),
+                        evaluated_count = MAX(0, evaluated_count - ?),
+                        scam_total = scam_total - ?
+                    WHERE seller_key = ?
+                ''', (1 if is_duplicate else 0, 1 if scored else 0, scam if scored else 0, key))
+
+            for table in LISTING_DEPENDENTS:
+                if table != 'text_lsh':
+                    c.execute(f'UPDATE OR IGNORE {table} SET listing_id = ? WHERE listing_id IN ({placeholders})',
+                              [keep, *merged])
+                c.execute(f'DELETE FROM {table} WHERE listing_id IN ({placeholders})', merged)
+            c.execute(f'DELETE FROM listings WHERE id IN ({placeholders})', merged)
+            merged_count += len(merged)
+            reindex.append(keep)
+        c.execute('UPDATE listings SET listing_url = ? WHERE id = ?', (canonical, keep))
+
+    # A signature moved onto the kept listing needs its buckets filed under
+    # the kept id (the merged listings' buckets were dropped above)
+    if reindex:
+        from minhash import MinHasher
+        from near_duplicates import HASHER, ensure_band_layout
+        ensure_band_layout(c.connection)
+        placeholders = ','.join('?' * len(reindex))
+        c.execute(f'SELECT listing_id, signature FROM text_signatures WHERE listing_id IN ({placeholders})', reindex)
+        c.executemany('INSERT OR IGNORE INTO text_lsh (band, bucket, listing_id) VALUES (?, ?, ?)', [
+            (band, bucket, listing_id)
+            for listing_id, blob in c.fetchall()
+            for band, bucket in HASHER.band_keys(MinHasher.from_blob(blob))
+        ])
+
+    print(f"🔗 Normalized {len(items)} stored listing URLs ({merged_count} duplicate rows merged)")
+    return len(items) + merged_count
+
+
+def extract_item_id(listing_url):
+    """
+    Pull the Marketplace item ID out of a listing URL
+
+    e.g. https://www.facebook.com/marketplace/item/123456/?ref=feed -> '123456'
+
+    Returns:
+        str or None
+    """
+    if not listing_url or '/marketplace/item/' not in listing_url:
+        return None
+    item_id = listing_url.split('/marketplace/item/')[1].split('/')[0].split('?')[0]
+    return item_id or None
+
+
+def normalize_listing_url(listing_url):
+    """
+    Canonical form of a listing URL - tracking query strings and path suffixes
+    stripped, so the same item always hits the unique index
+
+    Returns:
+        str (unchanged if it isn't a Marketplace item URL)
+    """
+    item_id = extract_item_id(listing_url)
+    if not item_id:
+        return listing_url
+    return f'https://www.facebook.com/marketplace/item/{item_id}/'
+
+
+def parse_price(price):
+    """
+    Numeric value of a scraped price string ("$1,200" -> 1200.0, "Free" -> 0.0)
+
+    Returns:
+        float or None if there's no number in it
+    """
+    if not price:
+        return None
+    if 'free' in price.lower():
+        return 0.0
+    try:
+        return float(''.join(ch for ch in price if ch.isdigit() or ch == '.'))
+    except ValueError:
+        return None
+
+
+# Fields compared on re-ingest - a change is logged to listing_history
+TRACKED_FIELDS = ('price', 'title', 'location')
+
+
+def upsert_listing(listing_data):
+    """
+    Insert a listing, or record what changed if we already have it
+
+    Changed price/title/location values are written to the listing and appended
+    to listing_history. A price change also resets evaluated so it gets rescored.
+
+    Args:
+        listing_data (dict): same shape as add_listing()
+
+    Returns:
+        dict: {
+            'listing_id': int,
+            'created': bool,
+            'changes': [{'field', 'old_value', 'new_value', 'price_delta'}, ...]
+        }
+    """
+    listing_url = normalize_listing_url(listing_data.get('listing_url'))
+    started = time.perf_counter()
+
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+
+    try:
+        try:
+            c.execute('''
+                INSERT INTO listings (listing_url, title, price, thumbnail_url, seller_name, location)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (
+                listing_url,
+                listing_data.get('title'),
+                listing_data.get('price'),
+                listing_data.get('thumbnail_url'),
+                listing_data.get('seller_name'),
+                listing_data.get('location')
+            ))
+            conn.commit()
+            print(f"✅ Added listing: {listing_data.get('title')} - ${listing_data.get('price')}")
+            LISTINGS_UPSERTED.inc(outcome='created')
+            return {'listing_id': c.lastrowid, 'created': True, 'changes': []}
+        except sqlite3.IntegrityError:
+            pass
+
+        # Already have it - compare against the stored row (unique index lookup)
+        c.execute('''
+            SELECT id, price, title, location FROM listings WHERE listing_url = ?
+        ''', (listing_url,))
+        row = c.fetchone()
+        if not row:
+            return {'listing_id': None, 'created': False, 'changes': []}
+
+        listing_id = row[0]
+        stored = dict(zip(TRACKED_FIELDS, row[1:]))
+
+        changes = []
+        for field in TRACKED_FIELDS:
+            new_value = listing_data.get(field)
+            if new_value is None or new_value == stored[field]:
+                continue
+
+            price_delta = None
+            if field == 'price':
+                old_num, new_num = parse_price(stored[field]), parse_price(new_value)
+                if old_num is not None and new_num is not None:
+                    if old_num == new_num:
+                        continue  # same price, different formatting
+                    price_delta = new_num - old_num
+
+            changes.append({
+                'field': field,
+                'old_value': stored[field],
+                'new_value': new_value,
+                'price_delta': price_delta
+            })
+
+        if changes:
+            c.executemany('''
+                INSERT INTO listing_history (listing_id, field, old_value, new_value, price_delta)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [
+                (listing_id, ch['field'], ch['old_value'], ch['new_value'], ch['price_delta'])
+                for ch in changes
+            ])
+
+            assignments = ', '.join(f"{ch['field']} = ?" for ch in changes)
+            if any(ch['field'] == 'price' for ch in changes):
+                assignments += ', evaluated = 0'
+            c.execute(
+                f'UPDATE listings SET {assignments} WHERE id = ?',
+                [ch['new_value'] for ch in changes] + [listing_id]
+            )
+            conn.commit()
+
+        LISTINGS_UPSERTED.inc(outcome='changed' if changes else 'unchanged')
+        return {'listing_id': listing_id, 'created': False, 'changes': changes}
+    finally:
+        conn.close()
+        DB_WRITE_SECONDS.observe(time.perf_counter() - started, op='upsert_listing')
+
+
 def add_listing(listing_data):
     """
     Add a new listing to the database
@@ -61,51 +517,86 @@ def add_listing(listing_data):
         }
 
     Returns:
-        int: listing_id or None if duplicate
+        int: listing_id or None if duplicate (changes to an existing listing
+        are still recorded - see upsert_listing)
+    """
+    result = upsert_listing(listing_data)
+    return result['listing_id'] if result['created'] else None
+
+
+def get_recent_price_drops(hours=24, limit=50):
+    """
+    Listings whose price dropped in the last N hours, biggest drop first
+
+    Returns:
+        list of dicts
     """
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
 
-    try:
-        c.execute('''
-            INSERT INTO listings (listing_url, title, price, thumbnail_url, seller_name, location)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            listing_data.get('listing_url'),
-            listing_data.get('title'),
-            listing_data.get('price'),
-            listing_data.get('thumbnail_url'),
-            listing_data.get('seller_name'),
-            listing_data.get('location')
-        ))
-        conn.commit()
-        listing_id = c.lastrowid
-        print(f"✅ Added listing: {listing_data.get('title')} - ${listing_data.get('price')}")
-        return listing_id
-    except sqlite3.IntegrityError:
-        # Duplicate listing
-        return None
-    finally:
-        conn.close()
+    # price_delta < 0 matches the partial index, so only drop rows are scanned
+    c.execute('''
+        SELECT l.id, l.listing_url, l.title, h.old_value, h.new_value, h.price_delta, h.changed_at
+        FROM listing_history h
+        JOIN listings l ON l.id = h.listing_id
+        WHERE h.price_delta < 0
+          AND h.changed_at >= datetime('now', ?)
+        ORDER BY h.price_delta ASC
+        LIMIT ?
+    ''', (f'-{int(hours)} hours', limit))
+
+    results = c.fetchall()
+    conn.close()
+
+    return [
+        {
+            'id': r[0],
+            'listing_url': r[1],
+            'title': r[2],
+            'old_price': r[3],
+            'new_price': r[4],
+            'price_delta': r[5],
+            'changed_at': r[6]
+        }
+        for r in results
+    ]
 
 
-def get_unevaluated_listings(limit=10):
-    """Get listings that haven't been evaluated yet"""
+def get_listing_history(listing_id):
+    """Get the change log for one listing, oldest first"""
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
 
     c.execute('''
-        SELECT id, listing_url, title, price, thumbnail_url, seller_name, location
-        FROM listings
-        WHERE evaluated = 0
-        ORDER BY discovered_at DESC
-        LIMIT ?
-    ''', (limit,))
+        SELECT changed_at, field, old_value, new_value, price_delta
+        FROM listing_history
+        WHERE listing_id = ?
+        ORDER BY changed_at, id
+    ''', (listing_id,))
 
     results = c.fetchall()
     conn.close()
 
     return [
+        {
+            'changed_at': r[0],
+            'field': r[1],
+            'old_value': r[2],
+            'new_value': r[3],
+            'price_delta': r[4]
+        }
+        for r in results
+    ]
+
+
+# Columns behind the evaluator's listing dicts (see _evaluation_rows)
+EVALUATION_COLUMNS = ('id, listing_url, title, price, thumbnail_url, seller_name, location, '
+                      'is_duplicate, scam_likelihood')
+
+
+def _evaluation_rows(results):
+    """Shape listing rows for the evaluator and attach their detail-page data"""
+    listings = [
         {
             'id': r[0],
             'listing_url': r[1],
@@ -113,16 +604,164 @@ def get_unevaluated_listings(limit=10):
             'price': r[3],
             'thumbnail_url': r[4],
             'seller_name': r[5],
-            'location': r[6]
+            'location': r[6],
+            'is_duplicate': bool(r[7]),
+            'scam_likelihood': r[8]  # previous score if this is a re-evaluation
         }
         for r in results
     ]
 
+    # Attach detail-page data where we have it, so the evaluator sees
+    # description/condition without re-scraping
+    details = get_details_for_urls([l['listing_url'] for l in listings])
+    for listing in listings:
+        listing['details'] = details.get(extract_item_id(listing['listing_url']))
+
+    return listings
+
+
+def get_unevaluated_listings(limit=10):
+    """Get listings that haven't been evaluated yet"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+
+    c.execute(f'''
+        SELECT {EVALUATION_COLUMNS}
+        FROM listings
+        WHERE evaluated = 0
+        ORDER BY discovered_at DESC
+        LIMIT ?
+    ''', (limit,))
+
+    results = c.fetchall()
+    conn.close()
+
+    return _evaluation_rows(results)
+
+
+def get_unevaluated_by_ids(listing_ids):
+    """
+    Same shape as get_unevaluated_listings(), for specific listings that
+    still need scoring (already-evaluated ones are skipped)
+
+    Returns:
+        list of dicts
+    """
+    if not listing_ids:
+        return []
+
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+
+    placeholders = ','.join('?' * len(listing_ids))
+    c.execute(f'''
+        SELECT {EVALUATION_COLUMNS}
+        FROM listings
+        WHERE evaluated = 0 AND id IN ({placeholders})
+    ''', list(listing_ids))
+
+    results = c.fetchall()
+    conn.close()
+
+    return _evaluation_rows(results)
+
+
+def get_listing_details(listing_url):
+    """
+    Get stored detail-page data for a listing
+
+    Returns:
+        dict or None if the detail page hasn't been enriched yet
+    """
+    item_id = extract_item_id(listing_url)
+    if not item_id:
+        return None
+    return get_details_for_urls([listing_url]).get(item_id)
+
+
+def get_details_for_urls(listing_urls):
+    """
+    Bulk lookup of detail-page data
+
+    Returns:
+        dict: item_id -> details dict (only for enriched listings)
+    """
+    item_ids = [i for i in (extract_item_id(u) for u in listing_urls) if i]
+    if not item_ids:
+        return {}
+
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+
+    placeholders = ','.join('?' * len(item_ids))
+    c.execute(f'''
+        SELECT item_id, description, condition, photo_count, posted_at, extracted_at
+        FROM listing_details
+        WHERE item_id IN ({placeholders})
+    ''', item_ids)
+
+    results = c.fetchall()
+    conn.close()
+
+    return {
+        r[0]: {
+            'description': r[1],
+            'condition': r[2],
+            'photo_count': r[3],
+            'posted_at': r[4],
+            'extracted_at': r[5]
+        }
+        for r in results
+    }
+
+
+def save_listing_details(listing_url, details):
+    """
+    Store detail-page data for a listing (first view wins)
+
+    Args:
+        listing_url (str): Listing URL (any form - item ID is extracted)
+        details (dict): {
+            'description': str,
+            'condition': str,
+            'photo_count': int,
+            'posted_at': str (ISO timestamp)
+        }
+
+    Returns:
+        bool: True if stored, False if already present or not a listing URL
+    """
+    item_id = extract_item_id(listing_url)
+    if not item_id:
+        return False
+
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+
+    c.execute('''
+        INSERT OR IGNORE INTO listing_details (item_id, description, condition, photo_count, posted_at)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (
+        item_id,
+        details.get('description'),
+        details.get('condition'),
+        details.get('photo_count'),
+        details.get('posted_at')
+    ))
+    stored = c.rowcount > 0
+
+    conn.commit()
+    conn.close()
+    return stored
+
 
 def update_evaluation(listing_id, evaluation_data):
     """
     Update listing with evaluation results
 
+    The raw response goes to the compressed evaluation_payloads table - load
+    it with get_evaluation_payload() when needed.
+
     Args:
         listing_id (int): ID of the listing
         evaluation_data (dict): {
@@ -130,9 +769,14 @@ def update_evaluation(listing_id, evaluation_data):
             'weirdness_score': int (1-10),
             'scam_likelihood': int (1-10),
             'evaluation_data': str (JSON or text),
-            'notes': str
+            'notes': str,
+            'rubric_version': str (rubric.py version it was scored under),
+            'profiles': dict (optional - {profile name: scores, notes and
+                rubric_version} for each buyer profile),
+            'needs_reevaluation': str (optional - why it should be scored again)
         }
     """
+    started = time.perf_counter()
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
 
@@ -142,23 +786,142 @@ def update_evaluation(listing_id, evaluation_data):
             flip_score = ?,
             weirdness_score = ?,
             scam_likelihood = ?,
-            evaluation_data = ?,
-            notes = ?
+            evaluation_data = NULL,
+            notes = ?,
+            rubric_version = ?
         WHERE id = ?
     ''', (
         evaluation_data.get('flip_score'),
         evaluation_data.get('weirdness_score'),
         evaluation_data.get('scam_likelihood'),
-        evaluation_data.get('evaluation_data'),
         evaluation_data.get('notes'),
+        evaluation_data.get('rubric_version'),
         listing_id
     ))
+    store_payload(c, listing_id, evaluation_data.get('evaluation_data'))
+
+    profiles = evaluation_data.get('profiles') or {}
+    c.executemany('''
+        INSERT OR REPLACE INTO profile_scores
+            (listing_id, profile, flip_score, weirdness_score, scam_likelihood, notes, rubric_version)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', [(listing_id, name, scores.get('flip_score'), scores.get('weirdness_score'),
+           scores.get('scam_likelihood'), scores.get('notes'), scores.get('rubric_version'))
+          for name, scores in profiles.items()])
+
+    if evaluation_data.get('needs_reevaluation'):
+        c.execute('INSERT OR REPLACE INTO reevaluation_queue (listing_id, reason) VALUES (?, ?)',
+                  (listing_id, evaluation_data['needs_reevaluation']))
+    else:
+        c.execute('DELETE FROM reevaluation_queue WHERE listing_id = ?', (listing_id,))
 
     conn.commit()
     conn.close()
+    DB_WRITE_SECONDS.observe(time.perf_counter() - started, op='update_evaluation')
     print(f"✅ Updated evaluation for listing {listing_id}")
 
 
+def get_profile_scores(listing_id):
+    """
+    A listing's scores for each buyer profile
+
+    Returns:
+        dict: {profile name: {'flip_score', 'weirdness_score', 'scam_likelihood',
+               'notes', 'rubric_version'}} (empty if it was scored for one buyer)
+    """
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('''
+        SELECT profile, flip_score, weirdness_score, scam_likelihood, notes, rubric_version
+        FROM profile_scores
+        WHERE listing_id = ?
+    ''', (listing_id,))
+    rows = c.fetchall()
+    conn.close()
+
+    return {
+        r[0]: {
+            'flip_score': r[1],
+            'weirdness_score': r[2],
+            'scam_likelihood': r[3],
+            'notes': r[4],
+            'rubric_version': r[5]
+        }
+        for r in rows
+    }
+
+
+def get_evaluation_payload(listing_id):
+    """
+    Raw evaluation response stored for a listing
+
+    Returns:
+        str or None
+    """
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        return load_payload(conn.cursor(), listing_id)
+    finally:
+        conn.close()
+
+
+def get_reevaluation_backlog(limit=10):
+    """
+    Listings that got heuristic scores because the LLM backends were down,
+    oldest first, in the same shape as get_unevaluated_listings()
+
+    Returns:
+        list of dicts
+    """
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+
+    columns = ', '.join(f'l.{col.strip()}' for col in EVALUATION_COLUMNS.split(','))
+    c.execute(f'''
+        SELECT {columns}
+        FROM reevaluation_queue q
+        JOIN listings l ON l.id = q.listing_id
+        ORDER BY q.queued_at
+        LIMIT ?
+    ''', (limit,))
+
+    results = c.fetchall()
+    conn.close()
+
+    return _evaluation_rows(results)
+
+
+def mark_for_rescore(days=None, current_version=None):
+    """
+    Queue evaluated listings to be scored again (after changing the heuristics
+    or prompt)
+
+    Args:
+        days (int): only listings discovered in the last N days (None = all)
+        current_version (str): only listings scored under a different
+            rubric version (None = regardless of version)
+
+    Returns:
+        int: number of listings queued
+    """
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+
+    conditions, params = ['evaluated = 1'], []
+    if days is not None:
+        conditions.append("discovered_at >= datetime('now', ?)")
+        params.append(f'-{int(days)} days')
+    if current_version is not None:
+        conditions.append('rubric_version IS NOT ?')
+        params.append(current_version)
+    c.execute(f'UPDATE listings SET evaluated = 0 WHERE {" AND ".join(conditions)}', params)
+
+    count = c.rowcount
+    conn.commit()
+    conn.close()
+    return count
+
+
 def get_listing_stats():
     """Get database statistics"""
     conn = sqlite3.connect(DB_PATH)
@@ -176,6 +939,12 @@ def get_listing_stats():
     c.execute('SELECT COUNT(*) FROM listings WHERE flip_score > 7')
     flippable = c.fetchone()[0]
 
+    try:
+        c.execute('SELECT COUNT(*) FROM reevaluation_queue')
+        needs_reevaluation = c.fetchone()[0]
+    except sqlite3.OperationalError:
+        needs_reevaluation = 0  # reevaluation_queue not created yet (run database.py)
+
     conn.close()
 
     return {
@@ -183,7 +952,8 @@ def get_listing_stats():
         'evaluated': evaluated,
         'pending': total - evaluated,
         'scams': scams,
-        'flippable': flippable
+        'flippable': flippable,
+        'needs_reevaluation': needs_reevaluation
     }
 
 
@@ -224,8 +994,19 @@ def find_duplicate_images():
 
 
 if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Create or migrate the database')
+    parser.add_argument('--normalize-urls', action='store_true',
+                        help='rewrite stored listing URLs with tracking strings (init_db does this once)')
+    args = parser.parse_args()
+
     # Initialize database
     init_db()
+    if args.normalize_urls:
+        conn = sqlite3.connect(DB_PATH)
+        normalize_stored_urls(conn.cursor())
+        conn.commit()
+        conn.close()
 
     # Print stats
     stats = get_listing_stats()
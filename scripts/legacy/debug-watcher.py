@@ -5,6 +5,9 @@ Debug version of watcher to test specific URL
 import asyncio
 from playwright.async_api import async_playwright
 import os
+import time
+from extractors import DESCRIPTION_EXTRACT_JS
+from page_cleanup import CLEANUP_INIT_SCRIPT
 
 USER_DATA_DIR = os.path.expanduser('~/.fb-marketplace-scout-profile')
 
@@ -38,27 +41,9 @@ async def test_url():
         # Test 2: Try to extract description
         print("\n📝 Extracting description...")
         try:
-            description = await page.evaluate('''
-                () => {
-                    // Find all text on page
-                    let allText = document.body.innerText;
-                    console.log('Full page text length:', allText.length);
-
-                    // Try to find description
-                    let longestText = '';
-                    document.querySelectorAll('div, span, p').forEach(el => {
-                        const text = el.textContent?.trim() || '';
-                        if (text.length > 50 && text.length < 3000) {
-                            if (text.length > longestText.length) {
-                                longestText = text;
-                            }
-                        }
-                    });
-
-                    console.log('Longest text found:', longestText.substring(0, 200));
-                    return longestText;
-                }
-            ''')
+            started = time.perf_counter()
+            description = await page.evaluate(DESCRIPTION_EXTRACT_JS)
+            print(f"⏱️  Extractor took {(time.perf_counter() - started) * 1000:.1f}ms (incl. round trip)")
 
             if description:
                 print(f"✅ Found description ({len(description)} chars):")
@@ -71,29 +56,11 @@ async def test_url():
         # Test 3: Try to hide sidebar
         print("\n🚫 Hiding sidebar...")
         try:
-            await page.evaluate('''
-                () => {
-                    // Hide left nav
-                    const leftNav = document.querySelector('div[role="navigation"]');
-                    if (leftNav) {
-                        leftNav.style.display = 'none';
-                        console.log('✅ Hid navigation');
-                    } else {
-                        console.log('❌ No navigation found');
-                    }
-
-                    // Hide 360px wide columns
-                    let hidden = 0;
-                    document.querySelectorAll('div').forEach(el => {
-                        const style = window.getComputedStyle(el);
-                        if (style.width === '360px') {
-                            el.style.display = 'none';
-                            hidden++;
-                        }
-                    });
-                    console.log('Hid', hidden, 'sidebar elements');
-                }
-            ''')
+            await page.evaluate(CLEANUP_INIT_SCRIPT)
+            await asyncio.sleep(1)  # cleanup runs in an idle callback
+            stats = await page.evaluate('() => window.__scoutCleanup')
+            print(f"   Hid {stats['hiddenSidebars']} sidebar elements, {stats['hiddenAds']} ads "
+                  f"in {stats['batches']} batches")
             print("✅ Sidebar hiding attempted")
         except Exception as e:
             print(f"❌ Error: {e}")
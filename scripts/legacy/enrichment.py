@@ -0,0 +1,198 @@
+"""
+Detail-page enrichment for FB Marketplace Scout
+Scrapes description, condition, photo count and posted time from a listing page
+once, stores them in the listing_details table, and serves repeat views from the DB
+"""
+import asyncio
+import re
+from datetime import datetime, timedelta
+from database import extract_item_id, get_listing_details, save_listing_details
+from extractors import DESCRIPTION_EXTRACT_JS
+from near_duplicates import index_listing_details
+
+# How many detail pages the background prefetcher may have waiting
+PREFETCH_QUEUE_SIZE = 50
+
+# Seconds between background detail-page fetches (keeps us from hammering FB)
+PREFETCH_DELAY = 8
+
+# Runs in the page - pulls everything we want from a listing detail page in one go
+DETAIL_EXTRACT_JS = '''
+    () => {
+        const description = (__DESCRIPTION_EXTRACT_JS__)();
+
+        const pageText = document.body.innerText || '';
+
+        // "Condition" label is followed by its value on the next line
+        const conditionMatch = pageText.match(/Condition\\s*\\n\\s*([^\\n]{2,40})/);
+
+        // "Listed 3 days ago in Seymour, CT"
+        const postedMatch = pageText.match(/Listed\\s+(.{1,30}?ago)/);
+
+        // Photo carousel thumbnails
+        let photoCount = document.querySelectorAll('[aria-label^="Thumbnail"]').length;
+        if (!photoCount) {
+            const main = document.querySelector('div[role="main"]') || document.body;
+            const srcs = new Set();
+            main.querySelectorAll('img').forEach(img => {
+                if (img.naturalWidth >= 100 || img.width >= 100) {
+                    srcs.add(img.src);
+                }
+            });
+            photoCount = srcs.size;
+        }
+
+        return {
+            description: description,
+            condition: conditionMatch ? conditionMatch[1].trim() : null,
+            posted_text: postedMatch ? postedMatch[1].trim() : null,
+            photo_count: photoCount
+        };
+    }
+'''.replace('__DESCRIPTION_EXTRACT_JS__', DESCRIPTION_EXTRACT_JS.strip())
+
+UNIT_SECONDS = {
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+    'week': 7 * 86400,
+    'month': 30 * 86400,
+    'year': 365 * 86400
+}
+
+
+def parse_posted_time(posted_text, now=None):
+    """
+    Convert FB's relative "3 days ago" / "about an hour ago" into a timestamp
+
+    Returns:
+        str (ISO timestamp) or None if the text isn't recognised
+    """
+    if not posted_text:
+        return None
+
+    match = re.search(r'(\d+|an?|one)\s+(minute|hour|day|week|month|year)s?\s+ago',
+                      posted_text.lower())
+    if not match:
+        return None
+
+    amount = 1 if match.group(1) in ('a', 'an', 'one') else int(match.group(1))
+    now = now or datetime.now()
+    posted = now - timedelta(seconds=amount * UNIT_SECONDS[match.group(2)])
+    return posted.replace(microsecond=0).isoformat(sep=' ')
+
+
+async def extract_details(page):
+    """
+    Run the detail extractor against the currently loaded listing page
+
+    Returns:
+        dict: {'description', 'condition', 'photo_count', 'posted_at'}
+    """
+    raw = await page.evaluate(DETAIL_EXTRACT_JS)
+    return {
+        'description': raw.get('description'),
+        'condition': raw.get('condition'),
+        'photo_count': raw.get('photo_count'),
+        'posted_at': parse_posted_time(raw.get('posted_text'))
+    }
+
+
+async def enrich_listing_page(page):
+    """
+    Get detail data for the listing page the browser is on
+
+    Served from the database on repeat views; the page is only scraped the
+    first time we see a listing.
+
+    Returns:
+        dict or None if not on a listing page / extraction failed
+    """
+    url = page.url
+    if not extract_item_id(url):
+        return None
+
+    details = get_listing_details(url)
+    if details:
+        return details
+
+    try:
+        details = await extract_details(page)
+    except Exception as e:
+        print(f"   ⚠️  Detail extraction failed: {e}")
+        return None
+
+    if save_listing_details(url, details):
+        print(f"   🗂️  Stored details ({details['photo_count'] or 0} photos, "
+              f"condition: {details['condition'] or 'n/a'})")
+        if index_listing_details(url, details['description']):
+            print("   🔁 Description matches other listings (possible cross-post)")
+    return details
+
+
+class DetailPrefetcher:
+    """
+    Background queue that visits detail pages of newly discovered listings
+
+    Uses its own tab so the user's page is never navigated. The queue is bounded -
+    when it's full new URLs are dropped rather than piling up; they'll still be
+    enriched when the user opens them.
+    """
+
+    def __init__(self, context, maxsize=PREFETCH_QUEUE_SIZE, delay=PREFETCH_DELAY):
+        self.context = context
+        self.delay = delay
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.pending = set()
+        self.task = None
+        self.fetched = 0
+
+    def submit(self, listing_url):
+        """Queue a listing for enrichment. Returns False if dropped."""
+        item_id = extract_item_id(listing_url)
+        if not item_id or item_id in self.pending:
+            return False
+        try:
+            self.queue.put_nowait(listing_url)
+        except asyncio.QueueFull:
+            return False
+        self.pending.add(item_id)
+        return True
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._worker())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def _worker(self):
+        page = await self.context.new_page()
+        try:
+            while True:
+                listing_url = await self.queue.get()
+                try:
+                    if get_listing_details(listing_url):
+                        continue
+                    await page.goto(listing_url, wait_until='domcontentloaded', timeout=20000)
+                    await asyncio.sleep(2)  # let FB hydrate the description
+                    details = await extract_details(page)
+                    if save_listing_details(listing_url, details):
+                        self.fetched += 1
+                        index_listing_details(listing_url, details['description'])
+                    await asyncio.sleep(self.delay)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"   ⚠️  Prefetch failed for {listing_url}: {e}")
+                finally:
+                    self.pending.discard(extract_item_id(listing_url))
+                    self.queue.task_done()
+        finally:
+            await page.close()
@@ -2,172 +2,419 @@
 Background evaluator for FB Marketplace Scout
 Pulls unevaluated listings and scores them using Claude API (or simple heuristics for now)
 """
+import argparse
+import importlib.util
 import time
 import random
 import sqlite3
-from database import DB_PATH, get_unevaluated_listings, update_evaluation
+from database import (DB_PATH, init_db, get_unevaluated_listings, get_reevaluation_backlog,
+                      update_evaluation, parse_price, get_listing_stats)
+from backends import Backend, BackendUnavailable
+from response_parser import ResponseError, parse_batch, parse_evaluation
+from rubric import current_rubric
+from usage import record_usage, within_budget
+from comparables import price_against_comparables
+from sellers import get_seller_features, record_evaluation
+from metrics import counter, gauge, histogram, start_dumper
+import profiler
 import os
 
-# Check if Claude API key is available
+# Check if Claude API key is available (the client is created on first use -
+# importing anthropic alone takes most of a second)
 CLAUDE_API_KEY = os.environ.get('ANTHROPIC_API_KEY')
-USE_CLAUDE = CLAUDE_API_KEY is not None
+USE_CLAUDE = CLAUDE_API_KEY is not None and importlib.util.find_spec('anthropic') is not None
 
-if USE_CLAUDE:
-    try:
+# Local Ollama server (ollama_client.py) as the second tier - on when
+# OLLAMA_HOST or OLLAMA_MODEL is set, as docker-compose does
+OLLAMA_CONFIGURED = bool(os.environ.get('OLLAMA_HOST') or os.environ.get('OLLAMA_MODEL'))
+USE_OLLAMA = OLLAMA_CONFIGURED and importlib.util.find_spec('requests') is not None
+
+USE_LLM = USE_CLAUDE or USE_OLLAMA
+
+CLAUDE_MODEL = "claude-sonnet-4-20250514"
+
+# Response tokens allowed per buyer profile scored in the call
+MAX_TOKENS_PER_PROFILE = 200
+
+client = None
+backends = None
+
+EVALUATION_SECONDS = histogram('scout_evaluation_seconds', 'Time to score one listing, by mode')
+EVALUATIONS = counter('scout_evaluations_total', 'Listings scored, by mode')
+REEVALUATION_BACKLOG = gauge('scout_reevaluation_backlog', 'Heuristic-fallback listings waiting for an LLM score')
+PENDING_LISTINGS = gauge('scout_pending_listings', 'Listings waiting for evaluation')
+
+
+def get_client():
+    """The Anthropic client, created on first call"""
+    global client
+    if client is None:
         from anthropic import Anthropic
         client = Anthropic(api_key=CLAUDE_API_KEY)
-        print("✅ Claude API key found - using AI evaluation")
-    except ImportError:
-        USE_CLAUDE = False
-        print("⚠️  anthropic package not installed - using heuristic evaluation")
-else:
-    print("ℹ️  No ANTHROPIC_API_KEY found - using heuristic evaluation")
-    print("   To use AI evaluation: export ANTHROPIC_API_KEY='your-key'")
+    return client
 
 
-def evaluate_with_claude(listing):
-    """Use Claude API to evaluate a listing"""
-    try:
-        prompt = f"""You are evaluating a Facebook Marketplace listing for flip potential.
+def get_backends():
+    """LLM backends to try in order (Claude, then local), built on first call"""
+    global backends
+    if backends is None:
+        backends = []
+        if USE_CLAUDE:
+            backends.append(Backend('claude', evaluate_with_claude, gate=within_budget))
+        if USE_OLLAMA:
+            backends.append(Backend('ollama', evaluate_with_ollama))
+    return backends
 
-Item: {listing['title']}
+
+def llm_available():
+    """True if some LLM backend would take a call right now (no open breaker)"""
+    return any(backend.available() for backend in get_backends())
+
+
+def print_mode():
+    """Say which evaluation mode we're in and why"""
+    if USE_CLAUDE:
+        print("✅ Claude API key found - using AI evaluation")
+    elif CLAUDE_API_KEY:
+        print("⚠️  anthropic package not installed")
+    else:
+        print("ℹ️  No ANTHROPIC_API_KEY found")
+        print("   To use AI evaluation: export ANTHROPIC_API_KEY='your-key'")
+
+    if USE_OLLAMA:
+        print(f"🦙 Local model server configured ({os.environ.get('OLLAMA_HOST') or 'localhost'})"
+              f"{' as fallback' if USE_CLAUDE else ''}")
+    elif OLLAMA_CONFIGURED:
+        print("⚠️  OLLAMA_HOST is set but requests is not installed - pip install requests")
+
+    if not USE_LLM:
+        print("ℹ️  Using heuristic evaluation")
+
+
+def describe_details(details):
+    """Format enriched detail-page data as extra prompt lines"""
+    if not details:
+        return ''
+
+    lines = []
+    if details.get('condition'):
+        lines.append(f"Condition: {details['condition']}")
+    if details.get('photo_count') is not None:
+        lines.append(f"Photos: {details['photo_count']}")
+    if details.get('posted_at'):
+        lines.append(f"Posted: {details['posted_at']}")
+    if details.get('description'):
+        lines.append(f"Description: {details['description'][:1000]}")
+
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+def describe_comparables(comparables):
+    """Format the comparable-price summary as an extra prompt line"""
+    if not comparables:
+        return ''
+    return (f"Similar listings ({comparables['count']}): "
+            f"median ${comparables['median']:.0f}, "
+            f"typical range ${comparables['p25']:.0f}-${comparables['p75']:.0f}\n")
+
+
+def describe_duplicate(listing):
+    """Prompt line for listings whose text was found on other listings"""
+    if not listing.get('is_duplicate'):
+        return ''
+    return "Note: near-identical text appears on other listings (possible cross-posted scam)\n"
+
+
+def describe_seller(seller):
+    """Format seller reputation aggregates as an extra prompt line"""
+    if not seller or seller['listing_count'] < 2:
+        return ''
+    parts = [f"{seller['listing_count']} listings seen", f"~{seller['listings_per_day']:.1f}/day recently"]
+    if seller['duplicate_count']:
+        parts.append(f"{seller['duplicate_count']} flagged as duplicates")
+    if seller['median_price_ratio'] is not None:
+        parts.append(f"typically prices at {seller['median_price_ratio']:.0%} of similar items")
+    return f"Seller history: {', '.join(parts)}\n"
+
+
+def listing_prompt(listing):
+    """The per-listing part of the evaluation prompt"""
+    comparables = price_against_comparables(listing['title'], listing['price'], listing.get('id'))
+    seller = get_seller_features(listing['seller_name'])
+    return f"""Item: {listing['title']}
 Price: {listing['price']}
 Location: {listing['location']}
 Seller: {listing['seller_name']}
+{describe_details(listing.get('details'))}{describe_comparables(comparables)}{describe_duplicate(listing)}{describe_seller(seller)}"""
+
+
+def parse_response(text, rubric):
+    """
+    The evaluation in a model's answer - with several profiles, the first
+    profile's scores plus every profile's under 'profiles'
+
+    Profiles the answer left out are scored on a later pass (the listing is
+    queued for re-evaluation).
+
+    Raises:
+        ResponseError: no valid scores (for the first profile)
+    """
+    if not rubric.multi_profile:
+        return {**parse_evaluation(text), 'rubric_version': rubric.version}
+
+    results, _ = parse_batch(text, key='profile')
+    results = {str(name).strip().lower(): evaluation for name, evaluation in results.items()}
+    profiles = {}
+    for profile in rubric.profiles:
+        evaluation = results.get(profile.name.lower())
+        if evaluation:
+            profiles[profile.name] = {**evaluation, 'rubric_version': profile.version}
+
+    primary = rubric.profiles[0].name
+    if primary not in profiles:
+        raise ResponseError(f"no valid scores for profile {primary!r} in response: {(text or '')[:80]!r}")
+    result = {**profiles[primary], 'evaluation_data': text, 'rubric_version': rubric.version,
+              'profiles': profiles}
+    missing = [profile.name for profile in rubric.profiles if profile.name not in profiles]
+    if missing:
+        result['needs_reevaluation'] = f"no scores for {', '.join(missing)}"
+    return result
 
-User interests: electronics, film/darkroom gear, test equipment, weird items, bulk lots
-User location: Seymour, CT (prefers local pickup)
-
-Rate 1-10:
-1. Flip potential (resale value vs price, demand)
-2. Weirdness score (unique, interesting, unusual)
-3. Scam likelihood (price too low, generic description, red flags)
-
-Respond ONLY with JSON:
-{{
-  "flip_score": X,
-  "weirdness_score": X,
-  "scam_likelihood": X,
-  "notes": "one sentence explanation"
-}}"""
-
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=200,
-            messages=[{"role": "user", "content": prompt}]
-        )
-
-        # Parse response
-        import json
-        result = json.loads(response.content[0].text)
-
-        return {
-            'flip_score': result['flip_score'],
-            'weirdness_score': result['weirdness_score'],
-            'scam_likelihood': result['scam_likelihood'],
-            'evaluation_data': response.content[0].text,
-            'notes': result['notes']
-        }
 
-    except Exception as e:
-        print(f"   ⚠️  Claude API error: {e}")
-        return None
+def evaluate_with_claude(listing):
+    """
+    Use Claude API to evaluate a listing
+
+    The rubric's static system prompt is marked for prompt caching, so after the first
+    call it's read from the cache (at a tenth of the input price) instead of
+    being processed again - once it's long enough to qualify (1024 tokens
+    for Sonnet); shorter prompts are simply sent uncached.
+
+    Raises on any API or parse error - call it through a Backend for
+    retries and the circuit breaker.
+    """
+    rubric = current_rubric()
+    response = get_client().messages.create(
+        model=CLAUDE_MODEL,
+        max_tokens=MAX_TOKENS_PER_PROFILE * len(rubric.profiles),
+        system=[{"type": "text", "text": rubric.system_prompt, "cache_control": {"type": "ephemeral"}}],
+        messages=[{"role": "user", "content": listing_prompt(listing)}]
+    )
+
+    usage = response.usage
+    record_usage(listing.get('id'), 'claude', CLAUDE_MODEL, {
+        'input_tokens': usage.input_tokens,
+        'output_tokens': usage.output_tokens,
+        'cache_read_tokens': getattr(usage, 'cache_read_input_tokens', None) or 0,
+        'cache_write_tokens': getattr(usage, 'cache_creation_input_tokens', None) or 0,
+    })
+    return parse_response(response.content[0].text, rubric)
+
+
+def evaluate_with_ollama(listing):
+    """
+    Use the local Ollama server to evaluate a listing
+
+    The rubric goes in the system prompt, unchanged between calls, so the
+    server reuses its cached prefix and only processes the listing.
+    """
+    import ollama_client
+    rubric = current_rubric()
+    result = ollama_client.get_client().generate(listing_prompt(listing), system=rubric.system_prompt,
+                                                 format='json')
+    record_usage(listing.get('id'), 'ollama', result['model'], {
+        'input_tokens': result['prompt_tokens'],
+        'output_tokens': result['output_tokens'],
+    })
+    return parse_response(result['text'], rubric)
 
 
 def evaluate_with_heuristics(listing):
-    """Simple heuristic evaluation (fallback when no API key)"""
+    """
+    Simple heuristic evaluation (fallback when no API key)
+
+    With several buyer profiles in the rubric, the listing is read and
+    scanned for keywords once and scored for every profile from that; the
+    first profile's scores are returned, with all of them under 'profiles'.
+    """
     title = (listing['title'] or '').lower()
     price = listing['price'] or ''
     location = listing['location'] or ''
 
+    # Detail-page data (when the listing has been enriched)
+    details = listing.get('details') or {}
+    description = (details.get('description') or '').lower()
+    condition = (details.get('condition') or '').lower()
+    text = f"{title} {description} {condition}"
+
     # Extract price number
-    price_num = 0
-    try:
-        price_num = float(''.join(c for c in price if c.isdigit() or c == '.'))
-    except:
-        pass
+    price_num = parse_price(price) or 0
+
+    # What similar items usually go for (None until the cluster has enough listings)
+    comparables = price_against_comparables(listing['title'], price, listing.get('id'))
+    price_ratio = comparables['price_ratio'] if comparables else None
+
+    # Seller reputation (None for sellers we haven't seen or couldn't extract)
+    seller = get_seller_features(listing.get('seller_name'))
 
     # Flip potential heuristics
     flip_score = 5  # default
-    if any(word in title for word in ['vintage', 'antique', 'rare', 'estate']):
-        flip_score += 2
-    if any(word in title for word in ['bulk', 'lot of', 'collection']):
-        flip_score += 1
     if price_num > 0 and price_num < 50:
         flip_score += 1
     if 'free' in title or price_num == 0:
         flip_score += 2
+    if price_ratio is not None and price_num > 0:
+        if price_num < comparables['p25']:
+            flip_score += 2  # cheaper than 3/4 of similar listings
+        elif price_num > comparables['p75']:
+            flip_score -= 2  # priced above the market
 
     # Weirdness score heuristics
     weirdness_score = 3  # default
-    if any(word in title for word in ['tube', 'oscilloscope', 'darkroom', 'enlarger', 'film']):
-        weirdness_score += 4
-    if any(word in title for word in ['weird', 'strange', 'unusual', 'unique']):
-        weirdness_score += 3
-    if any(word in title for word in ['for parts', "doesn't work", 'broken']):
-        weirdness_score += 2
 
     # Scam likelihood heuristics
     scam_likelihood = 2  # default low
     if price_num > 0 and price_num < 10 and 'free' not in title:
         scam_likelihood += 3  # suspiciously cheap
-    if any(word in title for word in ['iphone', 'macbook', 'airpods', 'ps5', 'xbox']) and price_num < 200:
-        scam_likelihood += 5  # expensive items too cheap
     if not location or 'unknown' in location.lower():
         scam_likelihood += 1
+    if price_ratio is not None and 0 < price_ratio < 0.3:
+        scam_likelihood += 2  # far below what this item goes for
+    if details and (details.get('photo_count') or 0) <= 1:
+        scam_likelihood += 1  # single stock photo
+    if details and not description:
+        scam_likelihood += 1  # no description at all
+    if listing.get('is_duplicate'):
+        scam_likelihood += 3  # same text cross-posted under other listings
+    if seller:
+        if seller['listings_per_day'] >= 10:
+            scam_likelihood += 3  # posting in bulk
+        elif seller['listings_per_day'] >= 5:
+            scam_likelihood += 1
+        if seller['duplicate_count'] >= 2:
+            scam_likelihood += 2  # has cross-posted before
+        if seller['median_price_ratio'] is not None and seller['median_price_ratio'] < 0.4:
+            scam_likelihood += 1  # consistently far below market
+        if seller['mean_scam'] is not None and seller['mean_scam'] >= 7:
+            scam_likelihood += 1
+
+    # The rubric's keyword rules (interest- and buyer-specific words), one
+    # scan for every profile
+    rubric = current_rubric()
+    found = rubric.scan_keywords(title, text)
+
+    profiles = {}
+    for profile in rubric.profiles:
+        keywords = profile.keyword_points(found, price_num)
+
+        # Add the profile's keywords (e.g. cheap iPhones for scams) and cap scores at 10
+        flip = min(10, max(1, flip_score + keywords['flip_score']))
+        weird = min(10, max(1, weirdness_score + keywords['weirdness_score']))
+        scam = min(10, max(1, scam_likelihood + keywords['scam_likelihood']))
+
+        # Generate notes
+        notes_parts = []
+        if flip >= 7:
+            notes_parts.append("Good flip potential")
+        if price_ratio is not None and price_num > 0 and price_num < comparables['p25']:
+            notes_parts.append(f"Below comparables (median ${comparables['median']:.0f})")
+        if weird >= 7:
+            notes_parts.append("Interesting/unique item")
+        if listing.get('is_duplicate'):
+            notes_parts.append("Text duplicated across listings")
+        if seller and seller['listings_per_day'] >= 5:
+            notes_parts.append(f"High-volume seller (~{seller['listings_per_day']:.0f} listings/day)")
+        if scam >= 7:
+            notes_parts.append("⚠️ Possible scam")
+        elif scam >= 4:
+            notes_parts.append("Check carefully")
+
+        profiles[profile.name] = {
+            'flip_score': flip,
+            'weirdness_score': weird,
+            'scam_likelihood': scam,
+            'notes': ". ".join(notes_parts) if notes_parts else "Standard listing",
+            'rubric_version': profile.version
+        }
 
-    # Cap scores at 10
-    flip_score = min(10, max(1, flip_score))
-    weirdness_score = min(10, max(1, weirdness_score))
-    scam_likelihood = min(10, max(1, scam_likelihood))
-
-    # Generate notes
-    notes_parts = []
-    if flip_score >= 7:
-        notes_parts.append("Good flip potential")
-    if weirdness_score >= 7:
-        notes_parts.append("Interesting/unique item")
-    if scam_likelihood >= 7:
-        notes_parts.append("⚠️ Possible scam")
-    elif scam_likelihood >= 4:
-        notes_parts.append("Check carefully")
-
-    notes = ". ".join(notes_parts) if notes_parts else "Standard listing"
-
-    return {
-        'flip_score': flip_score,
-        'weirdness_score': weirdness_score,
-        'scam_likelihood': scam_likelihood,
+    result = {
+        **profiles[rubric.profiles[0].name],
         'evaluation_data': 'heuristic',
-        'notes': notes
+        'rubric_version': rubric.version
     }
+    if rubric.multi_profile:
+        result['profiles'] = profiles
+    return result
+
+
+def evaluate_with_llm(listing):
+    """
+    Score with the first LLM backend that answers
+
+    Returns:
+        dict, or None if every backend failed or is switched off by its breaker
+    """
+    for backend in get_backends():
+        try:
+            with EVALUATION_SECONDS.time(mode=backend.name):
+                result = backend.evaluate(listing)
+        except BackendUnavailable:
+            continue
+        EVALUATIONS.inc(mode=backend.name)
+        return result
+    return None
+
+
+def heuristic_fallback(heuristic, reason='llm unavailable'):
+    """Heuristic scores standing in for an LLM score - queued to be redone"""
+    return {**heuristic, 'needs_reevaluation': reason}
 
 
 def evaluate_listing(listing):
     """Evaluate a listing using Claude or heuristics"""
-    if USE_CLAUDE:
-        result = evaluate_with_claude(listing)
-        if result:
-            return result
+    result = evaluate_with_llm(listing)
+    if result:
+        return result
 
     # Fallback to heuristics
-    return evaluate_with_heuristics(listing)
+    with EVALUATION_SECONDS.time(mode='heuristic'):
+        result = evaluate_with_heuristics(listing)
+    EVALUATIONS.inc(mode='heuristic')
+    return heuristic_fallback(result) if get_backends() else result
+
+
+def save_evaluation(listing, evaluation):
+    """Store a listing's scores and fold them into its seller's reputation"""
+    update_evaluation(listing['id'], evaluation)
+    record_evaluation(listing['seller_name'], evaluation['scam_likelihood'],
+                      previous=listing.get('scam_likelihood'))
 
 
 def run_evaluator():
     """Main evaluation loop"""
+    print_mode()
+    init_db()
     print("🤖 FB Marketplace Scout Evaluator")
     print("=" * 60)
-    print(f"Mode: {'AI (Claude)' if USE_CLAUDE else 'Heuristics'}")
+    print(f"Mode: {' + '.join(backend.name for backend in get_backends()) or 'Heuristics'}")
     print("=" * 60)
     print()
 
     evaluated_count = 0
+    start_dumper('evaluator')
 
     while True:
         try:
-            # Get unevaluated listings
+            # Get unevaluated listings - or, with nothing new and an LLM
+            # backend answering, ones that fell back to heuristics earlier
             listings = get_unevaluated_listings(limit=5)
+            stats = get_listing_stats()
+            PENDING_LISTINGS.set(stats['pending'])
+            REEVALUATION_BACKLOG.set(stats['needs_reevaluation'])
+
+            if not listings and stats['needs_reevaluation'] and llm_available():
+                listings = get_reevaluation_backlog(limit=5)
+                print(f"🔁 Backfilling {len(listings)} of {stats['needs_reevaluation']} heuristic-fallback listings")
 
             if not listings:
                 print("⏸️  No pending listings. Waiting 30s...")
@@ -183,13 +430,16 @@ def run_evaluator():
 
                 if evaluation:
                     # Update database
-                    update_evaluation(listing['id'], evaluation)
+                    save_evaluation(listing, evaluation)
                     evaluated_count += 1
 
                     print(f"   ✅ Flip: {evaluation['flip_score']}/10 | "
                           f"Weird: {evaluation['weirdness_score']}/10 | "
                           f"Scam: {evaluation['scam_likelihood']}/10")
                     print(f"   📝 {evaluation['notes']}")
+                    for profile, scores in list(evaluation.get('profiles', {}).items())[1:]:
+                        print(f"   👤 {profile}: Flip {scores['flip_score']} | "
+                              f"Weird {scores['weirdness_score']} | Scam {scores['scam_likelihood']}")
 
                     # Random delay between evaluations (30s - 5min)
                     delay = random.randint(30, 300)
@@ -208,4 +458,7 @@ def run_evaluator():
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Evaluate pending listings')
+    profiler.add_arguments(parser)
+    profiler.install_from_args('evaluator', parser.parse_args())
     run_evaluator()
@@ -0,0 +1,137 @@
+"""
+Shared in-page extractors for FB Marketplace Scout
+JavaScript snippets passed to page.evaluate() by the watchers and enrichment stage
+"""
+
+# Finds the seller's description on a listing detail page.
+#
+# Walks the DOM once with a TreeWalker (button/link/script subtrees are rejected
+# outright), sums text-node lengths bottom-up so no element's textContent is read
+# during the scan, then only calls textContent on the handful of winning
+# candidates. If the "Details"/"Description" heading is found, candidates are
+# limited to that section.
+DESCRIPTION_EXTRACT_JS = '''
+    (root) => {
+        root = root || document.querySelector('div[role="main"]') || document.body;
+        if (!root) return null;
+
+        const SKIP_TAGS = new Set(['BUTTON', 'A', 'SCRIPT', 'STYLE', 'NOSCRIPT', 'SVG', 'svg', 'NAV']);
+        const BLOCK_TAGS = new Set(['DIV', 'SPAN', 'P']);
+        const ANCHORS = new Set(['Details', 'Description', "Seller's description"]);
+        const UI_TEXT = ['Send seller a message', 'Save to list', 'Send seller', 'Save to'];
+
+        const walker = document.createTreeWalker(
+            root,
+            NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT,
+            {
+                acceptNode(node) {
+                    if (node.nodeType === 1 &&
+                        (SKIP_TAGS.has(node.tagName) || node.getAttribute('role') === 'button')) {
+                        return NodeFilter.FILTER_REJECT;
+                    }
+                    return NodeFilter.FILTER_ACCEPT;
+                }
+            }
+        );
+
+        // Pre-order pass: element list with parent indices, text lengths on owners
+        const elements = [root];
+        const parents = [-1];
+        const lengths = [0];
+        const indexOf = new Map([[root, 0]]);
+        let anchor = null;
+
+        let node = walker.nextNode();
+        while (node) {
+            const parentIndex = indexOf.get(node.parentNode);
+            if (node.nodeType === 3) {
+                if (parentIndex !== undefined) {
+                    const value = node.nodeValue;
+                    lengths[parentIndex] += value.length;
+                    if (!anchor && value.length < 30 && ANCHORS.has(value.trim())) {
+                        anchor = node.parentNode;
+                    }
+                }
+            } else if (parentIndex !== undefined) {
+                indexOf.set(node, elements.length);
+                elements.push(node);
+                parents.push(parentIndex);
+                lengths.push(0);
+            }
+            node = walker.nextNode();
+        }
+
+        // Bottom-up: children always come after their parent in pre-order
+        for (let i = elements.length - 1; i > 0; i--) {
+            lengths[parents[i]] += lengths[i];
+        }
+
+        // Limit the search to the section around the description heading
+        let section = null;
+        if (anchor) {
+            section = anchor;
+            for (let i = 0; i < 6 && section.parentElement && section !== root; i++) {
+                section = section.parentElement;
+                const index = indexOf.get(section);
+                if (index !== undefined && lengths[index] - (anchor.textContent || '').length >= 60) {
+                    break;
+                }
+            }
+        }
+
+        const pick = (scope) => {
+            const candidates = [];
+            for (let i = 1; i < elements.length; i++) {
+                const el = elements[i];
+                if (!BLOCK_TAGS.has(el.tagName)) continue;
+                if (lengths[i] < 30 || lengths[i] > 3000) continue;
+                if (scope && (!scope.contains(el) || el.contains(anchor))) continue;
+                candidates.push(i);
+            }
+            candidates.sort((a, b) => lengths[b] - lengths[a]);
+
+            for (const i of candidates.slice(0, 12)) {
+                const text = (elements[i].textContent || '').trim();
+                if (text.length < 30) continue;
+                if (/\\$\\d+/.test(text) && text.length < 100) continue;
+                if (UI_TEXT.some(ui => text.includes(ui))) continue;
+                return text;
+            }
+            return null;
+        };
+
+        return (section && pick(section)) || pick(null);
+    }
+'''
+
+# The original "longest textContent" heuristic - kept only so bench-extractor.py
+# can compare against it
+LEGACY_DESCRIPTION_EXTRACT_JS = '''
+    () => {
+        let longestText = '';
+        document.querySelectorAll('div, span, p').forEach(el => {
+            const text = el.textContent?.trim() || '';
+            const parent = el.parentElement;
+
+            if (el.tagName === 'BUTTON' || el.tagName === 'A' ||
+                parent?.tagName === 'BUTTON' || parent?.tagName === 'A' ||
+                el.getAttribute('role') === 'button') {
+                return;
+            }
+
+            if (text.length < 30 || text.length > 3000) {
+                return;
+            }
+
+            if (text.match(/\\$\\d+/) && text.length < 100) {
+                return;
+            }
+
+            if (text.length > longestText.length) {
+                longestText = text;
+            }
+        });
+
+        return longestText || null;
+    }
+'''
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Lightweight metrics for FB Marketplace Scout
+Counters, gauges and fixed-bucket histograms kept in memory, rendered in
+Prometheus text format
+
+The watcher, evaluator and server are separate processes, so each one dumps
+its metrics as JSON to METRICS_DIR/<process>.json every few seconds
+(start_dumper) and server.py's /metrics merges them with its own.
+
+Usage:
+    python3 metrics.py                   # print merged metrics from all dumps
+    python3 metrics.py --out scout.prom  # write them to a file
+"""
+import argparse
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_DIR = os.environ.get('SCOUT_METRICS_DIR') or os.path.join(os.path.dirname(__file__), 'metrics')
+
+# Seconds - covers a sub-millisecond DB write up to a slow API call
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Items per batch (cards per scan, listings per fetch)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+DUMP_INTERVAL_SECONDS = 15
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def state(self):
+        with self.lock:
+            return [[dict(key), value] for key, value in self.values.items()]
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[_label_key(labels)] = value
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.series = {}  # label key -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the with-block takes, in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def state(self):
+        with self.lock:
+            return [[dict(key), list(series)] for key, series in self.series.items()]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.process = None
+
+    def _get(self, cls, name, help, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, **kwargs)
+            return metric
+
+    def counter(self, name, help):
+        return self._get(Counter, name, help)
+
+    def gauge(self, name, help):
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def state(self):
+        """JSON-serializable snapshot of every metric"""
+        return {
+            'process': self.process,
+            'pid': os.getpid(),
+            'dumped_at': time.time(),
+            'metrics': {
+                name: {
+                    'type': metric.type,
+                    'help': metric.help,
+                    'buckets': list(getattr(metric, 'buckets', [])),
+                    'series': metric.state()
+                }
+                for name, metric in list(self.metrics.items())
+            }
+        }
+
+    def dump(self, path=None):
+        """Write the snapshot atomically (readers never see a half-written file)"""
+        path = path or os.path.join(METRICS_DIR, f'{self.process or os.getpid()}.json')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.state(), f)
+        os.replace(tmp, path)
+        return path
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+def start_dumper(process, interval=DUMP_INTERVAL_SECONDS):
+    """
+    Name this process and dump its metrics every `interval` seconds (and at exit)
+
+    Safe to call more than once; only the first call starts the thread.
+    """
+    if REGISTRY.process:
+        return
+    REGISTRY.process = process
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                REGISTRY.dump()
+            except OSError as e:
+                print(f"⚠️  Couldn't write metrics: {e}")
+
+    threading.Thread(target=loop, name='metrics-dumper', daemon=True).start()
+    atexit.register(REGISTRY.dump)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(states):
+    """
+    Prometheus text exposition for one or more registry snapshots
+
+    Series from each snapshot get a process label, and each metric family's
+    HELP/TYPE is written once even if several processes report it.
+    """
+    families = {}
+    for state in states:
+        process = state.get('process') or str(state.get('pid'))
+        for name, metric in state['metrics'].items():
+            family = families.setdefault(name, {'type': metric['type'], 'help': metric['help'],
+                                                'buckets': metric['buckets'], 'series': []})
+            for labels, value in metric['series']:
+                family['series'].append(({**labels, 'process': process}, value))
+
+    lines = []
+    for name in sorted(families):
+        family = families[name]
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for labels, value in family['series']:
+            if family['type'] != 'histogram':
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(family['buckets'], value):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {value[-1]}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value[-2])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {value[-1]}")
+
+    # When each process last reported - a stale one has stopped or hung
+    lines.append('# HELP scout_metrics_dumped_at_seconds Unix time each process last reported metrics')
+    lines.append('# TYPE scout_metrics_dumped_at_seconds gauge')
+    for state in states:
+        process = state.get('process') or str(state.get('pid'))
+        lines.append(f'scout_metrics_dumped_at_seconds{_format_labels({"process": process})} {state["dumped_at"]:.3f}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def load_dumps(exclude_process=None):
+    """Read every process's last dump from METRICS_DIR"""
+    states = []
+    for path in sorted(glob.glob(os.path.join(METRICS_DIR, '*.json'))):
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if exclude_process and state.get('process') == exclude_process:
+            continue
+        states.append(state)
+    return states
+
+
+def render_all():
+    """This process's live metrics plus every other process's last dump"""
+    return render([REGISTRY.state()] + load_dumps(exclude_process=REGISTRY.process))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print merged Scout metrics')
+    parser.add_argument('--out', help='write to this file instead of stdout')
+    args = parser.parse_args()
+
+    text = render(load_dumps())
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text)
+        print(f"✅ Wrote metrics to {args.out}")
+    else:
+        print(text, end='')
+
+
+if __name__ == '__main__':
+    main()
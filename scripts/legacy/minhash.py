@@ -0,0 +1,100 @@
+"""
+MinHash signatures and LSH banding for listing text
+Used by the comparables engine (title clusters) and near-duplicate detection
+"""
+import hashlib
+import random
+import re
+from array import array
+
+# 2^61 - 1, the usual Mersenne prime for universal hashing
+PRIME = (1 << 61) - 1
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+STOPWORDS = {
+    'a', 'an', 'and', 'the', 'for', 'with', 'of', 'in', 'on', 'to', 'or', 'is',
+    'obo', 'sale', 'selling', 'must', 'go', 'pick', 'up', 'pickup', 'only'
+}
+
+
+def tokenize(text, extra_stopwords=()):
+    """Lowercase alphanumeric tokens with filler words removed"""
+    return [
+        t for t in TOKEN_RE.findall((text or '').lower())
+        if t not in STOPWORDS and t not in extra_stopwords
+    ]
+
+
+def shingles(tokens, size=1):
+    """Word n-grams of the given size (unigrams when size=1)"""
+    if size <= 1 or len(tokens) < size:
+        return set(tokens)
+    return {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def stable_hash(value):
+    """63-bit hash that's the same in every process (unlike hash() on str)"""
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big') >> 1
+
+
+class MinHasher:
+    """
+    Fixed family of permutations - signatures are only comparable between
+    hashers built with the same num_perm and seed
+    """
+
+    def __init__(self, num_perm=32, bands=16, seed=1):
+        if num_perm % bands:
+            raise ValueError('num_perm must be a multiple of bands')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = random.Random(seed)
+        self.perms = [(rng.randrange(1, PRIME), rng.randrange(0, PRIME)) for _ in range(num_perm)]
+
+    def signature(self, features):
+        """
+        MinHash signature of a set of string features
+
+        Returns:
+            array('Q') of num_perm values (empty set -> all max values)
+        """
+        hashes = [stable_hash(f) for f in features]
+        if not hashes:
+            return array('Q', [PRIME] * self.num_perm)
+        return array('Q', [
+            min((a * h + b) % PRIME for h in hashes)
+            for a, b in self.perms
+        ])
+
+    def band_keys(self, signature):
+        """
+        One bucket key per band - two signatures sharing any key are LSH candidates
+
+        Returns:
+            list of (band_index, bucket) tuples
+        """
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            keys.append((band, int.from_bytes(
+                hashlib.blake2b(rows.tobytes(), digest_size=8).digest(), 'big') >> 1))
+        return keys
+
+    @staticmethod
+    def similarity(sig_a, sig_b):
+        """Estimated Jaccard similarity of two signatures"""
+        if not sig_a or len(sig_a) != len(sig_b):
+            return 0.0
+        return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+    @staticmethod
+    def to_blob(signature):
+        return signature.tobytes()
+
+    @staticmethod
+    def from_blob(blob):
+        signature = array('Q')
+        signature.frombytes(blob)
+        return signature
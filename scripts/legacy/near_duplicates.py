@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate text detection for FB Marketplace Scout
+Catches the same scam text cross-posted under slightly different titles and new
+URLs - something the exact-phash image check can't see
+
+Each listing's title + description is reduced to a MinHash signature over word
+pairs and filed into LSH buckets in SQLite. A new listing only has to probe its
+own buckets (one primary-key lookup per band), so insert cost stays flat as the
+table grows.
+
+Usage:
+    python3 near_duplicates.py --rebuild        # index every listing already in the DB
+    python3 near_duplicates.py --rebucket       # re-file stored signatures after changing HASHER's bands
+    python3 near_duplicates.py --show 1234      # near-duplicates of listing 1234
+"""
+import argparse
+import sqlite3
+from database import DB_PATH, init_db, extract_item_id, normalize_listing_url
+from minhash import MinHasher, tokenize, shingles
+from sellers import record_duplicates
+
+# 16 bands of 4 rows: a pair becomes a candidate with probability
+# 1 - (1 - s^4)^16 - 99% at 70% similarity, 64% at 50%, 12% at 30% - so the
+# S-curve sits below DUPLICATE_THRESHOLD and pairs above it are nearly always
+# compared. Candidates are then checked against the threshold exactly.
+# Changing bands re-files the stored signatures (see ensure_band_layout);
+# changing num_perm or seed needs --rebuild.
+HASHER = MinHasher(num_perm=64, bands=16, seed=7)
+DUPLICATE_THRESHOLD = 0.7
+
+# Short titles ("iPhone 12 64GB") legitimately repeat - only texts with at least
+# this many words are compared
+MIN_TOKENS = 12
+
+# Candidates read per bucket - a bucket this full is already a flood of copies
+MAX_BUCKET_CANDIDATES = 50
+
+
+def text_signature(title, description=None):
+    """
+    MinHash signature of a listing's text
+
+    Returns:
+        array('Q') or None if the text is too short to compare
+    """
+    tokens = tokenize(f"{title or ''} {description or ''}")
+    if len(tokens) < MIN_TOKENS:
+        return None
+    return HASHER.signature(shingles(tokens, 2))
+
+
+# Set once text_lsh is known to use HASHER's band layout
+_layout_checked = False
+
+
+def rebucket_index(conn):
+    """
+    Re-file every stored signature under HASHER's current bands (the
+    signatures themselves don't depend on the banding)
+
+    Returns:
+        int: listings re-filed
+    """
+    c = conn.cursor()
+    c.execute('DELETE FROM text_lsh')
+    c.execute('SELECT listing_id, signature FROM text_signatures')
+    rows = c.fetchall()
+    c.executemany('INSERT OR IGNORE INTO text_lsh (band, bucket, listing_id) VALUES (?, ?, ?)', [
+        (band, bucket, listing_id)
+        for listing_id, blob in rows
+        for band, bucket in HASHER.band_keys(MinHasher.from_blob(blob))
+    ])
+    conn.commit()
+    return len(rows)
+
+
+def ensure_band_layout(conn):
+    """
+    Re-file the index if it was built with a different number of bands, so
+    old and new bucket keys never mix (checked once per process)
+    """
+    global _layout_checked
+    if _layout_checked:
+        return
+    c = conn.cursor()
+    c.execute('SELECT MAX(band) FROM text_lsh')
+    top_band = c.fetchone()[0]
+    if top_band is not None and top_band != HASHER.bands - 1:
+        count = rebucket_index(conn)
+        print(f"🔁 Re-filed {count} text signatures into {HASHER.bands} LSH bands (was {top_band + 1})")
+    _layout_checked = True
+
+
+def find_near_duplicates(c, signature, exclude_id=None):
+    """
+    Listings whose text signature is close to this one
+
+    Returns:
+        list of (listing_id, similarity), most similar first
+    """
+    candidates = set()
+    for band, bucket in HASHER.band_keys(signature):
+        c.execute('SELECT listing_id FROM text_lsh WHERE band = ? AND bucket = ? LIMIT ?',
+                  (band, bucket, MAX_BUCKET_CANDIDATES))
+        candidates.update(row[0] for row in c.fetchall())
+    candidates.discard(exclude_id)
+
+    matches = []
+    for listing_id in candidates:
+        c.execute('SELECT signature FROM text_signatures WHERE listing_id = ?', (listing_id,))
+        row = c.fetchone()
+        if row:
+            similarity = HASHER.similarity(signature, MinHasher.from_blob(row[0]))
+            if similarity >= DUPLICATE_THRESHOLD:
+                matches.append((listing_id, similarity))
+
+    matches.sort(key=lambda m: -m[1])
+    return matches
+
+
+def index_listing(listing_id, title, description=None, conn=None):
+    """
+    Add (or refresh) a listing in the text index and flag near-duplicates
+
+    Called on ingest with whatever text we have, and again once the detail
+    page's description arrives. Newly flagged listings are queued for
+    re-evaluation so their scam score picks up the duplicate.
+
+    Returns:
+        list of (listing_id, similarity) near-duplicates found
+    """
+    signature = text_signature(title, description)
+    if signature is None:
+        return []
+
+    own_conn = conn is None
+    conn = conn or sqlite3.connect(DB_PATH)
+    try:
+        ensure_band_layout(conn)
+        c = conn.cursor()
+
+        # Drop the listing's old buckets if it was indexed with less text
+        c.execute('SELECT signature FROM text_signatures WHERE listing_id = ?', (listing_id,))
+        row = c.fetchone()
+        if row:
+            old = MinHasher.from_blob(row[0])
+            if old == signature:
+                return []
+            c.executemany('DELETE FROM text_lsh WHERE band = ? AND bucket = ? AND listing_id = ?',
+                          [(band, bucket, listing_id) for band, bucket in HASHER.band_keys(old)])
+
+        matches = find_near_duplicates(c, signature, exclude_id=listing_id)
+
+        c.execute('INSERT OR REPLACE INTO text_signatures (listing_id, signature) VALUES (?, ?)',
+                  (listing_id, MinHasher.to_blob(signature)))
+        c.executemany('INSERT OR IGNORE INTO text_lsh (band, bucket, listing_id) VALUES (?, ?, ?)',
+                      [(band, bucket, listing_id) for band, bucket in HASHER.band_keys(signature)])
+
+        if matches:
+            ids = [listing_id] + [m[0] for m in matches]
+            placeholders = ','.join('?' * len(ids))
+            c.execute(f'SELECT id FROM listings WHERE is_duplicate = 0 AND id IN ({placeholders})', ids)
+            newly_flagged = [row[0] for row in c.fetchall()]
+            if newly_flagged:
+                c.execute(f'''
+                    UPDATE listings SET is_duplicate = 1, evaluated = 0
+                    WHERE id IN ({','.join('?' * len(newly_flagged))})
+                ''', newly_flagged)
+                record_duplicates(newly_flagged, conn)
+
+        conn.commit()
+        return matches
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def index_listing_details(listing_url, description):
+    """
+    Re-index a listing once its detail-page description is known
+
+    Returns:
+        list of (listing_id, similarity) near-duplicates found
+    """
+    if not description or not extract_item_id(listing_url):
+        return []
+
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        c = conn.cursor()
+        c.execute('SELECT id, title FROM listings WHERE listing_url = ?', (normalize_listing_url(listing_url),))
+        row = c.fetchone()
+        if not row:
+            return []  # not ingested yet - indexed with its description on ingest
+        return index_listing(row[0], row[1], description, conn)
+    finally:
+        conn.close()
+
+
+def rebuild_index():
+    """Clear and rebuild the text index from every listing in the database"""
+    init_db()
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('DELETE FROM text_signatures')
+    c.execute('DELETE FROM text_lsh')
+    c.execute('UPDATE listings SET is_duplicate = 0')
+    c.execute('UPDATE sellers SET duplicate_count = 0')
+    conn.commit()
+
+    c.execute('SELECT item_id, description FROM listing_details WHERE description IS NOT NULL')
+    descriptions = dict(c.fetchall())
+
+    c.execute('SELECT id, listing_url, title FROM listings ORDER BY id')
+    rows = c.fetchall()
+    for listing_id, listing_url, title in rows:
+        index_listing(listing_id, title, descriptions.get(extract_item_id(listing_url)), conn)
+
+    c.execute('SELECT COUNT(*) FROM text_signatures')
+    indexed = c.fetchone()[0]
+    c.execute('SELECT COUNT(*) FROM listings WHERE is_duplicate = 1')
+    duplicates = c.fetchone()[0]
+    conn.close()
+    print(f"✅ Indexed {indexed} of {len(rows)} listings - {duplicates} flagged as near-duplicates")
+
+
+def show_duplicates(listing_id):
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('SELECT signature FROM text_signatures WHERE listing_id = ?', (listing_id,))
+    row = c.fetchone()
+    if not row:
+        conn.close()
+        print(f"ℹ️  Listing {listing_id} isn't in the text index (too little text?)")
+        return
+
+    ensure_band_layout(conn)
+    matches = find_near_duplicates(c, MinHasher.from_blob(row[0]), exclude_id=listing_id)
+    for other_id, similarity in matches:
+        c.execute('SELECT title, price, listing_url FROM listings WHERE id = ?', (other_id,))
+        title, price, url = c.fetchone() or ('?', '?', '?')
+        print(f"🔁 {similarity:.0%} #{other_id} {title} - {price}")
+        print(f"   {url}")
+    conn.close()
+    if not matches:
+        print("✅ No near-duplicates")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Near-duplicate listing text index')
+    parser.add_argument('--rebuild', action='store_true', help='rebuild the index from all listings')
+    parser.add_argument('--rebucket', action='store_true',
+                        help="re-file stored signatures under HASHER's bands (after changing them)")
+    parser.add_argument('--show', type=int, metavar='LISTING_ID', help='list near-duplicates of a listing')
+    args = parser.parse_args()
+
+    if args.rebuild:
+        rebuild_index()
+    if args.rebucket:
+        init_db()
+        conn = sqlite3.connect(DB_PATH)
+        count = rebucket_index(conn)
+        conn.close()
+        print(f"✅ Re-filed {count} text signatures into {HASHER.bands} LSH bands")
+    if args.show:
+        show_duplicates(args.show)
+
+
+if __name__ == '__main__':
+    main()
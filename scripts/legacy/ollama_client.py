@@ -0,0 +1,168 @@
+"""
+Client for an Ollama-compatible local model server (the free second-tier
+evaluator from docker-compose)
+
+One pooled keep-alive session is shared by every caller, and a semaphore caps
+requests in flight at the server's parallel slots (OLLAMA_NUM_PARALLEL) -
+more than that just queue inside Ollama, holding a connection and eating the
+client timeout. Responses are streamed and parsed line by line as NDJSON.
+
+Prompt reuse: the model is kept loaded between calls (keep_alive), and the
+static rubric goes in `system` ahead of the per-listing text, so every
+request starts with the same tokens and the server's prompt cache skips
+re-processing them.
+
+Usage:
+    python3 ollama_client.py                 # which server/model would be used
+    python3 ollama_client.py "Say hi"        # one streamed generation
+"""
+import json
+import os
+import sys
+import threading
+import time
+from metrics import counter, histogram
+
+OLLAMA_HOST = os.environ.get('OLLAMA_HOST') or 'http://localhost:11434'
+
+# Model to use (default: first installed one matching OLLAMA_PREFERRED)
+OLLAMA_MODEL = os.environ.get('OLLAMA_MODEL')
+OLLAMA_PREFERRED = ('mistral', 'llama3', 'llama2')
+
+# Requests in flight at once - match the server's OLLAMA_NUM_PARALLEL
+OLLAMA_PARALLEL = int(os.environ.get('OLLAMA_NUM_PARALLEL') or 4)
+
+# How long the server keeps the model (and its prompt cache) loaded after a call
+KEEP_ALIVE = os.environ.get('OLLAMA_KEEP_ALIVE') or '30m'
+
+# Seconds to connect, and to wait for the next streamed line (model load included)
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 120
+
+# Generation options - low temperature keeps the JSON well-formed
+OPTIONS = {'temperature': 0.2, 'num_predict': 300}
+
+OLLAMA_TOKENS = counter('scout_ollama_tokens_total', 'Tokens processed by the local model, by kind')
+OLLAMA_FIRST_TOKEN = histogram('scout_ollama_first_token_seconds', 'Time to the first streamed token')
+
+
+class OllamaError(Exception):
+    """Error response from the server (status_code lets backends.py decide whether to retry)"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class OllamaClient:
+    def __init__(self, host=OLLAMA_HOST, model=OLLAMA_MODEL, parallel=OLLAMA_PARALLEL, keep_alive=KEEP_ALIVE):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.host = host.rstrip('/')
+        self._model = model
+        self.keep_alive = keep_alive
+        self.slots = threading.BoundedSemaphore(parallel)
+        self.session = requests.Session()
+        # One pool, big enough that every slot keeps its own connection open
+        self.session.mount(self.host, HTTPAdapter(pool_connections=1, pool_maxsize=parallel))
+
+    def _check(self, response):
+        if response.status_code >= 400:
+            try:
+                message = response.json().get('error') or response.reason
+            except ValueError:
+                message = response.reason
+            raise OllamaError(f"{response.status_code} {message}", response.status_code)
+
+    def model(self):
+        """The configured model, or the best installed one (looked up once)"""
+        if self._model is None:
+            response = self.session.get(f'{self.host}/api/tags', timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+            self._check(response)
+            names = [m['name'] for m in response.json().get('models', [])]
+            if not names:
+                raise OllamaError('no models installed - run `ollama pull mistral`')
+            preferred = [n for pref in OLLAMA_PREFERRED for n in names if pref in n.lower()]
+            self._model = (preferred or names)[0]
+        return self._model
+
+    def generate(self, prompt, system=None, format=None, options=None):
+        """
+        Run one generation, streaming the response
+
+        Args:
+            prompt (str): per-call text
+            system (str): static instructions - keep identical between calls
+                so the server can reuse its cached prefix
+            format (str): 'json' to constrain the output to valid JSON
+
+        Returns:
+            dict: {'text', 'model', 'prompt_tokens', 'output_tokens', 'seconds'}
+        """
+        body = {
+            'model': self.model(),
+            'prompt': prompt,
+            'stream': True,
+            'keep_alive': self.keep_alive,
+            'options': {**OPTIONS, **(options or {})},
+        }
+        if system:
+            body['system'] = system
+        if format:
+            body['format'] = format
+
+        with self.slots:
+            started = time.perf_counter()
+            with self.session.post(f'{self.host}/api/generate', json=body, stream=True,
+                                   timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)) as response:
+                self._check(response)
+                parts, final = [], None
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if 'error' in chunk:
+                        raise OllamaError(chunk['error'])
+                    if not parts:
+                        OLLAMA_FIRST_TOKEN.observe(time.perf_counter() - started)
+                    parts.append(chunk.get('response', ''))
+                    if chunk.get('done'):
+                        final = chunk  # read on to the end so the connection goes back to the pool
+
+        if final is None:
+            raise OllamaError('stream ended before the response was done')
+
+        prompt_tokens = final.get('prompt_eval_count', 0)
+        output_tokens = final.get('eval_count', 0)
+        OLLAMA_TOKENS.inc(prompt_tokens, kind='prompt')
+        OLLAMA_TOKENS.inc(output_tokens, kind='output')
+        return {
+            'text': ''.join(parts),
+            'model': body['model'],
+            'prompt_tokens': prompt_tokens,
+            'output_tokens': output_tokens,
+            'seconds': time.perf_counter() - started,
+        }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The shared client, created on first call"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OllamaClient()
+    return _client
+
+
+if __name__ == '__main__':
+    client = get_client()
+    print(f"🦙 {client.host} - model {client.model()}, {OLLAMA_PARALLEL} parallel slots, keep_alive {KEEP_ALIVE}")
+    if len(sys.argv) > 1:
+        result = client.generate(' '.join(sys.argv[1:]))
+        print(result['text'])
+        print(f"\n⏱️  {result['seconds']:.1f}s, {result['prompt_tokens']} prompt + {result['output_tokens']} output tokens")
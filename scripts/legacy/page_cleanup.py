@@ -0,0 +1,141 @@
+"""
+Ad removal and sidebar hiding for FB Marketplace pages
+Installed with page.add_init_script() so it runs in every document the browser loads
+"""
+
+# Watches the DOM with a MutationObserver and only looks at subtrees that were just
+# added, instead of sweeping the whole document on a timer. Work is batched into
+# requestIdleCallback and never reads layout (no getBoundingClientRect /
+# getComputedStyle) - ad cards are found structurally, by climbing from the
+# "Sponsored" label or /ads/ link to the child of the nearest feed grid.
+# Safe to install more than once; window.__scoutCleanup holds counters.
+CLEANUP_INIT_SCRIPT = '''
+(() => {
+    if (window.__scoutCleanup) return;
+    const stats = window.__scoutCleanup = { hiddenAds: 0, hiddenSidebars: 0, batches: 0 };
+
+    const pending = [];
+    let scheduled = false;
+    let mainWidened = false;
+
+    const idle = window.requestIdleCallback
+        ? (fn) => window.requestIdleCallback(fn, { timeout: 500 })
+        : (fn) => setTimeout(() => fn({ timeRemaining: () => 8, didTimeout: true }), 50);
+
+    // Climb to the element with an image that sits directly in a list/grid
+    // (3+ siblings) - that's the card
+    function cardFor(el) {
+        let node = el;
+        for (let i = 0; i < 12 && node && node.parentElement; i++) {
+            if (node.parentElement.childElementCount >= 3 && node.querySelector('img')) return node;
+            node = node.parentElement;
+        }
+        return null;
+    }
+
+    function findAds(root, hide) {
+        // "Sponsored" labels - only short text nodes, no textContent on containers
+        const walker = document.createTreeWalker(root, NodeFilter.SHOW_TEXT);
+        let text = walker.nextNode();
+        while (text) {
+            const value = text.nodeValue;
+            if (value.length < 40 && value.includes('Sponsored') && text.parentElement) {
+                const card = cardFor(text.parentElement);
+                if (card) hide.push([card, 'hiddenAds']);
+            }
+            text = walker.nextNode();
+        }
+
+        const links = root.matches?.('a[href*="/ads/"]') ? [root] : root.querySelectorAll('a[href*="/ads/"]');
+        for (const link of links) {
+            const card = cardFor(link);
+            if (card) hide.push([card, 'hiddenAds']);
+        }
+    }
+
+    function findSidebars(root, hide) {
+        const candidates = root.matches?.('div[role="navigation"], div[style*="width"]')
+            ? [root]
+            : root.querySelectorAll('div[role="navigation"], div[style*="width"]');
+        // Only the document's first navigation div is the left sidebar - listing
+        // pages use the same role for in-page controls
+        let sidebarNav;
+        for (const el of candidates) {
+            if (el.getAttribute('role') === 'navigation') {
+                if (sidebarNav === undefined) sidebarNav = document.querySelector('div[role="navigation"]');
+                if (el === sidebarNav) {
+                    hide.push([el, 'hiddenSidebars']);
+                    continue;
+                }
+            }
+            // Inline style only - reading computed style would force a recalc
+            if (el.style.width === '360px' || el.style.maxWidth === '360px') {
+                hide.push([el, 'hiddenSidebars']);
+            }
+        }
+
+        if (!mainWidened) {
+            const main = root.matches?.('div[role="main"]') ? root : root.querySelector('div[role="main"]');
+            if (main) {
+                main.style.maxWidth = '100%';
+                main.style.width = '100%';
+                mainWidened = true;
+            }
+        }
+    }
+
+    function flush(deadline) {
+        scheduled = false;
+        stats.batches++;
+
+        // Reads first...
+        const hide = [];
+        while (pending.length && (deadline.didTimeout || deadline.timeRemaining() > 2)) {
+            const root = pending.shift();
+            if (!root.isConnected) continue;
+            findAds(root, hide);
+            findSidebars(root, hide);
+        }
+
+        // ...then writes, so nothing interleaves style reads with style writes
+        for (const [el, counter] of hide) {
+            if (el.style.display !== 'none') {
+                el.style.display = 'none';
+                stats[counter]++;
+            }
+        }
+
+        if (pending.length) schedule();
+    }
+
+    function schedule() {
+        if (!scheduled) {
+            scheduled = true;
+            idle(flush);
+        }
+    }
+
+    function enqueue(node) {
+        if (node.nodeType === 3) node = node.parentElement;
+        if (!node || node.nodeType !== 1 || node.id === 'marketplace-scout-overlay' || node.id === 'scout-overlay') return;
+        // Skip nodes already covered by a queued ancestor (bounded so bursts stay linear)
+        for (let i = 0; i < pending.length && i < 32; i++) {
+            if (pending[i].contains(node)) return;
+        }
+        pending.push(node);
+        schedule();
+    }
+
+    const observer = new MutationObserver((mutations) => {
+        for (const mutation of mutations) {
+            for (const node of mutation.addedNodes) enqueue(node);
+        }
+    });
+    observer.observe(document, { childList: true, subtree: true });
+
+    if (document.body) enqueue(document.body);
+    else document.addEventListener('DOMContentLoaded', () => enqueue(document.body));
+
+    console.log('🚀 FB Marketplace Scout: Ad removal active');
+})();
+'''
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Compressed storage for evaluation payloads (the raw model response behind
+each score)
+
+Payloads live in evaluation_payloads, away from the listings rows the hot
+queries scan, compressed against a shared dictionary trained from earlier
+payloads - responses repeat the same JSON keys and phrasing, so a
+dictionary does far better than compressing each one on its own. zstd is
+used when the zstandard package is installed, zlib with a preset
+dictionary otherwise. Dictionaries are never changed once stored, so old
+rows always decode.
+
+Usage:
+    python3 payloads.py --migrate     # move listings.evaluation_data into the side table
+    python3 payloads.py --train       # train a new dictionary from recent payloads
+    python3 payloads.py --stats
+    python3 payloads.py --show 1234   # print a listing's payload
+"""
+import argparse
+import sqlite3
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Payloads sampled when training a dictionary
+TRAIN_SAMPLES = 500
+
+# Dictionary size in bytes (zlib can only look back 32 KB)
+DICT_SIZE = 32768
+
+# The first dictionary is trained automatically once this many payloads exist
+TRAIN_MIN_SAMPLES = 200
+
+# How many stores between checks for that
+TRAIN_CHECK_EVERY = 50
+
+ZLIB_LEVEL = 9
+ZSTD_LEVEL = 19
+
+# Per-process caches: dictionary id -> (codec, bytes), and the one used for new payloads
+_dictionaries = {}
+_current = {'id': None, 'checked': False, 'stores': 0}
+
+
+def _compress(codec, dictionary, data):
+    if codec == 'zstd':
+        params = {'dict_data': zstandard.ZstdCompressionDict(dictionary)} if dictionary else {}
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL, **params).compress(data)
+    compressor = zlib.compressobj(ZLIB_LEVEL, zdict=dictionary) if dictionary else zlib.compressobj(ZLIB_LEVEL)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _decompress(codec, dictionary, blob):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('payload was stored with zstd - pip install zstandard to read it')
+        params = {'dict_data': zstandard.ZstdCompressionDict(dictionary)} if dictionary else {}
+        return zstandard.ZstdDecompressor(**params).decompress(blob)
+    decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+    return decompressor.decompress(blob) + decompressor.flush()
+
+
+def build_dictionary(samples, size=DICT_SIZE):
+    """
+    Shared dictionary from sample payloads
+
+    zstd trains one properly. zlib has no trainer - its preset dictionary is
+    just bytes it can refer back to - so it gets distinct samples end to end,
+    the most recent last (nearest, so cheapest to reference).
+
+    Returns:
+        tuple: (codec, dictionary bytes)
+    """
+    if zstandard is not None and len(samples) >= 10:
+        trained = zstandard.train_dictionary(size, samples)
+        return 'zstd', trained.as_bytes()
+
+    dictionary = b''
+    for sample in reversed(list(dict.fromkeys(samples))):
+        if len(dictionary) + len(sample) > size:
+            break
+        dictionary = sample + dictionary
+    return 'zlib', dictionary
+
+
+def _load_dictionary(c, dict_id):
+    if dict_id is None:
+        return 'zlib', None
+    if dict_id not in _dictionaries:
+        c.execute('SELECT codec, dictionary FROM payload_dictionaries WHERE id = ?', (dict_id,))
+        _dictionaries[dict_id] = c.fetchone()
+    return _dictionaries[dict_id]
+
+
+def _current_dictionary(c, auto_train=True):
+    """Newest dictionary id, looked up once per process (and re-checked while there is none)"""
+    _current['stores'] += 1
+    if _current['id'] is None and (not _current['checked'] or _current['stores'] % TRAIN_CHECK_EVERY == 0):
+        _current['checked'] = True
+        c.execute('SELECT MAX(id) FROM payload_dictionaries')
+        _current['id'] = c.fetchone()[0]
+        if _current['id'] is None and auto_train:
+            c.execute('SELECT COUNT(*) FROM evaluation_payloads')
+            if c.fetchone()[0] >= TRAIN_MIN_SAMPLES:
+                _current['id'] = train_dictionary(c)
+    return _current['id']
+
+
+def train_dictionary(c, samples=TRAIN_SAMPLES):
+    """
+    Train and store a dictionary from the most recent payloads
+
+    Args:
+        c: cursor (the caller commits)
+
+    Returns:
+        int: new dictionary id, or None if there are no payloads yet
+    """
+    c.execute('SELECT listing_id FROM evaluation_payloads ORDER BY listing_id DESC LIMIT ?', (samples,))
+    texts = [load_payload(c, row[0]) for row in c.fetchall()]
+    texts = [t.encode() for t in texts if t]
+    if not texts:
+        return None
+
+    codec, dictionary = build_dictionary(texts[::-1])
+    c.execute('INSERT INTO payload_dictionaries (codec, dictionary) VALUES (?, ?)', (codec, dictionary))
+    dict_id = c.lastrowid
+    _dictionaries[dict_id] = (codec, dictionary)
+    _current['id'] = dict_id
+    print(f"📚 Trained payload dictionary #{dict_id} ({codec}, {len(dictionary)} bytes, {len(texts)} samples)")
+    return dict_id
+
+
+def store_payload(c, listing_id, text, auto_train=True):
+    """
+    Compress and store a listing's payload (replaces any earlier one)
+
+    Args:
+        c: cursor - runs in the caller's transaction
+        auto_train: train the first dictionary once there are enough payloads
+    """
+    if text is None:
+        c.execute('DELETE FROM evaluation_payloads WHERE listing_id = ?', (listing_id,))
+        return
+
+    dict_id = _current_dictionary(c, auto_train)
+    codec, dictionary = _load_dictionary(c, dict_id)
+    data = text.encode()
+    c.execute('''
+        INSERT OR REPLACE INTO evaluation_payloads (listing_id, dict_id, codec, size, payload)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (listing_id, dict_id, codec, len(data), _compress(codec, dictionary, data)))
+
+
+def load_payload(c, listing_id):
+    """
+    Returns:
+        str or None
+    """
+    c.execute('SELECT dict_id, codec, payload FROM evaluation_payloads WHERE listing_id = ?', (listing_id,))
+    row = c.fetchone()
+    if not row:
+        return None
+    dict_id, codec, blob = row
+    _, dictionary = _load_dictionary(c, dict_id)
+    return _decompress(codec, dictionary, blob).decode()
+
+
+def recompress(c, dict_id):
+    """Re-encode every payload with the given dictionary"""
+    c.execute('SELECT listing_id FROM evaluation_payloads WHERE dict_id IS NOT ? ', (dict_id,))
+    listing_ids = [row[0] for row in c.fetchall()]
+    for listing_id in listing_ids:
+        store_payload(c, listing_id, load_payload(c, listing_id))
+    return len(listing_ids)
+
+
+def migrate():
+    """
+    Move listings.evaluation_data into evaluation_payloads, train a
+    dictionary from what was moved and re-encode everything with it
+
+    Returns:
+        int: payloads moved
+    """
+    from database import DB_PATH
+
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('SELECT id, evaluation_data FROM listings WHERE evaluation_data IS NOT NULL')
+    rows = c.fetchall()
+    for listing_id, text in rows:
+        store_payload(c, listing_id, text, auto_train=False)
+    c.execute('UPDATE listings SET evaluation_data = NULL WHERE evaluation_data IS NOT NULL')
+
+    if rows:
+        recompress(c, train_dictionary(c))
+    conn.commit()
+    conn.close()
+    return len(rows)
+
+
+def payload_stats():
+    from database import DB_PATH
+
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(payload)), 0) FROM evaluation_payloads')
+    count, raw, stored = c.fetchone()
+    c.execute('SELECT COUNT(*) FROM payload_dictionaries')
+    dictionaries = c.fetchone()[0]
+    c.execute('SELECT COUNT(*) FROM listings WHERE evaluation_data IS NOT NULL')
+    inline = c.fetchone()[0]
+    conn.close()
+    return {'payloads': count, 'raw_bytes': raw, 'stored_bytes': stored,
+            'dictionaries': dictionaries, 'inline_rows': inline}
+
+
+def main():
+    from database import DB_PATH, init_db
+
+    parser = argparse.ArgumentParser(description='Compressed evaluation payload storage')
+    parser.add_argument('--migrate', action='store_true', help='move listings.evaluation_data into the side table')
+    parser.add_argument('--train', action='store_true', help='train a new dictionary and re-encode with it')
+    parser.add_argument('--stats', action='store_true')
+    parser.add_argument('--show', type=int, metavar='LISTING_ID', help="print a listing's payload")
+    args = parser.parse_args()
+
+    init_db()
+
+    if args.migrate:
+        print(f"✅ Moved {migrate()} payloads out of the listings table")
+        print("   Run `python3 retention.py --vacuum` (or VACUUM) to shrink the file")
+    if args.train:
+        conn = sqlite3.connect(DB_PATH)
+        c = conn.cursor()
+        dict_id = train_dictionary(c)
+        if dict_id:
+            print(f"♻️  Re-encoded {recompress(c, dict_id)} payloads")
+        conn.commit()
+        conn.close()
+    if args.show is not None:
+        conn = sqlite3.connect(DB_PATH)
+        print(load_payload(conn.cursor(), args.show) or "ℹ️  No payload stored for that listing")
+        conn.close()
+    if args.stats or not (args.migrate or args.train or args.show is not None):
+        stats = payload_stats()
+        ratio = stats['raw_bytes'] / stats['stored_bytes'] if stats['stored_bytes'] else 0
+        print(f"📦 {stats['payloads']} payloads: {stats['raw_bytes'] / 1e3:.0f} KB raw, "
+              f"{stats['stored_bytes'] / 1e3:.0f} KB stored ({ratio:.1f}x), "
+              f"{stats['dictionaries']} dictionaries")
+        if stats['inline_rows']:
+            print(f"⚠️  {stats['inline_rows']} listings still have inline evaluation_data - run --migrate")
+
+
+if __name__ == '__main__':
+    main()
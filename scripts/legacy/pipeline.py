@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Single-process pipeline for FB Marketplace Scout
+Runs the watcher, enrichment and evaluator as stages of one asyncio pipeline
+instead of separate processes polling SQLite:
+
+    discover -> normalize -> dedupe -> enrich -> triage -> evaluate -> persist -> notify
+
+Stages are joined by bounded queues, so a slow stage (usually evaluate) makes
+the ones before it wait instead of piling up work. A listing is scored
+moments after it's scrolled past rather than on the evaluator's next poll.
+
+Usage:
+    python3 pipeline.py                         # watch the feed in the browser and score as we go
+    python3 pipeline.py --workers evaluate=4    # more concurrent LLM calls
+    python3 pipeline.py --no-browser --once     # score the pending backlog, then exit
+
+Ctrl+C stops discovery and drains what's already queued (up to
+DRAIN_TIMEOUT seconds) before exiting.
+"""
+import argparse
+import asyncio
+import signal
+import time
+from collections import Counter
+from database import (init_db, get_listing_stats, get_unevaluated_listings, get_unevaluated_by_ids,
+                      get_reevaluation_backlog)
+from evaluator import (USE_CLAUDE, USE_LLM, USE_OLLAMA, EVALUATION_SECONDS, EVALUATIONS, PENDING_LISTINGS,
+                       REEVALUATION_BACKLOG, evaluate_with_llm, evaluate_with_heuristics, heuristic_fallback,
+                       llm_available, print_mode, save_evaluation)
+from metrics import counter, gauge, histogram, start_dumper
+import profiler
+
+STAGES = ('normalize', 'dedupe', 'enrich', 'triage', 'evaluate', 'persist', 'notify')
+
+# Items each queue holds before the stage feeding it has to wait
+QUEUE_SIZE = 100
+
+# Concurrent workers per stage. SQLite-writing stages stay at 1 (one writer);
+# evaluate is the slow one when an LLM is in use (with only the local model,
+# it defaults to the server's parallel slots instead).
+DEFAULT_WORKERS = {
+    'normalize': 1,
+    'dedupe': 1,
+    'enrich': 1,
+    'triage': 1,
+    'evaluate': 2,
+    'persist': 1,
+    'notify': 1
+}
+
+# Seconds between passes over the feed (as in the watcher)
+SCAN_INTERVAL = 2
+
+# Seconds between backlog sweeps - picks up listings queued for scoring outside
+# the pipeline (crawler, near-duplicates found when a description arrives)
+SWEEP_SECONDS = 600
+
+# Seconds to wait for queued items to finish on shutdown
+DRAIN_TIMEOUT = 30
+
+# Minimum seconds between Claude calls, per evaluate worker (0 when only the
+# local model is in use)
+LLM_INTERVAL = 2
+
+# Listings whose heuristic flip and weirdness are both below this skip Claude
+# (0 = everything goes to Claude)
+TRIAGE_MIN_SCORE = 0
+
+# Print a notification for listings scoring at least this
+NOTIFY_MIN_SCORE = 7
+
+STAGE_SECONDS = histogram('scout_pipeline_stage_seconds', 'Time to process one item, by stage')
+QUEUE_DEPTH = gauge('scout_pipeline_queue_depth', 'Items waiting in front of each stage')
+HANDOFF_SECONDS = histogram('scout_pipeline_handoff_seconds', 'Discovery (or sweep) to score persisted')
+STAGE_ERRORS = counter('scout_pipeline_errors_total', 'Items dropped by a failing stage, by stage and error')
+
+
+class Pipeline:
+    """
+    Stage workers joined by bounded asyncio queues
+
+    Items are dicts: 'card' (raw feed data) until dedupe turns it into
+    'listing' (the evaluator's listing dict), then 'heuristic' / 'evaluation'.
+    'started' is when the item entered the pipeline (perf_counter).
+    """
+
+    def __init__(self, workers=None, queue_size=QUEUE_SIZE, prefetcher=None, use_llm=USE_LLM,
+                 llm_interval=LLM_INTERVAL, triage_min=TRIAGE_MIN_SCORE):
+        self.workers = {**DEFAULT_WORKERS, **(workers or {})}
+        self.queues = {stage: asyncio.Queue(maxsize=queue_size) for stage in STAGES}
+        self.prefetcher = prefetcher
+        self.use_llm = use_llm
+        self.llm_interval = llm_interval
+        self.triage_min = triage_min
+        self.in_flight = set()  # listing ids between dedupe/sweep and persist
+        self.tasks = {stage: [] for stage in STAGES}
+        self.stats = Counter()
+
+    def start(self):
+        for stage in STAGES:
+            for _ in range(self.workers[stage]):
+                self.tasks[stage].append(asyncio.create_task(self._worker(stage)))
+
+    async def submit(self, card):
+        """Feed a raw card from discovery (waits while normalize is full)"""
+        self.stats['discovered'] += 1
+        await self._forward('normalize', {'card': card, 'started': time.perf_counter()})
+
+    async def submit_listing(self, listing, started=None, stage='triage'):
+        """
+        Feed a listing that needs scoring
+
+        Returns:
+            bool: False if it's already in the pipeline
+        """
+        if listing['id'] in self.in_flight:
+            return False
+        self.in_flight.add(listing['id'])
+        await self._forward(stage, {'listing': listing, 'started': started or time.perf_counter()})
+        return True
+
+    async def _forward(self, stage, item):
+        await self.queues[stage].put(item)
+        QUEUE_DEPTH.set(self.queues[stage].qsize(), stage=stage)
+
+    async def _worker(self, stage):
+        handler = getattr(self, f'_{stage}')
+        queue = self.queues[stage]
+        while True:
+            item = await queue.get()
+            QUEUE_DEPTH.set(queue.qsize(), stage=stage)
+            try:
+                with STAGE_SECONDS.time(stage=stage):
+                    await handler(item)
+            except Exception as e:
+                STAGE_ERRORS.inc(stage=stage, error=e.__class__.__name__)
+                print(f"⚠️  Pipeline {stage} error: {e}")
+                if 'listing' in item:
+                    self.in_flight.discard(item['listing']['id'])
+            finally:
+                queue.task_done()
+
+    async def drain(self, timeout=DRAIN_TIMEOUT):
+        """
+        Let queued items run to the end, stage by stage, then stop the workers
+
+        Returns:
+            bool: True if everything drained before the timeout
+        """
+        deadline = time.monotonic() + timeout
+        drained = True
+        for stage in STAGES:
+            try:
+                await asyncio.wait_for(self.queues[stage].join(), max(0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                drained = False
+            for task in self.tasks[stage]:
+                task.cancel()
+            await asyncio.gather(*self.tasks[stage], return_exceptions=True)
+            self.tasks[stage] = []
+        return drained
+
+    async def _normalize(self, item):
+        from watcher import normalize_listing
+        normalize_listing(item['card'])
+        await self._forward('dedupe', item)
+
+    async def _dedupe(self, item):
+        """Save the card; new or repriced listings and their flagged near-duplicates go on"""
+        from watcher import ingest_listing
+        result = ingest_listing(item['card'])
+        if result['created']:
+            self.stats['new'] += 1
+
+        listing_ids = [m[0] for m in result['matches']]
+        if result['created'] or any(ch['field'] == 'price' for ch in result['changes']):
+            listing_ids.append(result['listing_id'])
+
+        for listing in get_unevaluated_by_ids(listing_ids):
+            await self.submit_listing(listing, item['started'], stage='enrich')
+
+    async def _enrich(self, item):
+        """Queue a detail-page fetch for listings we have no details for yet"""
+        listing = item['listing']
+        if not listing['details'] and self.prefetcher:
+            self.prefetcher.submit(listing['listing_url'])
+        await self._forward('triage', item)
+
+    async def _triage(self, item):
+        with EVALUATION_SECONDS.time(mode='heuristic'):
+            item['heuristic'] = evaluate_with_heuristics(item['listing'])
+
+        heuristic = item['heuristic']
+        # Worth it if it's promising for any of the buyer profiles
+        worth_llm = max(max(scores['flip_score'], scores['weirdness_score'])
+                        for scores in heuristic.get('profiles', {None: heuristic}).values()) >= self.triage_min
+        if self.use_llm and worth_llm and llm_available():
+            await self._forward('evaluate', item)
+            return
+
+        EVALUATIONS.inc(mode='heuristic')
+        # While every backend's breaker is open, don't queue for the LLM at
+        # all - score now and redo it once a backend is back
+        item['evaluation'] = heuristic_fallback(heuristic) if self.use_llm and worth_llm else heuristic
+        await self._forward('persist', item)
+
+    async def _evaluate(self, item):
+        """LLM backends in a thread (the clients are blocking); heuristics if they all fail"""
+        result = await asyncio.to_thread(evaluate_with_llm, item['listing'])
+        if result:
+            item['evaluation'] = result
+        else:
+            EVALUATIONS.inc(mode='heuristic')
+            item['evaluation'] = heuristic_fallback(item['heuristic'])
+        await self._forward('persist', item)
+        await asyncio.sleep(self.llm_interval)
+
+    async def _persist(self, item):
+        save_evaluation(item['listing'], item['evaluation'])
+        self.in_flight.discard(item['listing']['id'])
+        self.stats['evaluated'] += 1
+        HANDOFF_SECONDS.observe(time.perf_counter() - item['started'])
+        await self._forward('notify', item)
+
+    async def _notify(self, item):
+        listing, evaluation = item['listing'], item['evaluation']
+        print(f"   ✅ {listing['title']} - Flip: {evaluation['flip_score']}/10 | "
+              f"Weird: {evaluation['weirdness_score']}/10 | "
+              f"Scam: {evaluation['scam_likelihood']}/10")
+        for profile, scores in evaluation.get('profiles', {None: evaluation}).items():
+            if scores['scam_likelihood'] < NOTIFY_MIN_SCORE and \
+                    max(scores['flip_score'], scores['weirdness_score']) >= NOTIFY_MIN_SCORE:
+                buyer = f" for {profile}" if profile else ''
+                print(f"🔔 Worth a look{buyer}: {listing['title']} - {listing['price']} - {listing['listing_url']}")
+                print(f"   📝 {scores['notes']}")
+
+
+async def wait_or_stop(stop, seconds):
+    """Sleep, waking early if stop is set. Returns True if stopping."""
+    try:
+        await asyncio.wait_for(stop.wait(), seconds)
+    except asyncio.TimeoutError:
+        pass
+    return stop.is_set()
+
+
+async def feed_source(pipeline, page, stop):
+    """discover: pass unseen feed cards into the pipeline every SCAN_INTERVAL seconds"""
+    from seen_items import SeenItems
+    from watcher import SCAN_SECONDS, WATCHER_ERRORS, discover_cards
+
+    seen = SeenItems()
+    while not stop.is_set():
+        try:
+            with SCAN_SECONDS.time():
+                async for card in discover_cards(page, seen):
+                    await pipeline.submit(card)
+        except Exception as e:
+            WATCHER_ERRORS.inc(error=e.__class__.__name__)
+            print(f"⚠️  Watcher error: {e}")
+            await wait_or_stop(stop, 5)
+        await wait_or_stop(stop, SCAN_INTERVAL)
+
+
+async def sweep_source(pipeline, stop, interval=SWEEP_SECONDS, once=False):
+    """
+    Queue listings left unevaluated outside the pipeline (at startup, then
+    every interval), and heuristic-fallback listings once an LLM backend is
+    answering again. With once, keeps going until the backlog is empty and
+    then sets stop.
+    """
+    attempted = set()
+    while not stop.is_set():
+        listings = get_unevaluated_listings(limit=QUEUE_SIZE)
+        stats = get_listing_stats()
+        PENDING_LISTINGS.set(stats['pending'])
+        REEVALUATION_BACKLOG.set(stats['needs_reevaluation'])
+        if len(listings) < QUEUE_SIZE and stats['needs_reevaluation'] and pipeline.use_llm and llm_available():
+            listings += get_reevaluation_backlog(limit=QUEUE_SIZE - len(listings))
+        queued = 0
+        for listing in listings:
+            if once and listing['id'] in attempted:
+                continue  # failed earlier this run - don't retry forever
+            attempted.add(listing['id'])
+            queued += await pipeline.submit_listing(listing)
+        if queued:
+            print(f"🧹 Queued {queued} pending listings for scoring")
+
+        if not once:
+            await wait_or_stop(stop, interval)
+            continue
+
+        # Let this batch finish before fetching the next one - or, after the
+        # last one, before stopping (drain() is time-limited for Ctrl+C)
+        while pipeline.in_flight and not stop.is_set():
+            await asyncio.sleep(0.1)
+        if len(listings) < QUEUE_SIZE or not queued:
+            stop.set()
+
+
+async def run(pipeline, sources, stop):
+    """Start the stages and sources, then drain everything once stop is set"""
+    pipeline.start()
+    source_tasks = [asyncio.create_task(source) for source in sources]
+
+    await stop.wait()
+    print("\n👋 Stopping discovery, draining the pipeline...")
+    for task in source_tasks:
+        task.cancel()
+    await asyncio.gather(*source_tasks, return_exceptions=True)
+
+    if not await pipeline.drain(DRAIN_TIMEOUT):
+        print(f"⚠️  Gave up draining after {DRAIN_TIMEOUT}s")
+
+    stats = pipeline.stats
+    print(f"📊 {stats['discovered']} cards seen, {stats['new']} new listings, {stats['evaluated']} scored")
+
+
+async def main(args):
+    print_mode()
+    print("🗄️  Initializing database...")
+    init_db()
+    start_dumper('pipeline')
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    options = {
+        'workers': args.workers,
+        'queue_size': args.queue_size,
+        'llm_interval': args.llm_interval,
+        'triage_min': args.triage_min
+    }
+    if args.no_browser:
+        pipeline = Pipeline(**options)
+        await run(pipeline, [sweep_source(pipeline, stop, args.sweep_seconds, once=args.once)], stop)
+        return
+
+    from playwright.async_api import async_playwright
+    from enrichment import DetailPrefetcher
+    from watcher import PREFETCH_DETAILS, open_watcher_page
+
+    async with async_playwright() as p:
+        context, page = await open_watcher_page(p)
+
+        prefetcher = None
+        if PREFETCH_DETAILS:
+            prefetcher = DetailPrefetcher(context)
+            prefetcher.start()
+            print("🗂️  Background detail prefetch enabled")
+
+        pipeline = Pipeline(prefetcher=prefetcher, **options)
+        sources = [feed_source(pipeline, page, stop), sweep_source(pipeline, stop, args.sweep_seconds)]
+        await run(pipeline, sources, stop)
+
+        if prefetcher:
+            await prefetcher.stop()
+
+
+def parse_workers(values):
+    workers = {}
+    for value in values:
+        stage, _, count = value.partition('=')
+        if stage not in STAGES or not count.isdigit() or int(count) < 1:
+            raise argparse.ArgumentTypeError(f'expected STAGE=N with STAGE one of {", ".join(STAGES)}')
+        workers[stage] = int(count)
+    return workers
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run discovery, enrichment and evaluation as one pipeline')
+    parser.add_argument('--workers', nargs='*', default=[], metavar='STAGE=N',
+                        help='workers per stage, e.g. evaluate=4')
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE, help='items each stage queue holds')
+    parser.add_argument('--llm-interval', type=float,
+                        help=f'minimum seconds between LLM calls per evaluate worker (default {LLM_INTERVAL})')
+    parser.add_argument('--triage-min', type=int, default=TRIAGE_MIN_SCORE,
+                        help='skip the LLM unless heuristic flip or weirdness reaches this')
+    parser.add_argument('--sweep-seconds', type=float, default=SWEEP_SECONDS,
+                        help='seconds between backlog sweeps')
+    parser.add_argument('--no-browser', action='store_true', help="don't watch the feed - only score the backlog")
+    parser.add_argument('--once', action='store_true', help='with --no-browser: exit once the backlog is scored')
+    profiler.add_arguments(parser)
+    args = parser.parse_args()
+    try:
+        args.workers = parse_workers(args.workers)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    if USE_OLLAMA and not USE_CLAUDE:
+        # Only the free local model: keep all its slots busy, no pacing
+        from ollama_client import OLLAMA_PARALLEL
+        args.workers.setdefault('evaluate', OLLAMA_PARALLEL)
+        args.llm_interval = 0 if args.llm_interval is None else args.llm_interval
+    elif args.llm_interval is None:
+        args.llm_interval = LLM_INTERVAL
+
+    profiler.install_from_args('pipeline', args)
+    asyncio.run(main(args))
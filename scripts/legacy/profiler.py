@@ -0,0 +1,211 @@
+"""
+Opt-in sampling profiler for FB Marketplace Scout
+Samples the main thread's stack on a timer signal and writes collapsed stacks
+(one "frame;frame;frame count" line per stack) for flamegraph.pl / speedscope
+
+Each sample is rooted at the asyncio task that was running (by coroutine
+name), so watcher time splits into scan / prefetch / overlay work instead of
+one big event-loop tower.
+
+    python3 watcher.py --profile                  # profile from startup
+    kill -USR2 <pid>                              # toggle on a running process
+    curl -X POST localhost:8765/profile/watcher   # ...or through the server (from this machine)
+    flamegraph.pl profiles/watcher-*.collapsed > watcher.svg
+
+Profiles are written to profiles/ when profiling is toggled off or the
+process exits.
+"""
+import atexit
+import os
+import signal
+import sys
+import time
+from collections import Counter
+
+PROFILE_DIR = os.environ.get('SCOUT_PROFILE_DIR') or os.path.join(os.path.dirname(__file__), 'profiles')
+
+# 200 Hz - a few percent overhead on the sampled thread
+DEFAULT_INTERVAL = 0.005
+
+# Deepest stack recorded per sample
+MAX_DEPTH = 128
+
+TOGGLE_SIGNAL = getattr(signal, 'SIGUSR2', None)
+
+# cpu: ITIMER_PROF, only counts time on CPU. wall: ITIMER_REAL, also catches
+# time blocked on SQLite locks, sleeps and network.
+TIMERS = {
+    'cpu': ('ITIMER_PROF', 'SIGPROF'),
+    'wall': ('ITIMER_REAL', 'SIGALRM'),
+}
+
+
+class SamplingProfiler:
+    def __init__(self, process, interval=DEFAULT_INTERVAL, mode='cpu'):
+        if mode not in TIMERS:
+            raise ValueError(f'mode must be one of {", ".join(TIMERS)}')
+        self.process = process
+        self.interval = interval
+        self.mode = mode
+        self.samples = Counter()
+        self.running = False
+        self.started_at = None
+
+    @property
+    def supported(self):
+        return hasattr(signal, 'setitimer')
+
+    def start(self):
+        if self.running:
+            return False
+        if not self.supported:
+            print("⚠️  Sampling profiler needs signal.setitimer (not available on this platform)")
+            return False
+        timer, signame = TIMERS[self.mode]
+        self.samples.clear()
+        signal.signal(getattr(signal, signame), self._sample)
+        signal.setitimer(getattr(signal, timer), self.interval, self.interval)
+        self.running = True
+        self.started_at = time.time()
+        print(f"🔬 Profiling {self.process} ({self.mode}, {1 / self.interval:.0f} Hz)")
+        return True
+
+    def stop(self):
+        """
+        Stop sampling and write the collapsed stacks
+
+        Returns:
+            str: path written, or None if nothing was recorded
+        """
+        if not self.running:
+            return None
+        timer, signame = TIMERS[self.mode]
+        signal.setitimer(getattr(signal, timer), 0, 0)
+        signal.signal(getattr(signal, signame), signal.SIG_IGN)
+        self.running = False
+        path = self.write()
+        if path:
+            print(f"🔬 Profile written: {path} ({sum(self.samples.values())} samples)")
+        return path
+
+    def toggle(self):
+        return self.stop() if self.running else self.start()
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None and len(stack) < MAX_DEPTH:
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        stack.reverse()
+        self.samples[(self._root(), tuple(stack))] += 1
+
+    def _root(self):
+        """Which asyncio task was running (by coroutine), or the process name"""
+        # Not imported here - a process without asyncio has no running loop
+        asyncio = sys.modules.get('asyncio')
+        if asyncio is None:
+            return self.process
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return self.process
+        task = asyncio.current_task(loop)
+        if task is None:
+            return 'asyncio:loop'
+        coro = task.get_coro()
+        return f"task:{getattr(coro, '__qualname__', task.get_name())}"
+
+    def collapsed(self):
+        """Samples as collapsed-stack lines, heaviest first"""
+        merged = Counter()
+        for (root, stack), count in self.samples.items():
+            frames = [root] + [
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                for code in stack
+            ]
+            merged[';'.join(f.replace(';', ':') for f in frames)] += count
+        return [f'{stack} {count}' for stack, count in merged.most_common()]
+
+    def write(self, path=None):
+        lines = self.collapsed()
+        if not lines:
+            return None
+        if path is None:
+            stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at or time.time()))
+            path = os.path.join(PROFILE_DIR, f'{self.process}-{stamp}.collapsed')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        return path
+
+
+PROFILER = None
+
+
+def install(process, start=False, interval=DEFAULT_INTERVAL, mode='cpu'):
+    """
+    Set up this process's profiler: toggled by SIGUSR2, flushed at exit
+
+    Args:
+        process (str): name used in profile file names
+        start (bool): begin sampling right away (--profile)
+    """
+    global PROFILER
+    PROFILER = SamplingProfiler(process, interval, mode)
+
+    if TOGGLE_SIGNAL is not None:
+        signal.signal(TOGGLE_SIGNAL, lambda signum, frame: PROFILER.toggle())
+    atexit.register(PROFILER.stop)
+
+    if start:
+        PROFILER.start()
+    return PROFILER
+
+
+def add_arguments(parser):
+    """The --profile flags shared by watcher.py, evaluator.py and server.py"""
+    parser.add_argument('--profile', action='store_true', help='start the sampling profiler at launch')
+    parser.add_argument('--profile-mode', choices=sorted(TIMERS), default='cpu',
+                        help='cpu time only, or wall clock (includes waits)')
+    parser.add_argument('--profile-hz', type=float, default=1 / DEFAULT_INTERVAL, help='samples per second')
+
+
+def install_from_args(process, args):
+    return install(process, start=args.profile, interval=1 / args.profile_hz, mode=args.profile_mode)
+
+
+def is_scout_process(pid):
+    """
+    True if pid is running one of the Scout scripts - a pid from an old
+    metrics dump may have been reused by an unrelated process, which
+    SIGUSR2 would kill
+
+    Raises:
+        OSError: /proc isn't available to check
+    """
+    try:
+        with open(f'/proc/{int(pid)}/cmdline', 'rb') as f:
+            args = f.read().split(b'\0')
+    except FileNotFoundError:
+        if not os.path.isdir('/proc'):
+            raise OSError("can't check which program a pid runs without /proc")
+        return False  # no such process
+    scripts = os.path.dirname(os.path.abspath(__file__))
+    return any(
+        name.endswith('.py') and os.path.isfile(os.path.join(scripts, name))
+        for name in (os.path.basename(arg.decode(errors='replace')) for arg in args)
+    )
+
+
+def signal_process(pid):
+    """
+    Ask another Scout process to toggle its profiler
+
+    Raises:
+        OSError: the pid isn't a Scout process (or can't be signalled)
+    """
+    if TOGGLE_SIGNAL is None:
+        raise OSError('SIGUSR2 is not available on this platform')
+    if not is_scout_process(pid):
+        raise OSError(f'pid {pid} is not a Scout process (exited?)')
+    os.kill(pid, TOGGLE_SIGNAL)
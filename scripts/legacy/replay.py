@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Record a Marketplace scroll session and replay it offline against the watcher
+
+Usage:
+    # Record: scroll Facebook yourself, Ctrl+C when done
+    python3 replay.py record sessions/newhaven-feed
+
+    # Record from the local stand-in feed (no login, scrolls itself)
+    python3 -m http.server 8000 --directory fixtures &
+    python3 replay.py record sessions/standin --no-login --auto-scroll 12 \\
+        --url 'http://localhost:8000/feed.html?q=oscilloscope'
+
+    # Replay at 20x the recorded pace (--speed 0 = as fast as possible)
+    python3 replay.py replay sessions/newhaven-feed --speed 20 --json replay.json
+
+A session directory holds network.har (every response the page fetched),
+snapshots/*.html (script-free DOM snapshots taken while scrolling) and
+manifest.json. Replay serves each snapshot at its original URL, with images
+and XHRs answered from the HAR and anything else aborted, then runs the
+watcher's scan_feed() on feed pages and the overlay injection on listing
+pages. Nothing touches the live site, and listings go to a scratch database
+unless --db is given.
+
+Sessions contain real listings and seller names - sessions/ is git-ignored.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+USER_DATA_DIR = os.path.expanduser('~/.fb-marketplace-scout-profile')
+
+# DOM as rendered, minus scripts - replaying FB's bundles would rebuild the page
+SNAPSHOT_JS = '''
+    () => {
+        const root = document.documentElement.cloneNode(true);
+        root.querySelectorAll('script, noscript').forEach(el => el.remove());
+        return {
+            html: '<!DOCTYPE html>' + root.outerHTML,
+            cards: document.querySelectorAll('a[href*="/marketplace/item/"]').length,
+            scrollY: window.scrollY
+        };
+    }
+'''
+
+
+def load_manifest(session_dir):
+    with open(os.path.join(session_dir, 'manifest.json')) as f:
+        return json.load(f)
+
+
+async def record_session(args):
+    """Snapshot the page every --interval seconds while it's scrolled, recording all traffic"""
+    from playwright.async_api import async_playwright
+
+    snapshots_dir = os.path.join(args.session, 'snapshots')
+    os.makedirs(snapshots_dir, exist_ok=True)
+    har_path = os.path.join(args.session, 'network.har')
+
+    manifest = {'start_url': args.url, 'recorded_at': time.strftime('%Y-%m-%d %H:%M:%S'), 'snapshots': []}
+    har_options = {'record_har_path': har_path, 'record_har_content': 'embed'}
+
+    async with async_playwright() as p:
+        browser = None
+        if args.no_login:
+            browser = await p.chromium.launch(headless=args.headless)
+            context = await browser.new_context(viewport={'width': 1920, 'height': 1080}, **har_options)
+        else:
+            context = await p.chromium.launch_persistent_context(
+                USER_DATA_DIR,
+                headless=args.headless,
+                viewport={'width': 1920, 'height': 1080},
+                args=['--disable-blink-features=AutomationControlled'],
+                **har_options
+            )
+        page = context.pages[0] if context.pages else await context.new_page()
+
+        print(f"🎬 Recording to {args.session}")
+        await page.goto(args.url, wait_until='domcontentloaded', timeout=30000)
+        if not args.auto_scroll:
+            print("📜 Scroll the feed / open listings - press Ctrl+C to stop")
+
+        started = time.monotonic()
+        last_hash = None
+        rounds = 0
+        try:
+            while not args.auto_scroll or rounds < args.auto_scroll:
+                await asyncio.sleep(args.interval)
+                try:
+                    snap = await page.evaluate(SNAPSHOT_JS)
+                except Exception:
+                    continue  # mid-navigation
+
+                digest = hashlib.sha1(snap['html'].encode()).hexdigest()
+                if digest != last_hash:
+                    last_hash = digest
+                    name = f"{len(manifest['snapshots']):04d}.html"
+                    with open(os.path.join(snapshots_dir, name), 'w') as f:
+                        f.write(snap['html'])
+                    manifest['snapshots'].append({
+                        't': round(time.monotonic() - started, 3),
+                        'url': page.url,
+                        'file': name,
+                        'cards': snap['cards'],
+                        'scroll_y': snap['scrollY']
+                    })
+                    print(f"📸 {name} - {snap['cards']} cards - {page.url[:80]}")
+
+                if args.auto_scroll:
+                    await page.mouse.wheel(0, 3000)
+                    rounds += 1
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            pass
+        finally:
+            manifest['duration'] = round(time.monotonic() - started, 3)
+            with open(os.path.join(args.session, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f, indent=2)
+            await context.close()  # flushes the HAR
+            if browser:
+                await browser.close()
+
+    print(f"✅ Recorded {len(manifest['snapshots'])} snapshots in {manifest['duration']:.0f}s")
+
+
+async def replay_session(args):
+    """
+    Serve the recorded snapshots back through the watcher and time it
+
+    Returns:
+        dict: replay report
+    """
+    from playwright.async_api import async_playwright
+    from seen_items import SeenItems
+    from page_cleanup import CLEANUP_INIT_SCRIPT
+    from watcher import scan_feed, inject_overlay_if_listing_page
+
+    manifest = load_manifest(args.session)
+    snapshots = manifest['snapshots']
+    if not snapshots:
+        print("❌ Session has no snapshots")
+        return None
+
+    har_path = os.path.join(args.session, 'network.har')
+    current = {'html': ''}
+
+    async def serve_snapshot(route):
+        if route.request.resource_type == 'document' and route.request.is_navigation_request():
+            await route.fulfill(status=200, content_type='text/html; charset=utf-8', body=current['html'])
+        else:
+            await route.fallback()
+
+    seen = SeenItems()
+    rows = []
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=not args.headed)
+        context = await browser.new_context(viewport={'width': 1920, 'height': 1080})
+        if os.path.exists(har_path):
+            await context.route_from_har(har_path, not_found='abort')
+        else:
+            await context.route('**/*', lambda route: route.abort())
+        await context.add_init_script(CLEANUP_INIT_SCRIPT)
+
+        page = await context.new_page()
+        await page.route('**/*', serve_snapshot)
+
+        replay_started = time.monotonic()
+        try:
+            for snapshot in snapshots:
+                if args.speed > 0:
+                    wait = snapshot['t'] / args.speed - (time.monotonic() - replay_started)
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+
+                with open(os.path.join(args.session, 'snapshots', snapshot['file'])) as f:
+                    current['html'] = f.read()
+
+                started = time.perf_counter()
+                await page.goto(snapshot['url'], wait_until='domcontentloaded')
+                load_ms = (time.perf_counter() - started) * 1000
+
+                row = {'file': snapshot['file'], 'load_ms': load_ms, 'new': 0, 'scan_ms': None, 'overlay_ms': None}
+                started = time.perf_counter()
+                if '/marketplace/item/' in snapshot['url']:
+                    await inject_overlay_if_listing_page(page)
+                    row['overlay_ms'] = (time.perf_counter() - started) * 1000
+                else:
+                    row['new'] = len(await scan_feed(page, seen))
+                    row['scan_ms'] = (time.perf_counter() - started) * 1000
+                rows.append(row)
+        finally:
+            await browser.close()
+
+        wall_seconds = time.monotonic() - replay_started
+
+    return summarize(manifest, rows, wall_seconds)
+
+
+def percentiles(values):
+    if not values:
+        return {'p50_ms': None, 'p99_ms': None}
+    ordered = sorted(values)
+    return {
+        'p50_ms': round(ordered[len(ordered) // 2], 2),
+        'p99_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 2)
+    }
+
+
+def summarize(manifest, rows, wall_seconds):
+    feed_rows = [r for r in rows if r['scan_ms'] is not None]
+    new_listings = sum(r['new'] for r in feed_rows)
+    scan_seconds = sum(r['scan_ms'] for r in feed_rows) / 1000
+
+    # Time from a snapshot arriving to its new cards being in the database,
+    # per card (only snapshots that produced something)
+    ingest_per_card = [(r['load_ms'] + r['scan_ms']) / r['new'] for r in feed_rows if r['new']]
+
+    return {
+        'snapshots': len(rows),
+        'feed_snapshots': len(feed_rows),
+        'listing_snapshots': len(rows) - len(feed_rows),
+        'new_listings': new_listings,
+        'cards_per_second': round(new_listings / scan_seconds, 1) if scan_seconds else None,
+        'recorded_seconds': manifest.get('duration'),
+        'replay_seconds': round(wall_seconds, 2),
+        'load': percentiles([r['load_ms'] for r in rows]),
+        'scan': percentiles([r['scan_ms'] for r in feed_rows]),
+        'ingest_per_card': percentiles(ingest_per_card),
+        'overlay': percentiles([r['overlay_ms'] for r in rows if r['overlay_ms'] is not None]),
+        'mean_scan_ms': round(statistics.fmean([r['scan_ms'] for r in feed_rows]), 2) if feed_rows else None
+    }
+
+
+def print_report(report):
+    print(f"\n📊 Replayed {report['snapshots']} snapshots in {report['replay_seconds']:.1f}s "
+          f"(recorded over {report['recorded_seconds'] or 0:.0f}s)")
+    print(f"   📦 {report['new_listings']} new listings | {report['cards_per_second'] or 0:.1f} cards/s while scanning")
+    for name in ('load', 'scan', 'ingest_per_card', 'overlay'):
+        stats = report[name]
+        if stats['p50_ms'] is not None:
+            print(f"   ⏱️  {name:<16} p50 {stats['p50_ms']:>8.2f} ms | p99 {stats['p99_ms']:>8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record/replay Marketplace sessions for offline watcher testing')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rec = sub.add_parser('record', help='record a scroll session')
+    rec.add_argument('session', help='session directory to create')
+    rec.add_argument('--url', default='https://www.facebook.com/marketplace', help='page to start on')
+    rec.add_argument('--interval', type=float, default=2.0, help='seconds between DOM snapshots')
+    rec.add_argument('--auto-scroll', type=int, default=0, metavar='N',
+                     help='scroll N times by itself instead of waiting for Ctrl+C')
+    rec.add_argument('--headless', action='store_true')
+    rec.add_argument('--no-login', action='store_true', help="use a fresh browser instead of the watcher's profile")
+
+    rep = sub.add_parser('replay', help='replay a session through the watcher')
+    rep.add_argument('session', help='session directory')
+    rep.add_argument('--speed', type=float, default=10.0, help='replay speed multiplier (0 = no waiting)')
+    rep.add_argument('--db', help='database to ingest into (default: scratch database)')
+    rep.add_argument('--headed', action='store_true', help='show the browser')
+    rep.add_argument('--json', metavar='PATH', help='write the report as JSON')
+    rep.add_argument('--expect-listings', type=int, metavar='N',
+                     help='exit non-zero unless exactly N new listings are extracted')
+
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        try:
+            asyncio.run(record_session(args))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    # Must be set before the watcher (and database) modules are imported
+    os.environ['SCOUT_DB_PATH'] = args.db or os.path.join(tempfile.mkdtemp(prefix='scout-replay-'), 'replay.db')
+    from database import init_db
+    init_db()
+
+    report = asyncio.run(replay_session(args))
+    if not report:
+        sys.exit(1)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report written to {args.json}")
+
+    if args.expect_listings is not None and report['new_listings'] != args.expect_listings:
+        print(f"❌ Expected {args.expect_listings} new listings, got {report['new_listings']}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""
+Parsing and validation of LLM evaluation responses
+
+Models don't always answer with bare JSON - they wrap it in ```json fences,
+put a sentence in front, or run out of tokens half way through a batch. A
+strict json.loads() throws all of those away (and the call was paid for).
+Here a scanner pulls complete JSON values out of whatever text came back,
+and each one is checked against the score schema: scores are coerced to
+ints and clamped to 1-10, notes are trimmed, and only a missing score makes
+an evaluation invalid.
+
+For batched responses (a JSON array, one object per item) every complete,
+valid element is kept, even when the array itself is cut off.
+"""
+import json
+import math
+import re
+from metrics import counter
+
+# Score fields every evaluation needs, clamped to this range
+SCORE_FIELDS = ('flip_score', 'weirdness_score', 'scam_likelihood')
+SCORE_MIN = 1
+SCORE_MAX = 10
+
+# Notes longer than this are cut (a rambling model shouldn't bloat the row)
+NOTES_MAX_CHARS = 500
+
+RESPONSES_PARSED = counter('scout_responses_parsed_total', 'LLM responses parsed, by outcome')
+
+NUMBER = re.compile(r'-?\d+(?:\.\d+)?')
+
+
+class ResponseError(ValueError):
+    """No valid evaluation in a response"""
+
+    # The backend did answer - backends.py doesn't count this against its breaker
+    answered = True
+
+
+class JSONScanner:
+    """
+    Finds complete JSON values in text, fed in one go or chunk by chunk as it
+    streams in
+
+    Yields each top-level object, and each element of a top-level array as
+    soon as its closing bracket arrives - so a batch cut off half way still
+    gives up the elements before the cut. Brackets in surrounding prose that
+    don't parse are skipped.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.pos = 0
+        self.depth = 0
+        self.start = None          # where the current top-level value started
+        self.in_array = False      # top-level value is an array
+        self.element_start = None  # where the current array element started
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, chunk):
+        """
+        Add text and return the values completed by it
+
+        Returns:
+            list of (value, in_array) - in_array is True for array elements
+        """
+        self.text += chunk
+        found = []
+        text = self.text
+        while self.pos < len(text):
+            ch = text[self.pos]
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == '\\':
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif self.depth == 0:
+                if ch in '{[':
+                    self.start, self.in_array, self.depth = self.pos, ch == '[', 1
+            elif ch == '"':
+                self.in_string = True
+            elif ch in '{[':
+                if self.in_array and self.depth == 1:
+                    self.element_start = self.pos
+                self.depth += 1
+            elif ch in '}]':
+                self.depth -= 1
+                if self.depth == 0:
+                    if not self._close(text[self.start:self.pos + 1], found):
+                        continue  # not JSON after all - rescan from just after its opening bracket
+                elif self.in_array and self.depth == 1 and self.element_start is not None:
+                    value = self._load(text[self.element_start:self.pos + 1])
+                    if value is not None:
+                        found.append((value, True))
+                    self.element_start = None
+            self.pos += 1
+        return found
+
+    def finish(self):
+        """
+        Call once the text is complete: an object still open at the end may
+        have been a stray bracket in prose, so look again past it
+
+        Returns:
+            list of (value, in_array), as feed()
+        """
+        found = []
+        while self.depth and not self.in_array:
+            self.pos, self.depth, self.in_string, self.escaped = self.start + 1, 0, False, False
+            found += self.feed('')
+        return found
+
+    def _close(self, candidate, found):
+        value = self._load(candidate)
+        if value is None and not self.in_array:
+            self.pos, self.depth, self.in_string, self.escaped = self.start + 1, 0, False, False
+            return False
+        if not self.in_array:
+            found.append((value, False))
+        # (array elements were already reported one by one)
+        self.start = None
+        return True
+
+    @staticmethod
+    def _load(candidate):
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            return None
+
+
+def json_values(text):
+    """
+    Every complete JSON value in text (array elements one by one)
+
+    Returns:
+        list of (value, in_array)
+    """
+    scanner = JSONScanner()
+    return scanner.feed(text or '') + scanner.finish()
+
+
+def clamp_score(value):
+    """
+    1-10 int from whatever the model gave ("7", 7.6, "8/10")
+
+    Returns:
+        int, or None if there's no number in it
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        match = NUMBER.search(value)
+        value = match.group() if match else None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(number):
+        return None
+    return min(SCORE_MAX, max(SCORE_MIN, math.floor(number + 0.5)))
+
+
+def validate_evaluation(result):
+    """
+    Check one parsed object against the score schema
+
+    Returns:
+        tuple: (evaluation dict or None if a score is missing, True if anything was adjusted)
+    """
+    if not isinstance(result, dict):
+        return None, False
+
+    evaluation = {}
+    adjusted = False
+    for field in SCORE_FIELDS:
+        score = clamp_score(result.get(field))
+        if score is None:
+            return None, False
+        adjusted = adjusted or score != result.get(field)
+        evaluation[field] = score
+
+    notes = result.get('notes')
+    notes = '' if notes is None else str(notes).strip()
+    if len(notes) > NOTES_MAX_CHARS:
+        notes = notes[:NOTES_MAX_CHARS - 1].rstrip() + '…'
+        adjusted = True
+    evaluation['notes'] = notes
+    return evaluation, adjusted
+
+
+def parse_evaluation(text):
+    """
+    The first valid evaluation in a model response
+
+    Returns:
+        dict: {'flip_score', 'weirdness_score', 'scam_likelihood', 'notes', 'evaluation_data'}
+
+    Raises:
+        ResponseError: nothing in the response passes validation
+    """
+    for value, _ in json_values(text):
+        evaluation, adjusted = validate_evaluation(value)
+        if evaluation:
+            clean = not adjusted and text.strip().startswith('{')
+            RESPONSES_PARSED.inc(outcome='clean' if clean else 'adjusted' if adjusted else 'extracted')
+            evaluation['evaluation_data'] = text
+            return evaluation
+
+    RESPONSES_PARSED.inc(outcome='failed')
+    raise ResponseError(f"no valid evaluation in response: {(text or '')[:80]!r}")
+
+
+def parse_batch(text, key='id'):
+    """
+    Evaluations from a batched response - a JSON array of objects each
+    carrying `key` - keeping every valid element even if others are broken
+    or the array was cut off
+
+    Returns:
+        tuple: (dict of key -> evaluation, list of problems)
+    """
+    results, problems = {}, []
+    for value, _ in json_values(text):
+        items = value if isinstance(value, list) else [value]
+        if isinstance(value, dict) and key not in value:
+            # {"results": [...]} - the list inside a wrapper object
+            items = next((v for v in value.values() if isinstance(v, list)), items)
+        for item in items:
+            item_key = item.get(key) if isinstance(item, dict) else None
+            if item_key is None:
+                problems.append(f"element without {key!r}")
+                continue
+            evaluation, _ = validate_evaluation(item)
+            if evaluation is None:
+                problems.append(f"{key}={item_key}: missing or non-numeric score")
+                continue
+            results.setdefault(item_key, evaluation)
+
+    if results:
+        RESPONSES_PARSED.inc(outcome='batch_partial' if problems else 'batch')
+    else:
+        RESPONSES_PARSED.inc(outcome='failed')
+    return results, problems
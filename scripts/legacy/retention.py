@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Retention for FB Marketplace Scout
+Moves old listings out of the hot database into monthly archive databases
+(archive/listings-YYYY-MM.db), so the tables the watcher and evaluator hit
+every few seconds stay small enough to live in the page cache
+
+A listing is archived once it is older than --days and nothing marks it as
+worth keeping: it has been evaluated, has no detail-page data (never opened
+or prefetched), isn't a near-duplicate and didn't score high on flip or scam.
+Its change history and evaluation payload go with it (plus the payload
+dictionaries, so the archive decodes on its own); its near-duplicate index entries and
+cluster membership are dropped (cluster price digests and seller aggregates
+keep what they learned from it).
+
+The hot database is switched to incremental auto-vacuum (one full VACUUM the
+first time), and freed pages are returned to the filesystem after each run.
+
+Usage:
+    python3 retention.py                       # archive listings older than 90 days
+    python3 retention.py --days 30 --dry-run   # what would move
+    python3 retention.py --stats               # hot/archive sizes
+    python3 retention.py --query "SELECT archive, COUNT(*) FROM all_listings GROUP BY archive"
+    python3 retention.py --since 2026-06 --query "SELECT title, price FROM all_listings WHERE title LIKE '%enlarger%'"
+"""
+import argparse
+import glob
+import os
+import sqlite3
+from urllib.parse import quote
+from database import DB_PATH, init_db, extract_item_id
+from near_duplicates import HASHER, ensure_band_layout
+from minhash import MinHasher
+
+RETENTION_DAYS = 90
+
+ARCHIVE_DIR = os.environ.get('SCOUT_ARCHIVE_DIR') or os.path.join(os.path.dirname(DB_PATH), 'archive')
+
+# Listings moved per transaction - keeps the write lock short
+BATCH_ROWS = 2000
+
+# Listings scoring at least this on flip or scam stay hot regardless of age
+KEEP_MIN_SCORE = 7
+
+# Tables copied into the archive, and the column that points at the listing
+ARCHIVED_TABLES = {
+    'listings': 'id',
+    'listing_history': 'listing_id',
+    'evaluation_payloads': 'listing_id',
+    'profile_scores': 'listing_id',
+}
+
+
+def archive_path(month):
+    return os.path.join(ARCHIVE_DIR, f'listings-{month}.db')
+
+
+def list_archives():
+    """
+    Returns:
+        list of (month 'YYYY-MM', path), oldest first
+    """
+    archives = []
+    for path in sorted(glob.glob(os.path.join(ARCHIVE_DIR, 'listings-*.db'))):
+        month = os.path.basename(path)[len('listings-'):-len('.db')]
+        archives.append((month, path))
+    return archives
+
+
+def _alias(month):
+    return 'archive_' + month.replace('-', '_')
+
+
+def _columns(conn, schema, table):
+    return [row[1] for row in conn.execute(f'PRAGMA {schema}.table_info({table})')]
+
+
+def ensure_incremental_vacuum(conn):
+    """
+    Switch the hot database to incremental auto-vacuum
+
+    Changing the mode takes a full VACUUM, so this is slow once and free after.
+
+    Returns:
+        bool: True if the database was converted
+    """
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+        return False
+    print("🧹 Switching to incremental auto-vacuum (one-off full VACUUM)...")
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.execute('VACUUM')
+    return True
+
+
+def _ensure_archive_schema(conn, alias):
+    """Create the archive's tables, or add columns the hot tables have gained since"""
+    for table in ARCHIVED_TABLES:
+        hot = _columns(conn, 'main', table)
+        archived = _columns(conn, alias, table)
+        if not archived:
+            conn.execute(f'CREATE TABLE {alias}.{table} AS SELECT * FROM main.{table} WHERE 0')
+            continue
+        for column in hot:
+            if column not in archived:
+                conn.execute(f'ALTER TABLE {alias}.{table} ADD COLUMN {column}')
+
+    conn.execute(f'CREATE INDEX IF NOT EXISTS {alias}.idx_archive_url ON listings(listing_url)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS {alias}.idx_archive_history ON listing_history(listing_id)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS {alias}.idx_archive_payloads ON evaluation_payloads(listing_id)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS {alias}.idx_archive_profile_scores ON profile_scores(listing_id)')
+
+    # Payload dictionaries are small and never change - copy any new ones
+    if not _columns(conn, alias, 'payload_dictionaries'):
+        conn.execute(f'CREATE TABLE {alias}.payload_dictionaries AS SELECT * FROM main.payload_dictionaries WHERE 0')
+        conn.execute(f'CREATE UNIQUE INDEX {alias}.idx_archive_dictionaries ON payload_dictionaries(id)')
+    conn.execute(f'INSERT OR IGNORE INTO {alias}.payload_dictionaries SELECT * FROM main.payload_dictionaries')
+
+
+def find_candidates(conn, days=RETENTION_DAYS):
+    """
+    Listings old and uninteresting enough to archive
+
+    Returns:
+        dict: {month: [listing_id, ...]}
+    """
+    c = conn.cursor()
+    c.execute('''
+        SELECT id, listing_url, strftime('%Y-%m', discovered_at)
+        FROM listings
+        WHERE discovered_at < datetime('now', ?)
+          AND evaluated = 1
+          AND is_duplicate = 0
+          AND COALESCE(flip_score, 0) < ?
+          AND COALESCE(scam_likelihood, 0) < ?
+          AND id NOT IN (SELECT listing_id FROM reevaluation_queue)
+    ''', (f'-{int(days)} days', KEEP_MIN_SCORE, KEEP_MIN_SCORE))
+    rows = c.fetchall()
+
+    # Drop listings with detail-page data (opened, or prefetched as promising)
+    viewed = set()
+    item_ids = [extract_item_id(row[1]) for row in rows]
+    for start in range(0, len(item_ids), 500):
+        chunk = [i for i in item_ids[start:start + 500] if i]
+        if chunk:
+            c.execute(f'SELECT item_id FROM listing_details WHERE item_id IN ({",".join("?" * len(chunk))})', chunk)
+            viewed.update(r[0] for r in c.fetchall())
+
+    by_month = {}
+    for (listing_id, _, month), item_id in zip(rows, item_ids):
+        if item_id not in viewed:
+            by_month.setdefault(month, []).append(listing_id)
+    return by_month
+
+
+def _move_batch(conn, alias, listing_ids, columns):
+    placeholders = ','.join('?' * len(listing_ids))
+    for table, key in ARCHIVED_TABLES.items():
+        cols = ', '.join(columns[table])
+        conn.execute(f'''
+            INSERT INTO {alias}.{table} ({cols})
+            SELECT {cols} FROM main.{table} WHERE {key} IN ({placeholders})
+        ''', listing_ids)
+
+    # Near-duplicate buckets are keyed by band, so work them out from the signatures
+    signatures = conn.execute(
+        f'SELECT listing_id, signature FROM text_signatures WHERE listing_id IN ({placeholders})', listing_ids
+    ).fetchall()
+    conn.executemany('DELETE FROM text_lsh WHERE band = ? AND bucket = ? AND listing_id = ?', [
+        (band, bucket, listing_id)
+        for listing_id, blob in signatures
+        for band, bucket in HASHER.band_keys(MinHasher.from_blob(blob))
+    ])
+
+    # Dependent rows first, the listing itself last
+    dropped = {'text_signatures': 'listing_id', 'listing_clusters': 'listing_id'}
+    for table, key in [*dropped.items(), *reversed(ARCHIVED_TABLES.items())]:
+        conn.execute(f'DELETE FROM main.{table} WHERE {key} IN ({placeholders})', listing_ids)
+
+
+def archive_listings(days=RETENTION_DAYS, dry_run=False):
+    """
+    Move eligible listings into their monthly archives
+
+    Each batch is one transaction across the hot and archive databases
+    (atomic in SQLite's default rollback-journal mode).
+
+    Returns:
+        dict: {month: listings archived}
+    """
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH)
+    moved = {}
+    try:
+        if not dry_run:
+            ensure_incremental_vacuum(conn)
+            # Bucket keys are recomputed from HASHER when deleting - they have
+            # to match the ones the index was filed under
+            ensure_band_layout(conn)
+
+        candidates = find_candidates(conn, days)
+        if dry_run:
+            return {month: len(ids) for month, ids in sorted(candidates.items())}
+
+        for month, listing_ids in sorted(candidates.items()):
+            alias = _alias(month)
+            conn.execute('ATTACH DATABASE ? AS ' + alias, (archive_path(month),))
+            try:
+                _ensure_archive_schema(conn, alias)
+                conn.commit()
+                columns = {table: _columns(conn, 'main', table) for table in ARCHIVED_TABLES}
+
+                for start in range(0, len(listing_ids), BATCH_ROWS):
+                    _move_batch(conn, alias, listing_ids[start:start + BATCH_ROWS], columns)
+                    conn.commit()
+                moved[month] = len(listing_ids)
+                print(f"📦 {month}: archived {len(listing_ids)} listings")
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.execute(f'DETACH DATABASE {alias}')
+
+        if moved:
+            free_before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            # execute() steps the pragma once, which frees a single page -
+            # executescript() runs it to completion
+            conn.executescript('PRAGMA incremental_vacuum')
+            freed = free_before - conn.execute('PRAGMA freelist_count').fetchone()[0]
+            page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+            print(f"🧹 Returned {freed * page_size / 1e6:.1f} MB to the filesystem")
+    finally:
+        conn.close()
+    return moved
+
+
+def open_unified(since=None):
+    """
+    Connection to the hot database with archives attached read-only and a
+    temp view, all_listings, over all of them (plus an 'archive' column:
+    'hot' or the archive month)
+
+    Args:
+        since (str): 'YYYY-MM' - only attach archives from this month on
+            (SQLite can only attach a handful of databases at once)
+
+    Returns:
+        sqlite3.Connection
+    """
+    # URI filenames, so archives can be attached with mode=ro
+    conn = sqlite3.connect(f'file:{quote(os.path.abspath(DB_PATH))}', uri=True)
+    archives = [(month, path) for month, path in list_archives() if not since or month >= since[:7]]
+    limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) if hasattr(conn, 'getlimit') else 10
+    if len(archives) > limit:
+        conn.close()
+        raise ValueError(f'{len(archives)} archives but only {limit} can be attached - pass since=')
+
+    columns = _columns(conn, 'main', 'listings')
+    selects = [f"SELECT {', '.join(columns)}, 'hot' AS archive FROM main.listings"]
+    for month, path in archives:
+        alias = _alias(month)
+        conn.execute(f'ATTACH DATABASE ? AS {alias}', (f'file:{quote(os.path.abspath(path))}?mode=ro',))
+        archived = set(_columns(conn, alias, 'listings'))
+        picked = ', '.join(column if column in archived else f'NULL AS {column}' for column in columns)
+        selects.append(f"SELECT {picked}, '{month}' AS archive FROM {alias}.listings")
+
+    conn.execute('CREATE TEMP VIEW all_listings AS ' + ' UNION ALL '.join(selects))
+    return conn
+
+
+def retention_stats():
+    """
+    Returns:
+        dict: {'hot': {'listings', 'bytes', 'free_bytes'}, 'archives': [{'month', 'listings', 'bytes'}]}
+    """
+    conn = sqlite3.connect(DB_PATH)
+    page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+    hot = {
+        'listings': conn.execute('SELECT COUNT(*) FROM listings').fetchone()[0],
+        'bytes': conn.execute('PRAGMA page_count').fetchone()[0] * page_size,
+        'free_bytes': conn.execute('PRAGMA freelist_count').fetchone()[0] * page_size,
+        'auto_vacuum': ('none', 'full', 'incremental')[conn.execute('PRAGMA auto_vacuum').fetchone()[0]]
+    }
+    conn.close()
+
+    archives = []
+    for month, path in list_archives():
+        archive = sqlite3.connect(path)
+        archives.append({
+            'month': month,
+            'listings': archive.execute('SELECT COUNT(*) FROM listings').fetchone()[0],
+            'bytes': os.path.getsize(path)
+        })
+        archive.close()
+    return {'hot': hot, 'archives': archives}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive old listings into monthly databases')
+    parser.add_argument('--days', type=int, default=RETENTION_DAYS, help='archive listings older than this')
+    parser.add_argument('--dry-run', action='store_true', help='only count what would be archived')
+    parser.add_argument('--stats', action='store_true', help='show hot and archive sizes')
+    parser.add_argument('--vacuum', action='store_true', help='full VACUUM of the hot database afterwards')
+    parser.add_argument('--query', metavar='SQL', help='run SQL against the all_listings view')
+    parser.add_argument('--since', metavar='YYYY-MM', help='with --query: only attach archives from this month')
+    args = parser.parse_args()
+
+    init_db()
+
+    if args.query:
+        conn = open_unified(args.since)
+        c = conn.execute(args.query)
+        print(' | '.join(d[0] for d in c.description or []))
+        for row in c.fetchall():
+            print(' | '.join('' if v is None else str(v) for v in row))
+        conn.close()
+        return
+
+    if args.stats:
+        stats = retention_stats()
+        hot = stats['hot']
+        print(f"🔥 Hot: {hot['listings']} listings, {hot['bytes'] / 1e6:.1f} MB "
+              f"({hot['free_bytes'] / 1e6:.1f} MB free, auto_vacuum={hot['auto_vacuum']})")
+        for archive in stats['archives']:
+            print(f"📦 {archive['month']}: {archive['listings']} listings, {archive['bytes'] / 1e6:.1f} MB")
+        return
+
+    result = archive_listings(args.days, dry_run=args.dry_run)
+    if args.dry_run:
+        for month, count in result.items():
+            print(f"📦 {month}: {count} listings would be archived")
+        print(f"📊 {sum(result.values())} listings older than {args.days} days would move")
+    elif not result:
+        print(f"✅ Nothing older than {args.days} days to archive")
+
+    if args.vacuum and not args.dry_run:
+        conn = sqlite3.connect(DB_PATH)
+        conn.execute('VACUUM')
+        conn.close()
+        print("🧹 Vacuumed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Buyer profile and scoring rubric for FB Marketplace Scout
+
+Who we're scoring for - interests, location, the heuristic keyword rules and
+the LLM prompt - lives in a JSON file instead of the code, so each buyer gets
+a config file rather than a fork. It's parsed and compiled once (keyword
+lists become one regex per rule, prompt templates are rendered), and
+re-checked by mtime while the evaluator runs, so edits apply to the next
+listing without a restart. A file that fails to load leaves the previous
+rubric in place.
+
+Every evaluation stores the rubric version it was scored under (the file's
+"version" label plus a hash of its content), so scores from an older rubric
+can be told apart and re-scored: `scout.py rescore --stale`.
+
+Several buyers can share one feed: each entry in "profiles" overrides the
+settings for one buyer, and every listing is scored for all of them in the
+same pass - one keyword scan covering every profile's rules, and one LLM
+call asking for each buyer's scores (stored in profile_scores, see
+database.py). The first profile's scores also go on the listing itself.
+
+Usage:
+    python3 rubric.py                         # show the active rubric
+    python3 rubric.py --check my-rubric.json  # validate a file
+    SCOUT_RUBRIC=buyers/alex.json python3 evaluator.py
+
+Config file (JSON): see rubric.example.json - keys left out keep their defaults.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+RUBRIC_PATH = os.environ.get('SCOUT_RUBRIC') or os.path.join(HERE, 'rubric.json')
+
+# Seconds between mtime checks for changes to the file
+RELOAD_CHECK_SECONDS = 2
+
+# Scores the keyword rules can add to
+SCORES = ('flip_score', 'weirdness_score', 'scam_likelihood')
+
+DEFAULTS = {
+    'name': 'default',
+    'version': '1',
+    'interests': ['electronics', 'film/darkroom gear', 'test equipment', 'weird items', 'bulk lots'],
+    'location': 'Seymour, CT',
+    'pickup': 'prefers local pickup',
+    'overlay_footer': 'Seymour, CT • Friday pickups only',
+    # Buyers scored side by side: each entry needs a unique "name" and
+    # overrides the settings here for that buyer (empty = one buyer)
+    'profiles': [],
+    # Heuristic keyword rules: points added when any word appears in the
+    # field ("text" = title, description and condition), optionally only
+    # below a price
+    'keywords': {
+        'flip_score': [
+            {'words': ['vintage', 'antique', 'rare', 'estate'], 'points': 2},
+            {'words': ['bulk', 'lot of', 'collection'], 'points': 1},
+        ],
+        'weirdness_score': [
+            {'words': ['tube', 'oscilloscope', 'darkroom', 'enlarger', 'film'], 'points': 4, 'field': 'title'},
+            {'words': ['weird', 'strange', 'unusual', 'unique'], 'points': 3},
+            {'words': ['for parts', "doesn't work", 'broken'], 'points': 2},
+        ],
+        'scam_likelihood': [
+            # expensive items too cheap
+            {'words': ['iphone', 'macbook', 'airpods', 'ps5', 'xbox'], 'points': 5, 'field': 'title',
+             'below_price': 200},
+        ],
+    },
+    # LLM prompt. {name}, {interests}, {location} and {pickup} are filled
+    # in; other braces are left alone. With profiles, "profiles_rubric"
+    # replaces "rubric", listing each buyer as "profile" renders them.
+    'prompt': {
+        'header': 'You are evaluating a Facebook Marketplace listing for flip potential.',
+        'rubric': '''User interests: {interests}
+User location: {location} ({pickup})
+
+Rate 1-10:
+1. Flip potential (resale value vs price, demand)
+2. Weirdness score (unique, interesting, unusual)
+3. Scam likelihood (price too low, generic description, red flags)
+
+Respond ONLY with JSON:
+{
+  "flip_score": X,
+  "weirdness_score": X,
+  "scam_likelihood": X,
+  "notes": "one sentence explanation"
+}''',
+        'profile': '- "{name}": interested in {interests}; based in {location} ({pickup})',
+        'profiles_rubric': '''Score it separately for each of these buyers:
+{profiles}
+
+Rate 1-10 for each buyer:
+1. Flip potential (resale value vs price, demand)
+2. Weirdness score (unique, interesting, unusual)
+3. Scam likelihood (price too low, generic description, red flags)
+
+Respond ONLY with a JSON array, one object per buyer:
+[
+  {"profile": "buyer name", "flip_score": X, "weirdness_score": X, "scam_likelihood": X,
+   "notes": "one sentence explanation"}
+]''',
+    },
+}
+
+
+def _merge(base, overrides):
+    """Config with overrides applied (keywords and prompt merged per key)"""
+    merged = {**base, **overrides}
+    for key in ('keywords', 'prompt'):
+        merged[key] = {**(base.get(key) or {}), **(overrides.get(key) or {})}
+    return merged
+
+
+class KeywordIndex:
+    """
+    Finds which of a set of keywords occur in a text, in one regex pass
+
+    Keywords match anywhere, as `word in text` does. Every position is tried
+    (the alternation sits in a lookahead) and the longest keyword found there
+    wins, so the shorter ones it starts with are counted as found there too.
+    """
+
+    def __init__(self, words):
+        words = sorted(set(words), key=len, reverse=True)
+        self.pattern = re.compile('(?=(%s))' % '|'.join(map(re.escape, words))) if words else None
+        self.prefixes = {word: [other for other in words if word.startswith(other)] for word in words}
+
+    def scan(self, text):
+        """
+        Returns:
+            set: the keywords in text
+        """
+        found = set()
+        if self.pattern is not None:
+            for match in self.pattern.finditer(text):
+                found.update(self.prefixes[match.group(1)])
+        return found
+
+
+class Rubric:
+    """
+    A compiled rubric
+
+    Args:
+        config (dict): file contents (missing keys fall back to DEFAULTS)
+        path (str): where it came from, for messages
+    """
+
+    def __init__(self, config, path=None):
+        if not isinstance(config, dict):
+            raise ValueError('expected a JSON object')
+        # Scores/parts left out of keywords and prompt keep their defaults too
+        overrides = config
+        config = _merge(DEFAULTS, config)
+        self.config = config
+        self.path = path
+        self.name = config['name']
+        self.location = config['location']
+        self.overlay_footer = config['overlay_footer']
+
+        content = json.dumps(config, sort_keys=True).encode()
+        self.version = f"{config['version']}-{hashlib.sha1(content).hexdigest()[:8]}"
+
+        fill = {
+            '{name}': config['name'],
+            '{interests}': ', '.join(config['interests']),
+            '{location}': config['location'],
+            '{pickup}': config['pickup'],
+        }
+        prompt = {}
+        for part, template in config['prompt'].items():
+            for placeholder, value in fill.items():
+                template = template.replace(placeholder, value)
+            prompt[part] = template
+        self.prompt = prompt
+        self.header = prompt['header']
+
+        self.rules = {score: [] for score in SCORES}
+        for score, rules in config['keywords'].items():
+            if score not in SCORES:
+                raise ValueError(f"keywords: unknown score {score!r} (expected one of {', '.join(SCORES)})")
+            for rule in rules:
+                if not rule.get('words') or not isinstance(rule.get('points'), (int, float)):
+                    raise ValueError(f"keywords.{score}: each rule needs words and points, got {rule!r}")
+                if rule.get('field', 'text') not in ('title', 'text'):
+                    raise ValueError(f"keywords.{score}: field must be 'title' or 'text', got {rule['field']!r}")
+                words = frozenset(word.lower() for word in rule['words'])
+                field = rule.get('field', 'text')
+                self.rules[score].append((words, field, rule['points'], rule.get('below_price')))
+
+        # Buyers scored together (just this one without "profiles")
+        self.multi_profile = bool(config['profiles'])
+        self.profiles = []
+        base = {key: value for key, value in overrides.items() if key != 'profiles'}
+        for entry in config['profiles']:
+            if not isinstance(entry, dict) or not entry.get('name'):
+                raise ValueError(f"profiles: each profile needs a name, got {entry!r}")
+            if any(profile.name == entry['name'] for profile in self.profiles):
+                raise ValueError(f"profiles: {entry['name']!r} appears twice")
+            self.profiles.append(Rubric(_merge(base, entry), path))
+        self.profiles = self.profiles or [self]
+
+        if self.multi_profile:
+            listed = '\n'.join(profile.prompt['profile'] for profile in self.profiles)
+            self.system_prompt = f"{prompt['header']}\n\n{prompt['profiles_rubric'].replace('{profiles}', listed)}"
+        else:
+            self.system_prompt = f"{prompt['header']}\n\n{prompt['rubric']}"
+
+        # Every profile's keywords, so one scan serves them all
+        self.keyword_index = KeywordIndex(
+            word for profile in self.profiles for rules in profile.rules.values() for words, *_ in rules
+            for word in words)
+
+    def scan_keywords(self, title, text):
+        """
+        Find every profile's keywords in a listing
+
+        Args:
+            title (str): lowercased title
+            text (str): lowercased title, description and condition
+
+        Returns:
+            dict: {'title': set of keywords, 'text': set of keywords}, for keyword_points()
+        """
+        return {'title': self.keyword_index.scan(title), 'text': self.keyword_index.scan(text)}
+
+    def keyword_points(self, found, price):
+        """
+        Points the keyword rules add to each score
+
+        Args:
+            found (dict): from scan_keywords() (on this rubric or the one
+                holding it as a profile)
+            price (float): asking price (0 if unknown)
+
+        Returns:
+            dict: {score: points}
+        """
+        points = {}
+        for score, rules in self.rules.items():
+            total = 0
+            for words, field, rule_points, below_price in rules:
+                if below_price is not None and price >= below_price:
+                    continue
+                if not words.isdisjoint(found[field]):
+                    total += rule_points
+            points[score] = total
+        return points
+
+
+def load_rubric(path=RUBRIC_PATH):
+    """
+    Parse and compile a rubric file (the defaults if it doesn't exist)
+
+    Raises:
+        ValueError: the file isn't valid JSON or a rule is malformed
+    """
+    if not os.path.exists(path):
+        return Rubric({})
+    with open(path) as f:
+        return Rubric(json.load(f), path)
+
+
+_current = {'rubric': None, 'mtime': None, 'checked_at': 0.0}
+_lock = threading.Lock()
+
+
+def current_rubric():
+    """The active rubric, reloaded when its file changes (checked every RELOAD_CHECK_SECONDS)"""
+    with _lock:
+        now = time.monotonic()
+        if _current['rubric'] is not None and now - _current['checked_at'] < RELOAD_CHECK_SECONDS:
+            return _current['rubric']
+        _current['checked_at'] = now
+
+        try:
+            mtime = os.stat(RUBRIC_PATH).st_mtime
+        except OSError:
+            mtime = None
+        if _current['rubric'] is not None and mtime == _current['mtime']:
+            return _current['rubric']
+
+        previous = _current['rubric']
+        try:
+            rubric = load_rubric(RUBRIC_PATH)
+        except (OSError, ValueError) as e:
+            if previous is None:
+                raise
+            print(f"⚠️  Couldn't reload {RUBRIC_PATH}, keeping rubric {previous.version}: {e}")
+            _current['mtime'] = mtime
+            return previous
+
+        _current.update(rubric=rubric, mtime=mtime)
+        if previous is not None and rubric.version != previous.version:
+            print(f"📐 Rubric reloaded: {previous.version} -> {rubric.version} "
+                  f"(run `scout.py rescore --stale` to re-score older evaluations)")
+        return rubric
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show or check a scoring rubric')
+    parser.add_argument('--check', metavar='PATH', help='validate this file instead of showing the active rubric')
+    args = parser.parse_args()
+
+    path = args.check or RUBRIC_PATH
+    if args.check and not os.path.exists(path):
+        print(f"❌ {path}: no such file")
+        raise SystemExit(1)
+    try:
+        rubric = load_rubric(path)
+    except (OSError, ValueError) as e:
+        print(f"❌ {path}: {e}")
+        raise SystemExit(1)
+
+    source = rubric.path or 'built-in defaults'
+    print(f"📐 Rubric {rubric.name!r} version {rubric.version} ({source})")
+    print(f"   Location: {rubric.location}")
+    if rubric.multi_profile:
+        print(f"   Profiles: " + ', '.join(f"{profile.name} ({profile.location})" for profile in rubric.profiles))
+    else:
+        print(f"   Keyword rules: " + ', '.join(f"{score} {len(rules)}" for score, rules in rubric.rules.items()))
+    print(f"\n{rubric.system_prompt}")
+
+
+if __name__ == '__main__':
+    main()
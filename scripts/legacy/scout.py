@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the FB Marketplace Scout scripts
+
+Nothing is imported until a command is picked, and heavy dependencies
+(playwright, anthropic) are only loaded by the commands that use them, so
+cron jobs like `status` and `rescore` start in tens of milliseconds.
+
+Usage:
+    python3 scout.py status
+    python3 scout.py watch --profile
+    python3 scout.py rescore --days 7            # re-score last week's listings now
+    python3 scout.py rescore --queue-only        # just mark everything for the evaluator
+    python3 scout.py rescore --stale             # only scores from an older rubric
+    python3 scout.py <command> --help
+"""
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# command -> (script, summary). Each script runs as if started directly.
+COMMANDS = {
+    'watch': ('watcher.py', 'watch the feed in the browser and save listings'),
+    'evaluate': ('evaluator.py', 'score pending listings in a loop'),
+    'pipeline': ('pipeline.py', 'watch and score in one process'),
+    'serve': ('server.py', 'serve scores to the bookmarklet, plus /metrics'),
+    'crawl': ('crawler.py', 'run saved searches headlessly'),
+    'ollama': ('ollama_client.py', 'check the local model server'),
+    'status': ('status.py', 'database summary and recent listings'),
+    'init': ('database.py', 'create or migrate the database'),
+    'comparables': ('comparables.py', 'comparable-price clusters'),
+    'duplicates': ('near_duplicates.py', 'near-duplicate listing text'),
+    'sellers': ('sellers.py', 'seller reputation'),
+    'rubric': ('rubric.py', 'show or check the scoring rubric'),
+    'metrics': ('metrics.py', 'print merged metrics from all processes'),
+    'usage': ('usage.py', 'LLM token usage and spend'),
+    'snapshot': ('snapshot.py', 'columnar export of listings for analytics'),
+    'retention': ('retention.py', 'archive old listings into monthly databases'),
+    'payloads': ('payloads.py', 'compressed evaluation payload storage'),
+    'replay': ('replay.py', 'record/replay feed sessions offline'),
+    'bench-evaluator': ('bench-evaluator.py', 'evaluator accuracy/throughput benchmark'),
+    'bench-database': ('bench-database.py', 'database query benchmark'),
+}
+
+
+def run_script(script, argv):
+    """Run a script's __main__ block with argv as its arguments"""
+    import runpy
+    path = os.path.join(HERE, script)
+    sys.argv = [path] + list(argv)
+    runpy.run_path(path, run_name='__main__')
+
+
+def rescore(argv):
+    import argparse
+    parser = argparse.ArgumentParser(prog='scout.py rescore', description='Score already-evaluated listings again')
+    parser.add_argument('--days', type=int, help='only listings discovered in the last N days')
+    parser.add_argument('--stale', action='store_true',
+                        help='only listings scored under an older rubric (see rubric.py)')
+    parser.add_argument('--queue-only', action='store_true',
+                        help="mark them pending and leave scoring to the running evaluator/pipeline")
+    args = parser.parse_args(argv)
+
+    from database import init_db, mark_for_rescore
+    init_db()
+    current_version = None
+    if args.stale:
+        from rubric import current_rubric
+        current_version = current_rubric().version
+    count = mark_for_rescore(args.days, current_version)
+    print(f"🔄 Queued {count} listings for re-scoring")
+    if count and not args.queue_only:
+        run_script('pipeline.py', ['--no-browser', '--once'])
+
+
+def print_help():
+    print(__doc__.strip().split('\n\n')[0])
+    print("\nCommands:")
+    for name, (script, summary) in COMMANDS.items():
+        print(f"   {name:<16} {summary}")
+    print(f"   {'rescore':<16} score already-evaluated listings again")
+    print("\nRun `python3 scout.py <command> --help` for a command's options.")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help', 'help'):
+        print_help()
+        return
+
+    command, rest = argv[0], argv[1:]
+    # The scripts import their siblings by module name
+    sys.path.insert(0, HERE)
+    if command == 'rescore':
+        rescore(rest)
+    elif command in COMMANDS:
+        run_script(COMMANDS[command][0], rest)
+    else:
+        print(f"❌ Unknown command: {command}")
+        print_help()
+        sys.exit(2)
+
+
+if __name__ == '__main__':
+    main()
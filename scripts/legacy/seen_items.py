@@ -0,0 +1,89 @@
+"""
+Bounded "already seen" set for long-running watchers
+Stores normalized Marketplace item IDs (or card fingerprints) as 8-byte integers
+instead of full URL strings
+"""
+import hashlib
+import os
+from array import array
+from bisect import bisect_left
+from heapq import merge
+
+# Memory budget for seen IDs (8 bytes each) - 4 MB holds ~500k listings
+SEEN_MEMORY_MB = float(os.environ.get('SCOUT_SEEN_MEMORY_MB', 4))
+
+# New IDs are buffered in a small set and merged into the sorted arrays in batches
+BUFFER_SIZE = 4096
+
+
+def item_key(item_id):
+    """
+    Integer key for an item ID
+
+    Real Marketplace IDs are numeric; anything else (test fixtures, odd URLs)
+    gets a stable 63-bit hash.
+    """
+    if item_id.isdigit() and len(item_id) < 19:
+        return int(item_id)
+    return int.from_bytes(hashlib.blake2b(item_id.encode(), digest_size=8).digest(), 'big') >> 1
+
+
+def card_key(item_id, card_text):
+    """
+    Integer key for a feed card's content
+
+    Changes when the card's price/title text does, so an edited or repriced
+    listing is re-ingested (and its change logged) instead of skipped.
+    """
+    return item_key(f'{item_id}|{" ".join((card_text or "").split())}')
+
+
+class SeenItems:
+    """
+    Two-generation, array-backed set of item IDs with a fixed memory cap
+
+    IDs live in sorted array('q') generations (lookup by binary search). When the
+    current generation fills half the budget the previous one is dropped, so memory
+    stays flat no matter how long the watcher runs. Forgetting an old ID only costs
+    a redundant add_listing() call - the listings table's unique URL index is the
+    real source of truth.
+    """
+
+    def __init__(self, memory_mb=SEEN_MEMORY_MB, buffer_size=BUFFER_SIZE):
+        self.generation_size = max(buffer_size, int(memory_mb * 1024 * 1024) // 8 // 2)
+        self.buffer_size = buffer_size
+        self.current = array('q')
+        self.previous = array('q')
+        self.recent = set()
+        self.rotations = 0
+
+    def __contains__(self, key):
+        return key in self.recent or self._in(self.current, key) or self._in(self.previous, key)
+
+    def __len__(self):
+        return len(self.recent) + len(self.current) + len(self.previous)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the ID arrays"""
+        return (len(self.current) + len(self.previous)) * 8
+
+    def add(self, key):
+        if key in self:
+            return
+        self.recent.add(key)
+        if len(self.recent) >= self.buffer_size:
+            self._flush()
+
+    def _flush(self):
+        self.current = array('q', merge(self.current, sorted(self.recent)))
+        self.recent.clear()
+        if len(self.current) >= self.generation_size:
+            self.previous = self.current
+            self.current = array('q')
+            self.rotations += 1
+
+    @staticmethod
+    def _in(ids, key):
+        i = bisect_left(ids, key)
+        return i < len(ids) and ids[i] == key
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Seller reputation aggregates for FB Marketplace Scout
+One row per seller with running totals that are updated as listings are
+ingested, flagged and evaluated - the evaluator reads a single row instead of
+scanning the seller's listings
+
+Usage:
+    python3 sellers.py --rebuild        # recompute every seller from the listings table
+    python3 sellers.py --top 20         # busiest sellers right now
+"""
+import argparse
+import math
+import sqlite3
+import time
+from datetime import datetime, timezone
+from database import DB_PATH, init_db
+from comparables import PriceDigest, price_against_comparables
+
+# Posting velocity is an exponentially decayed listing count with this time
+# constant, i.e. roughly "listings in the last day"
+VELOCITY_WINDOW_SECONDS = 24 * 3600
+
+# Seller names that are really extraction misses
+IGNORED_SELLERS = {'', 'unknown', 'marketplace', 'facebook'}
+
+# Aggregates based on fewer samples than this aren't reported
+MIN_SAMPLES = 3
+
+
+def seller_key(seller_name):
+    """Normalized seller key, or None if there's no usable name"""
+    key = ' '.join((seller_name or '').lower().split())
+    return None if key in IGNORED_SELLERS else key
+
+
+def decayed_velocity(velocity, velocity_at, now):
+    if not velocity or velocity_at is None:
+        return 0.0
+    return velocity * math.exp(-max(0.0, now - velocity_at) / VELOCITY_WINDOW_SECONDS)
+
+
+def observe_seller_listing(seller_name, price_ratio=None, seen_at=None, conn=None):
+    """
+    Count a newly ingested listing against its seller
+
+    Args:
+        seller_name (str): name as extracted from the card
+        price_ratio (float): listing price / comparables median, if known
+        seen_at (float): unix time the listing was seen (defaults to now)
+
+    Returns:
+        str: seller_key, or None if the listing has no usable seller
+    """
+    key = seller_key(seller_name)
+    if not key:
+        return None
+    now = seen_at or time.time()
+
+    own_conn = conn is None
+    conn = conn or sqlite3.connect(DB_PATH)
+    try:
+        c = conn.cursor()
+        c.execute('SELECT velocity, velocity_at, price_ratio_digest FROM sellers WHERE seller_key = ?', (key,))
+        row = c.fetchone()
+        if not row:
+            c.execute('INSERT INTO sellers (seller_key, seller_name) VALUES (?, ?)', (key, seller_name.strip()))
+            row = (0.0, None, None)
+
+        velocity = decayed_velocity(row[0], row[1], now) + 1
+        last_seen = datetime.fromtimestamp(now, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        digest = PriceDigest.from_json(row[2])
+        if price_ratio is not None and price_ratio > 0:
+            digest.add(price_ratio)
+
+        c.execute('''
+            UPDATE sellers
+            SET listing_count = listing_count + 1,
+                velocity = ?,
+                velocity_at = ?,
+                price_ratio_digest = ?,
+                last_seen = ?
+            WHERE seller_key = ?
+        ''', (velocity, now, digest.to_json(), last_seen, key))
+        conn.commit()
+        return key
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def record_duplicates(listing_ids, conn=None):
+    """Count newly flagged duplicate listings against their sellers"""
+    if not listing_ids:
+        return
+
+    own_conn = conn is None
+    conn = conn or sqlite3.connect(DB_PATH)
+    try:
+        c = conn.cursor()
+        c.execute(f'''
+            SELECT seller_name FROM listings WHERE id IN ({','.join('?' * len(listing_ids))})
+        ''', list(listing_ids))
+
+        counts = {}
+        for (name,) in c.fetchall():
+            key = seller_key(name)
+            if key:
+                counts[key] = counts.get(key, 0) + 1
+
+        c.executemany('UPDATE sellers SET duplicate_count = duplicate_count + ? WHERE seller_key = ?',
+                      [(n, key) for key, n in counts.items()])
+        conn.commit()
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def record_evaluation(seller_name, scam_likelihood, previous=None, conn=None):
+    """
+    Fold a listing's scam score into its seller's mean
+
+    Args:
+        previous (int): the listing's earlier score when it's being re-evaluated,
+            so re-scoring replaces rather than adds to the total
+    """
+    key = seller_key(seller_name)
+    if not key or scam_likelihood is None:
+        return
+
+    own_conn = conn is None
+    conn = conn or sqlite3.connect(DB_PATH)
+    try:
+        c = conn.cursor()
+        if previous is None:
+            c.execute('''
+                UPDATE sellers SET evaluated_count = evaluated_count + 1, scam_total = scam_total + ?
+                WHERE seller_key = ?
+            ''', (scam_likelihood, key))
+        else:
+            c.execute('UPDATE sellers SET scam_total = scam_total + ? WHERE seller_key = ?',
+                      (scam_likelihood - previous, key))
+        conn.commit()
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def get_seller_features(seller_name):
+    """
+    Reputation features for the evaluator
+
+    Returns:
+        dict or None if the seller is unknown: {
+            'listing_count': int,
+            'listings_per_day': float (recent posting velocity),
+            'median_price_ratio': float or None (price / comparables median),
+            'duplicate_count': int (listings flagged as duplicates),
+            'mean_scam': float or None (mean scam_likelihood of evaluated listings)
+        }
+    """
+    key = seller_key(seller_name)
+    if not key:
+        return None
+
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        c = conn.cursor()
+        c.execute('''
+            SELECT listing_count, duplicate_count, evaluated_count, scam_total,
+                   velocity, velocity_at, price_ratio_digest
+            FROM sellers WHERE seller_key = ?
+        ''', (key,))
+        row = c.fetchone()
+    except sqlite3.OperationalError:
+        return None  # sellers table not created yet (run database.py)
+    finally:
+        conn.close()
+
+    if not row:
+        return None
+
+    listing_count, duplicate_count, evaluated_count, scam_total, velocity, velocity_at, digest_json = row
+    digest = PriceDigest.from_json(digest_json)
+    return {
+        'listing_count': listing_count,
+        'listings_per_day': decayed_velocity(velocity, velocity_at, time.time()),
+        'median_price_ratio': digest.quantile(0.5) if digest.count >= MIN_SAMPLES else None,
+        'duplicate_count': duplicate_count,
+        'mean_scam': scam_total / evaluated_count if evaluated_count >= MIN_SAMPLES else None
+    }
+
+
+def rebuild_sellers():
+    """Recompute every seller's aggregates from the listings table"""
+    init_db()
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('DELETE FROM sellers')
+    conn.commit()
+
+    c.execute('''
+        SELECT id, seller_name, title, price, discovered_at, is_duplicate, evaluated, scam_likelihood
+        FROM listings
+        ORDER BY discovered_at, id
+    ''')
+    rows = c.fetchall()
+
+    duplicates = []
+    for listing_id, seller_name, title, price, discovered_at, is_duplicate, evaluated, scam in rows:
+        try:
+            # discovered_at is SQLite CURRENT_TIMESTAMP, i.e. UTC
+            seen_at = datetime.fromisoformat(discovered_at).replace(tzinfo=timezone.utc).timestamp() \
+                if discovered_at else None
+        except ValueError:
+            seen_at = None
+        comparables = price_against_comparables(title, price, listing_id)
+        if not observe_seller_listing(seller_name, comparables and comparables['price_ratio'], seen_at, conn):
+            continue
+        if is_duplicate:
+            duplicates.append(listing_id)
+        if evaluated and scam is not None:
+            record_evaluation(seller_name, scam, conn=conn)
+
+    record_duplicates(duplicates, conn)
+
+    c.execute('SELECT COUNT(*) FROM sellers')
+    print(f"✅ Rebuilt {c.fetchone()[0]} sellers from {len(rows)} listings")
+    conn.close()
+
+
+def show_top_sellers(limit):
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('SELECT seller_name, listing_count, duplicate_count, velocity, velocity_at FROM sellers')
+    rows = c.fetchall()
+    conn.close()
+
+    now = time.time()
+    ranked = sorted(rows, key=lambda r: -decayed_velocity(r[3], r[4], now))[:limit]
+    for name, listing_count, duplicate_count, velocity, velocity_at in ranked:
+        print(f"👤 {name}: {decayed_velocity(velocity, velocity_at, now):.1f}/day | "
+              f"{listing_count} listings | {duplicate_count} duplicates")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seller reputation aggregates')
+    parser.add_argument('--rebuild', action='store_true', help='recompute all sellers from listings')
+    parser.add_argument('--top', type=int, metavar='N', help='show the N busiest sellers')
+    args = parser.parse_args()
+
+    if args.rebuild:
+        rebuild_sellers()
+    if args.top:
+        show_top_sellers(args.top)
+
+
+if __name__ == '__main__':
+    main()
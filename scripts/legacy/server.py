@@ -3,16 +3,74 @@
 Simple HTTP server to provide evaluation data to bookmarklet
 """
 from http.server import HTTPServer, BaseHTTPRequestHandler
+import argparse
+import ipaddress
 import json
 import sqlite3
-from database import DB_PATH
+import time
+from database import DB_PATH, get_profile_scores
+from metrics import DUMP_INTERVAL_SECONDS, counter, histogram, load_dumps, render_all, start_dumper
+import profiler
+from rubric import current_rubric
 from urllib.parse import urlparse
 
+HTTP_REQUESTS = counter('scout_http_requests_total', 'Requests served, by route and status')
+HTTP_SECONDS = histogram('scout_http_request_seconds', 'Request handling time, by route')
+
+
+# A process whose metrics dump is older than this has exited or hung - its
+# pid isn't signalled
+PROFILE_DUMP_MAX_AGE = 2 * DUMP_INTERVAL_SECONDS
+
 
 class ScoutHandler(BaseHTTPRequestHandler):
     def do_GET(self):
+        self.serve(self.handle_path)
+
+    def do_POST(self):
+        self.serve(self.handle_post)
+
+    def serve(self, handler):
         # Parse URL
         path = urlparse(self.path).path
+        if path.startswith(('/check/', '/profile/')):
+            route = '/' + path.split('/')[1]
+        else:
+            route = path if path in ('/', '/metrics') else 'other'
+        started = time.perf_counter()
+        try:
+            handler(path)
+        finally:
+            HTTP_REQUESTS.inc(route=route, status=getattr(self, 'status', 500))
+            HTTP_SECONDS.observe(time.perf_counter() - started, route=route)
+
+    def handle_post(self, path):
+        if not path.startswith('/profile/'):
+            self.send_json(404, {'error': 'not found'})
+        elif not ipaddress.ip_address(self.client_address[0]).is_loopback:
+            # Signals local processes - only from this machine
+            self.send_json(403, {'error': 'profiling can only be toggled from localhost'})
+        else:
+            self.send_json(*toggle_profiler(path.split('/profile/')[1]))
+
+    def send_response(self, code, message=None):
+        self.status = code
+        super().send_response(code, message)
+
+    def handle_path(self, path):
+        if path == '/metrics':
+            # Prometheus scrape: this server plus the watcher/evaluator dumps
+            body = render_all().encode()
+            self.send_response(200)
+            self.send_header('Content-type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if path.startswith('/profile/'):
+            self.send_json(405, {'error': 'use POST to toggle profiling'})
+            return
 
         # CORS headers
         self.send_response(200)
@@ -30,7 +88,7 @@ class ScoutHandler(BaseHTTPRequestHandler):
                 c = conn.cursor()
 
                 c.execute('''
-                    SELECT evaluated, flip_score, weirdness_score, scam_likelihood, notes
+                    SELECT evaluated, flip_score, weirdness_score, scam_likelihood, notes, rubric_version, id
                     FROM listings
                     WHERE listing_url LIKE ?
                 ''', (f'%{item_id}%',))
@@ -44,7 +102,12 @@ class ScoutHandler(BaseHTTPRequestHandler):
                         'flip': result[1] or 0,
                         'weird': result[2] or 0,
                         'scam': result[3] or 0,
-                        'notes': result[4] or ''
+                        'notes': result[4] or '',
+                        'rubric_version': result[5],
+                        # scored under an older rubric (rescore --stale fixes it)
+                        'stale': bool(result[0]) and result[5] != current_rubric().version,
+                        # per buyer, when the rubric has several profiles
+                        'profiles': get_profile_scores(result[6])
                     }
                 else:
                     response = {'evaluated': False}
@@ -55,16 +118,57 @@ class ScoutHandler(BaseHTTPRequestHandler):
         else:
             self.wfile.write(json.dumps({'status': 'Scout server running'}).encode())
 
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
     def log_message(self, format, *args):
         # Suppress log messages
         pass
 
 
+def toggle_profiler(process):
+    """
+    Toggle the sampling profiler in this server or another Scout process
+
+    Other processes are found by the pid in their metrics dump and signalled
+    - only if the dump is recent and the pid is still running a Scout script.
+
+    Returns:
+        tuple: (HTTP status, response dict)
+    """
+    if process == 'server':
+        if profiler.PROFILER is None:
+            profiler.install('server')
+        was_running = profiler.PROFILER.running
+        written = profiler.PROFILER.toggle()
+        return 200, {'process': 'server', 'profiling': profiler.PROFILER.running,
+                     'written': written if was_running else None}
+
+    for state in load_dumps():
+        if state.get('process') == process:
+            if time.time() - state.get('dumped_at', 0) > PROFILE_DUMP_MAX_AGE:
+                return 409, {'process': process, 'error': 'metrics dump is stale - process not running?'}
+            try:
+                profiler.signal_process(state['pid'])
+            except OSError as e:
+                return 409, {'process': process, 'error': str(e)}
+            return 200, {'process': process, 'signalled': state['pid']}
+    return 404, {'process': process, 'error': 'no metrics dump for this process'}
+
+
 def run_server(port=8765):
     server_address = ('', port)
     httpd = HTTPServer(server_address, ScoutHandler)
+    start_dumper('server')
     print(f"🌐 Scout server running on http://localhost:{port}")
     print("📋 Bookmarklet can now query evaluations")
+    print(f"📈 Metrics at http://localhost:{port}/metrics")
+    print(f"🔬 Toggle profiling: curl -X POST http://localhost:{port}/profile/<server|watcher|evaluator>")
     print("⌨️  Press Ctrl+C to stop\n")
 
     try:
@@ -74,4 +178,9 @@ def run_server(port=8765):
 
 
 if __name__ == '__main__':
-    run_server()
+    parser = argparse.ArgumentParser(description='Serve evaluations to the bookmarklet')
+    parser.add_argument('--port', type=int, default=8765)
+    profiler.add_arguments(parser)
+    args = parser.parse_args()
+    profiler.install_from_args('server', args)
+    run_server(args.port)
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Columnar snapshots of the listings database for analytics
+Streams listings and their scores out of SQLite in chunks into a compact
+columnar file, and loads it back memory-mapped (no per-row Python objects)
+
+Two formats:
+    arrow  one Arrow IPC file (needs pyarrow)
+    npy    a directory of .npy files, one per column, plus manifest.json -
+           written with the standard library, so it works everywhere, and
+           memory-mapped by numpy when it's installed
+
+Text columns (title, seller, location) are dictionary-encoded: int32 codes
+per row, each distinct string stored once. Missing scores are -1, a
+missing price is NaN.
+
+Usage:
+    python3 snapshot.py export snapshots/2026-10     # arrow if available, else npy
+    python3 snapshot.py export snapshots/2026-10 --format npy --chunk 20000
+    python3 snapshot.py summary snapshots/2026-10    # price/score distributions
+
+    from snapshot import load_snapshot
+    snap = load_snapshot('snapshots/2026-10')
+    prices = snap.column('price')                    # numpy array / memoryview
+    locations = snap.dictionary('location')          # code -> string
+"""
+import argparse
+import ast
+import json
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import time
+from array import array
+from collections import Counter
+from database import DB_PATH, extract_item_id, parse_price
+
+# Rows fetched from SQLite per chunk
+CHUNK_ROWS = 50000
+
+# name, .npy dtype, array typecode - in table order
+NUMERIC_COLUMNS = (
+    ('id', '<i8', 'q'),
+    ('item_id', '<i8', 'q'),         # -1 if the URL has no numeric item ID
+    ('discovered_at', '<i8', 'q'),   # unix seconds
+    ('price', '<f8', 'd'),
+    ('evaluated', '|i1', 'b'),
+    ('is_duplicate', '|i1', 'b'),
+    ('flip_score', '|i1', 'b'),
+    ('weirdness_score', '|i1', 'b'),
+    ('scam_likelihood', '|i1', 'b'),
+)
+
+# Dictionary-encoded as int32 codes ('<i4'), -1 for NULL
+TEXT_COLUMNS = ('title', 'seller_name', 'location')
+
+NPY_MAGIC = b'\x93NUMPY'
+
+EXPORT_QUERY = '''
+    SELECT id, listing_url, CAST(strftime('%s', discovered_at) AS INTEGER),
+           price, evaluated, is_duplicate, flip_score, weirdness_score, scam_likelihood,
+           title, seller_name, location
+    FROM listings
+    ORDER BY id
+'''
+
+
+def _score(value):
+    return -1 if value is None else int(value)
+
+
+def _convert(row, dictionaries):
+    """One SQLite row -> numeric values and text codes, in column order"""
+    item_id = extract_item_id(row[1])
+    price = parse_price(row[3])
+    numeric = (
+        row[0],
+        int(item_id) if item_id and item_id.isdigit() else -1,
+        row[2] or 0,
+        math.nan if price is None else price,
+        row[4] or 0,
+        row[5] or 0,
+        _score(row[6]),
+        _score(row[7]),
+        _score(row[8]),
+    )
+    codes = []
+    for name, value in zip(TEXT_COLUMNS, row[9:]):
+        if value is None:
+            codes.append(-1)
+        else:
+            codes.append(dictionaries[name].setdefault(value, len(dictionaries[name])))
+    return numeric, codes
+
+
+def _read_chunks(conn, chunk_rows):
+    c = conn.cursor()
+    c.execute(EXPORT_QUERY)
+    while True:
+        rows = c.fetchmany(chunk_rows)
+        if not rows:
+            return
+        yield rows
+
+
+def _npy_header(dtype, rows):
+    """.npy v1.0 header, padded so the data starts 64-byte aligned"""
+    header = f"{{'descr': '{dtype}', 'fortran_order': False, 'shape': ({rows},), }}"
+    unpadded = len(NPY_MAGIC) + 4 + len(header) + 1
+    header += ' ' * (-unpadded % 64) + '\n'
+    return NPY_MAGIC + b'\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1')
+
+
+def export_npy(out_dir, chunk_rows=CHUNK_ROWS):
+    """
+    Write the npy-directory format
+
+    Returns:
+        int: rows exported
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    columns = [(name, dtype, code) for name, dtype, code in NUMERIC_COLUMNS] + \
+              [(name, '<i4', 'i') for name in TEXT_COLUMNS]
+    dictionaries = {name: {} for name in TEXT_COLUMNS}
+
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        # One read transaction, so the count matches the rows streamed
+        conn.execute('BEGIN')
+        rows = conn.execute('SELECT COUNT(*) FROM listings').fetchone()[0]
+
+        files = {}
+        for name, dtype, _ in columns:
+            files[name] = open(os.path.join(out_dir, f'{name}.npy'), 'wb')
+            files[name].write(_npy_header(dtype, rows))
+
+        written = 0
+        try:
+            for chunk in _read_chunks(conn, chunk_rows):
+                buffers = {name: array(code) for name, _, code in columns}
+                for row in chunk:
+                    numeric, codes = _convert(row, dictionaries)
+                    for (name, _, _), value in zip(NUMERIC_COLUMNS, numeric):
+                        buffers[name].append(value)
+                    for name, code in zip(TEXT_COLUMNS, codes):
+                        buffers[name].append(code)
+                for name, buffer in buffers.items():
+                    if sys.byteorder == 'big':
+                        buffer.byteswap()
+                    buffer.tofile(files[name])
+                written += len(chunk)
+        finally:
+            for f in files.values():
+                f.close()
+    finally:
+        conn.close()
+
+    for name, values in dictionaries.items():
+        with open(os.path.join(out_dir, f'{name}.dict.json'), 'w') as f:
+            json.dump(list(values), f)
+
+    with open(os.path.join(out_dir, 'manifest.json'), 'w') as f:
+        json.dump({
+            'format': 'npy',
+            'rows': written,
+            'exported_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'source': DB_PATH,
+            'columns': {name: dtype for name, dtype, _ in columns},
+            'dictionary_columns': list(TEXT_COLUMNS)
+        }, f, indent=2)
+    return written
+
+
+def export_arrow(path, chunk_rows=CHUNK_ROWS):
+    """
+    Write one Arrow IPC file, a record batch per chunk
+
+    Text dictionaries only grow, so later batches add dictionary deltas
+    instead of repeating strings.
+
+    Returns:
+        int: rows exported
+    """
+    import pyarrow as pa
+
+    types = {'<i8': pa.int64(), '<f8': pa.float64(), '|i1': pa.int8()}
+    schema = pa.schema(
+        [pa.field(name, types[dtype]) for name, dtype, _ in NUMERIC_COLUMNS] +
+        [pa.field(name, pa.dictionary(pa.int32(), pa.string())) for name in TEXT_COLUMNS]
+    )
+    dictionaries = {name: {} for name in TEXT_COLUMNS}
+    options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(DB_PATH)
+    written = 0
+    try:
+        conn.execute('BEGIN')
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+            for chunk in _read_chunks(conn, chunk_rows):
+                converted = [_convert(row, dictionaries) for row in chunk]
+                arrays = [
+                    pa.array([numeric[i] for numeric, _ in converted], types[dtype])
+                    for i, (_, dtype, _) in enumerate(NUMERIC_COLUMNS)
+                ]
+                for i, name in enumerate(TEXT_COLUMNS):
+                    indices = pa.array([codes[i] if codes[i] >= 0 else None for _, codes in converted], pa.int32())
+                    dictionary = pa.array(list(dictionaries[name]), pa.string())
+                    arrays.append(pa.DictionaryArray.from_arrays(indices, dictionary))
+                writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                written += len(chunk)
+    finally:
+        conn.close()
+    return written
+
+
+def export_snapshot(path, fmt='auto', chunk_rows=CHUNK_ROWS):
+    """
+    Export listings to a columnar snapshot
+
+    Args:
+        path (str): .arrow file or npy directory to write
+        fmt (str): 'arrow', 'npy' or 'auto' (arrow if pyarrow is installed)
+
+    Returns:
+        dict: {'format', 'path', 'rows', 'seconds', 'bytes'}
+    """
+    if fmt == 'auto':
+        try:
+            import pyarrow  # noqa: F401
+            fmt = 'arrow'
+        except ImportError:
+            fmt = 'npy'
+    if fmt == 'arrow' and not path.endswith('.arrow'):
+        path += '.arrow'
+
+    started = time.perf_counter()
+    rows = export_arrow(path, chunk_rows) if fmt == 'arrow' else export_npy(path, chunk_rows)
+    seconds = time.perf_counter() - started
+
+    if os.path.isdir(path):
+        size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+    else:
+        size = os.path.getsize(path)
+    return {'format': fmt, 'path': path, 'rows': rows, 'seconds': seconds, 'bytes': size}
+
+
+class Snapshot:
+    """
+    A loaded snapshot. Columns are memory-mapped - nothing is read until used.
+
+    column() gives a numpy array when numpy is installed (or the file is
+    Arrow), otherwise a typed memoryview over the mapped file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._maps = []
+        self._dictionaries = {}
+        if os.path.isdir(path):
+            with open(os.path.join(path, 'manifest.json')) as f:
+                self.manifest = json.load(f)
+            self.format = 'npy'
+            self.rows = self.manifest['rows']
+            self.columns = list(self.manifest['columns'])
+        else:
+            import pyarrow as pa
+            self.format = 'arrow'
+            # Every batch's dictionary extends the previous one, so unifying
+            # keeps the codes as written
+            self.table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all().unify_dictionaries()
+            self.rows = self.table.num_rows
+            self.columns = self.table.column_names
+
+    def column(self, name):
+        """Values of a numeric column, or codes of a dictionary column"""
+        if self.format == 'arrow':
+            import pyarrow as pa
+            chunks = self.table.column(name).chunks
+            if name in TEXT_COLUMNS:
+                return pa.concat_arrays([chunk.indices for chunk in chunks]).fill_null(-1).to_numpy()
+            return self.table.column(name).to_numpy()
+
+        file_path = os.path.join(self.path, f'{name}.npy')
+        try:
+            import numpy as np
+            return np.load(file_path, mmap_mode='r')
+        except ImportError:
+            pass
+
+        with open(file_path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        header_len = struct.unpack('<H', mapped[8:10])[0]
+        header = ast.literal_eval(mapped[10:10 + header_len].decode('latin1'))
+        typecode = {'<i8': 'q', '<f8': 'd', '|i1': 'b', '<i4': 'i'}[header['descr']]
+        if sys.byteorder == 'big' and header['descr'] != '|i1':
+            raise ValueError('memoryview fallback needs a little-endian machine - install numpy')
+        return memoryview(mapped)[10 + header_len:].cast(typecode)
+
+    def dictionary(self, name):
+        """Strings of a dictionary-encoded column, indexed by code"""
+        if name not in self._dictionaries:
+            if self.format == 'arrow':
+                chunks = self.table.column(name).chunks
+                self._dictionaries[name] = chunks[0].dictionary.to_pylist() if chunks else []
+            else:
+                with open(os.path.join(self.path, f'{name}.dict.json')) as f:
+                    self._dictionaries[name] = json.load(f)
+        return self._dictionaries[name]
+
+    def close(self):
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
+
+
+def load_snapshot(path):
+    """Open a snapshot written by export_snapshot()"""
+    if not os.path.exists(path) and os.path.exists(path + '.arrow'):
+        path += '.arrow'
+    return Snapshot(path)
+
+
+def _percentiles(values, points=(10, 50, 90)):
+    if not values:
+        return {p: None for p in points}
+    values = sorted(values)
+    return {p: values[min(len(values) - 1, len(values) * p // 100)] for p in points}
+
+
+def summarize(snapshot):
+    """
+    Price percentiles and score histograms over the whole snapshot
+
+    Returns:
+        dict
+    """
+    price = snapshot.column('price')
+    evaluated = snapshot.column('evaluated')
+    scores = {name: snapshot.column(name) for name in ('flip_score', 'weirdness_score', 'scam_likelihood')}
+
+    try:
+        import numpy as np
+        price = np.asarray(price)
+        priced = price[np.isfinite(price) & (price > 0)]
+        done = np.asarray(evaluated) == 1
+        return {
+            'rows': snapshot.rows,
+            'evaluated': int(done.sum()),
+            'price': _percentiles([]) if not len(priced) else
+            {p: float(v) for p, v in zip((10, 50, 90), np.percentile(priced, (10, 50, 90)))},
+            'scores': {
+                name: np.bincount(np.asarray(values)[done].clip(0, 10), minlength=11).tolist()
+                for name, values in scores.items()
+            }
+        }
+    except ImportError:
+        pass
+
+    histograms = {}
+    for name, values in scores.items():
+        counts = [0] * 11
+        for value, n in Counter(v for e, v in zip(evaluated, values) if e == 1).items():
+            counts[min(10, max(0, value))] += n
+        histograms[name] = counts
+    return {
+        'rows': snapshot.rows,
+        'evaluated': evaluated.tolist().count(1),
+        'price': _percentiles([p for p in price if p > 0]),  # NaN compares False
+        'scores': histograms
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Columnar snapshots of the listings database')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    exp = sub.add_parser('export', help='write a snapshot')
+    exp.add_argument('path', help='.arrow file or npy directory')
+    exp.add_argument('--format', choices=('auto', 'arrow', 'npy'), default='auto')
+    exp.add_argument('--chunk', type=int, default=CHUNK_ROWS, help='rows per chunk')
+
+    summ = sub.add_parser('summary', help='price/score distributions of a snapshot')
+    summ.add_argument('path')
+
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        result = export_snapshot(args.path, args.format, args.chunk)
+        print(f"✅ Exported {result['rows']} listings to {result['path']} ({result['format']}, "
+              f"{result['bytes'] / 1e6:.1f} MB) in {result['seconds']:.1f}s")
+        return
+
+    started = time.perf_counter()
+    snapshot = load_snapshot(args.path)
+    summary = summarize(snapshot)
+    seconds = time.perf_counter() - started
+
+    print(f"📊 {summary['rows']} listings, {summary['evaluated']} evaluated ({snapshot.format}, {seconds * 1000:.0f} ms)")
+    price = summary['price']
+    if price[50] is not None:
+        print(f"   💰 p10 ${price[10]:.0f} | median ${price[50]:.0f} | p90 ${price[90]:.0f}")
+    for name, counts in summary['scores'].items():
+        print(f"   {name:<16} " + ' '.join(f'{count:>6}' for count in counts[1:]))
+    snapshot.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,8 @@ Show current status of FB Marketplace Scout database
 """
 import sqlite3
 import os
-from database import DB_PATH, get_listing_stats
+from database import DB_PATH, get_listing_stats, get_recent_price_drops
+from usage import DAILY_BUDGET_USD, spent_today, usage_stats
 
 def show_recent_listings(limit=10):
     """Show most recently discovered listings"""
@@ -38,9 +39,34 @@ def main():
     print(f"   Total discovered: {stats['total']}")
     print(f"   Evaluated: {stats['evaluated']}")
     print(f"   Pending evaluation: {stats['pending']}")
+    if stats['needs_reevaluation']:
+        print(f"   Heuristic fallback, awaiting LLM: {stats['needs_reevaluation']}")
     print(f"   Scams detected: {stats['scams']}")
     print(f"   Flippable items: {stats['flippable']}")
 
+    # LLM spend (only once something has been logged). Sections backed by
+    # tables newer than the database are skipped - this report doesn't
+    # migrate it (run database.py)
+    try:
+        usage = usage_stats(days=1)
+    except sqlite3.OperationalError:
+        usage = []
+    if usage:
+        budget = f" of ${DAILY_BUDGET_USD:.2f} budget" if DAILY_BUDGET_USD else ""
+        print(f"\n💸 LLM: {sum(row['calls'] for row in usage)} calls in the last 24h, "
+              f"${spent_today():.2f} spent today (UTC){budget}")
+
+    # Price drops are the best buy signal - show them first
+    try:
+        drops = get_recent_price_drops(hours=24, limit=5)
+    except sqlite3.OperationalError:
+        drops = []
+    if drops:
+        print(f"\n📉 Price Drops (last 24h):\n")
+        for drop in drops:
+            print(f"   {drop['title']}")
+            print(f"      💰 {drop['old_price']} → {drop['new_price']} | 🔗 {drop['listing_url']}")
+
     # Show recent listings
     print(f"\n🕐 Recent Discoveries:\n")
     recent = show_recent_listings(10)
@@ -58,9 +84,11 @@ def main():
 
     print("=" * 70)
     print("\n💡 Commands:")
-    print("   python3 watcher.py      - Start watching marketplace")
-    print("   python3 status.py       - Show this status")
-    print("   python3 database.py     - Reinitialize database")
+    print("   python3 scout.py watch      - Start watching marketplace")
+    print("   python3 scout.py pipeline   - Watch and score in one process")
+    print("   python3 scout.py status     - Show this status")
+    print("   python3 scout.py rescore    - Score everything again")
+    print("   python3 scout.py --help     - All commands")
     print()
 
 
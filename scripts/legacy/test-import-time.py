@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for the Scout scripts
+
+Imports each module in a fresh interpreter (best of a few runs, so one slow
+disk read doesn't fail it) and fails if it goes over its budget or pulls in
+a heavy dependency that should only load on first use.
+
+Usage:
+    python3 test-import-time.py
+    python3 test-import-time.py --runs 5 --slack 2   # noisy CI box: allow 2x the budget
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Milliseconds of cumulative import time allowed per module
+BUDGETS_MS = {
+    'scout': 15,
+    'status': 60,
+    'database': 60,
+    'evaluator': 100,
+    'pipeline': 200,
+    'watcher': 200,
+    'server': 200,
+}
+
+# Only imported when actually used (browser launch, first Claude or Ollama call)
+LAZY_MODULES = ('anthropic', 'playwright', 'requests')
+
+CHECK_CODE = '''
+import sys
+import {module}
+print(','.join(m for m in {lazy!r} if m in sys.modules))
+'''
+
+
+def measure(module):
+    """
+    Import `module` once in a fresh interpreter
+
+    Returns:
+        tuple: (milliseconds, lazy modules that got imported)
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHECK_CODE.format(module=module, lazy=LAZY_MODULES)],
+        cwd=HERE, capture_output=True, text=True, env={**os.environ, 'SCOUT_METRICS_DIR': os.devnull}
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    # "import time: self [us] | cumulative | name" - the module's own line
+    micros = None
+    for line in result.stderr.splitlines():
+        parts = [p.strip() for p in line.split('|')]
+        if len(parts) == 3 and parts[2] == module:
+            micros = int(parts[1])
+    loaded = [m for m in result.stdout.strip().split(',') if m]
+    return micros / 1000, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check module import times against their budgets')
+    parser.add_argument('--runs', type=int, default=3, help='imports per module (best one counts)')
+    parser.add_argument('--slack', type=float, default=1.0, help='multiply every budget by this')
+    args = parser.parse_args()
+
+    failures = 0
+    print("⏱️  Import-time budgets\n")
+    for module, budget in BUDGETS_MS.items():
+        try:
+            runs = [measure(module) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"   ❌ {module:<12} failed to import: {e}")
+            failures += 1
+            continue
+
+        best = min(ms for ms, _ in runs)
+        loaded = sorted({m for _, mods in runs for m in mods})
+        limit = budget * args.slack
+        ok = best <= limit and not loaded
+        failures += not ok
+
+        line = f"   {'✅' if ok else '❌'} {module:<12} {best:7.1f} ms (budget {limit:.0f} ms)"
+        if loaded:
+            line += f" - imported {', '.join(loaded)} eagerly"
+        print(line)
+
+    print()
+    if failures:
+        print(f"❌ {failures} module(s) over budget")
+        sys.exit(1)
+    print("✅ All modules within budget")
+
+
+if __name__ == '__main__':
+    main()
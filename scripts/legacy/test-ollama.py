@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test the Ollama backend against a tiny stub server
+
+The stub speaks just enough of the Ollama API (/api/tags, streaming
+/api/generate) to check the client: streamed NDJSON is reassembled,
+requests in flight never exceed the parallel slots, connections are reused,
+keep_alive and the static system prompt are sent every time, and 503s are
+retried by the backend wrapper.
+
+Usage:
+    python3 test-ollama.py
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PARALLEL = 3
+REQUESTS = 12
+
+RESPONSE = '{"flip_score": 8, "weirdness_score": 6, "scam_likelihood": 2, "notes": "Cheap scope"}'
+
+
+class StubState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.connections = set()
+        self.bodies = []
+        self.fail_next = 0
+
+
+state = StubState()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so connection reuse is visible
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        state.connections.add(self.client_address)
+        self.send_json(200, {'models': [{'name': 'tinyllama:latest'}, {'name': 'mistral:7b'}]})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with state.lock:
+            state.connections.add(self.client_address)
+            state.bodies.append(body)
+            if state.fail_next:
+                state.fail_next -= 1
+                failing = True
+            else:
+                failing = False
+                state.active += 1
+                state.max_active = max(state.max_active, state.active)
+
+        if failing:
+            self.send_json(503, {'error': 'server busy'})
+            return
+
+        # Stream the response a few characters per line, chunked
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        pieces = [RESPONSE[i:i + 7] for i in range(0, len(RESPONSE), 7)]
+        for piece in pieces:
+            self.write_chunk({'model': body['model'], 'response': piece, 'done': False})
+            time.sleep(0.005)
+        self.write_chunk({'model': body['model'], 'response': '', 'done': True,
+                          'prompt_eval_count': 120, 'eval_count': len(pieces)})
+        self.wfile.write(b'0\r\n\r\n')
+
+        with state.lock:
+            state.active -= 1
+
+    def write_chunk(self, obj):
+        line = (json.dumps(obj) + '\n').encode()
+        self.wfile.write(f'{len(line):x}\r\n'.encode() + line + b'\r\n')
+
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ['OLLAMA_HOST'] = f'http://127.0.0.1:{server.server_port}'
+    os.environ['OLLAMA_NUM_PARALLEL'] = str(PARALLEL)
+    os.environ['SCOUT_DB_PATH'] = os.path.join(tempfile.mkdtemp(), 'test.db')
+    os.environ['SCOUT_METRICS_DIR'] = os.devnull
+
+    import database
+    import evaluator
+    import ollama_client
+    from backends import Backend
+
+    database.init_db()
+    failures = 0
+
+    def check(ok, message):
+        nonlocal failures
+        failures += not ok
+        print(f"   {'✅' if ok else '❌'} {message}")
+
+    print("\n🦙 Ollama backend against a stub server\n")
+
+    client = ollama_client.get_client()
+    check(client.model() == 'mistral:7b', f"picked preferred model ({client.model()})")
+
+    result = client.generate('Say hi', system='Be brief', format='json')
+    check(result['text'] == RESPONSE, "streamed NDJSON reassembled")
+    check(result['prompt_tokens'] == 120 and result['output_tokens'] > 1, "token counts from the final line")
+
+    listing = {'id': 1, 'title': 'Tektronix oscilloscope', 'price': '$40', 'location': 'Seymour, CT',
+               'seller_name': 'Sam', 'details': None, 'is_duplicate': False}
+    with ThreadPoolExecutor(max_workers=REQUESTS) as pool:
+        results = list(pool.map(evaluator.evaluate_with_ollama, [listing] * REQUESTS))
+    check(all(r['flip_score'] == 8 and r['notes'] == 'Cheap scope' for r in results),
+          f"{REQUESTS} concurrent evaluations parsed")
+    check(state.max_active <= PARALLEL, f"at most {PARALLEL} in flight (saw {state.max_active})")
+    check(len(state.connections) <= PARALLEL + 1,
+          f"connections reused ({len(state.connections)} for {len(state.bodies) + 1} requests)")
+
+    bodies = state.bodies[1:]
+    check(all(b.get('keep_alive') == ollama_client.KEEP_ALIVE for b in bodies), "keep_alive sent on every call")
+    check(len({b['system'] for b in bodies}) == 1 and all(listing['title'] in b['prompt'] for b in bodies),
+          "same system prompt every call, listing only in the prompt")
+
+    state.fail_next = 2
+    backend = Backend('ollama', evaluator.evaluate_with_ollama, sleep=lambda seconds: None)
+    check(backend.evaluate(listing)['flip_score'] == 8, "503s retried until the server answers")
+
+    server.shutdown()
+    print()
+    if failures:
+        print(f"❌ {failures} check(s) failed")
+        sys.exit(1)
+    print("✅ All checks passed")
+
+
+if __name__ == '__main__':
+    main()
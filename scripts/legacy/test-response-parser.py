@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test LLM response parsing against the ways models actually answer
+
+Usage:
+    python3 test-response-parser.py
+"""
+import os
+import sys
+
+os.environ.setdefault('SCOUT_METRICS_DIR', os.devnull)
+
+from response_parser import JSONScanner, ResponseError, parse_batch, parse_evaluation
+
+SCORES = '"flip_score": 7, "weirdness_score": 3, "scam_likelihood": 2'
+
+# (response, expected (flip, weird, scam) or None if it should be rejected)
+SINGLE_CASES = [
+    ('bare JSON', '{%s, "notes": "ok"}' % SCORES, (7, 3, 2)),
+    ('code fence', 'Here you go:\n```json\n{%s}\n```' % SCORES, (7, 3, 2)),
+    ('prose with braces first', 'Judging {roughly} :-{ here: {%s}' % SCORES, (7, 3, 2)),
+    ('brace and quote inside notes', '{%s, "notes": "a } and a \\" here"}' % SCORES, (7, 3, 2)),
+    ('strings and out-of-range', '{"flip_score": "8/10", "weirdness_score": 3.6, "scam_likelihood": 12}', (8, 4, 10)),
+    ('array of one', '[{%s}]' % SCORES, (7, 3, 2)),
+    ('truncated', '{"flip_score": 5, "weirdness_score": ', None),
+    ('missing score', '{"flip_score": 5, "weirdness_score": 5, "notes": "x"}', None),
+    ('no JSON', 'I cannot evaluate this listing.', None),
+]
+
+
+def main():
+    failures = 0
+
+    def check(ok, message):
+        nonlocal failures
+        failures += not ok
+        print(f"   {'✅' if ok else '❌'} {message}")
+
+    print("\n🧩 Response parsing\n")
+    for name, text, expected in SINGLE_CASES:
+        try:
+            result = parse_evaluation(text)
+            got = (result['flip_score'], result['weirdness_score'], result['scam_likelihood'])
+        except ResponseError:
+            got = None
+        check(got == expected, f"{name}: {got}")
+
+    batch = ('Sure! [{"id": 1, %s}, {"id": 2, "flip_score": "n/a", "weirdness_score": 2, "scam_likelihood": 1}, '
+             '{"id": 3, %s, "notes": "cut of' % (SCORES, SCORES))
+    results, problems = parse_batch(batch)
+    check(list(results) == [1] and len(problems) == 1, f"cut-off batch keeps the valid element ({list(results)})")
+
+    wrapped, _ = parse_batch('{"results": [{"id": "a", %s}, {"id": "b", %s}]}' % (SCORES, SCORES))
+    check(sorted(wrapped) == ['a', 'b'], "batch wrapped in an object")
+
+    text = '[{"id": 1, %s}, {"id": 2, %s}]' % (SCORES, SCORES)
+    scanner, seen = JSONScanner(), []
+    for i in range(0, len(text), 5):
+        seen += [(i + 5 >= len(text), value['id']) for value, _ in scanner.feed(text[i:i + 5])]
+    check(seen == [(False, 1), (True, 2)], "streamed elements reported as soon as they close")
+
+    print()
+    if failures:
+        print(f"❌ {failures} check(s) failed")
+        sys.exit(1)
+    print("✅ All checks passed")
+
+
+if __name__ == '__main__':
+    main()
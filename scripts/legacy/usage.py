@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Token and cost accounting for LLM evaluations
+
+Every backend call is logged to llm_usage with its token counts (prompt
+cache reads and writes split out) and what it cost. With a daily budget set,
+the paid backends stop taking calls once the day's spend reaches it - the
+evaluator moves on to the next backend or the heuristics, and those listings
+are re-scored after midnight UTC when the budget resets (see backends.py).
+
+Usage:
+    python3 usage.py              # today's calls, tokens, cache hits and spend
+    python3 usage.py --days 7
+    SCOUT_DAILY_BUDGET_USD=2 python3 evaluator.py
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from metrics import counter, gauge
+
+# USD per million tokens. Cache writes cost 1.25x input, cache reads 0.1x.
+PRICES_PER_MTOK = {
+    'claude-sonnet-4-20250514': {'input': 3.0, 'output': 15.0, 'cache_write': 3.75, 'cache_read': 0.30},
+}
+
+# Spend cap per UTC day across all processes (unset = no cap)
+DAILY_BUDGET_USD = float(os.environ.get('SCOUT_DAILY_BUDGET_USD') or 0) or None
+
+# Seconds between re-reading the day's spend from the database (other
+# processes spend too); this process's own calls are added as they happen
+BUDGET_REFRESH_SECONDS = 60
+
+LLM_TOKENS = counter('scout_llm_tokens_total', 'LLM tokens, by backend and kind')
+LLM_COST = counter('scout_llm_cost_usd_total', 'LLM spend in USD, by backend')
+SPENT_TODAY = gauge('scout_llm_spent_today_usd', 'LLM spend so far today (UTC)')
+
+# Today's spend as last read from the database, plus calls made since
+_spend = {'day': None, 'usd': 0.0, 'read_at': 0.0}
+_spend_lock = threading.Lock()
+
+
+def call_cost(model, usage):
+    """
+    USD cost of one call (0 for models with no price, e.g. local ones)
+
+    Args:
+        usage (dict): input_tokens, output_tokens, cache_read_tokens, cache_write_tokens
+    """
+    prices = PRICES_PER_MTOK.get(model)
+    if not prices:
+        return 0.0
+    return (usage.get('input_tokens', 0) * prices['input']
+            + usage.get('output_tokens', 0) * prices['output']
+            + usage.get('cache_write_tokens', 0) * prices['cache_write']
+            + usage.get('cache_read_tokens', 0) * prices['cache_read']) / 1_000_000
+
+
+def record_usage(listing_id, backend, model, usage):
+    """
+    Log one call's tokens and cost
+
+    Returns:
+        float: the call's cost in USD
+    """
+    from database import DB_PATH
+
+    cost = call_cost(model, usage)
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute('''
+        INSERT INTO llm_usage (listing_id, backend, model, input_tokens, output_tokens,
+                               cache_read_tokens, cache_write_tokens, cost_usd)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (listing_id, backend, model, usage.get('input_tokens', 0), usage.get('output_tokens', 0),
+          usage.get('cache_read_tokens', 0), usage.get('cache_write_tokens', 0), cost))
+    conn.commit()
+    conn.close()
+
+    for kind in ('input', 'output', 'cache_read', 'cache_write'):
+        if usage.get(f'{kind}_tokens'):
+            LLM_TOKENS.inc(usage[f'{kind}_tokens'], backend=backend, kind=kind)
+    if cost:
+        LLM_COST.inc(cost, backend=backend)
+        with _spend_lock:
+            _spend['usd'] += cost
+    return cost
+
+
+def spent_today():
+    """USD spent on LLM calls since midnight UTC (re-read every BUDGET_REFRESH_SECONDS)"""
+    from database import DB_PATH
+
+    with _spend_lock:
+        day = time.strftime('%Y-%m-%d', time.gmtime())
+        if _spend['day'] != day or time.monotonic() - _spend['read_at'] >= BUDGET_REFRESH_SECONDS:
+            conn = sqlite3.connect(DB_PATH)
+            row = conn.execute('SELECT COALESCE(SUM(cost_usd), 0) FROM llm_usage WHERE created_at >= ?',
+                               (day,)).fetchone()
+            conn.close()
+            _spend.update(day=day, usd=row[0], read_at=time.monotonic())
+        SPENT_TODAY.set(_spend['usd'])
+        return _spend['usd']
+
+
+def within_budget(budget=None):
+    """True while today's spend is under the daily budget (always, with no budget set)"""
+    budget = DAILY_BUDGET_USD if budget is None else budget
+    return budget is None or spent_today() < budget
+
+
+def usage_stats(days=1):
+    """
+    Calls, tokens and spend per backend and model over the last N days
+
+    Returns:
+        list of dicts, most expensive first
+    """
+    from database import DB_PATH
+
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('''
+        SELECT backend, model, COUNT(*), SUM(input_tokens), SUM(output_tokens),
+               SUM(cache_read_tokens), SUM(cache_write_tokens), SUM(cost_usd)
+        FROM llm_usage
+        WHERE created_at >= datetime('now', ?)
+        GROUP BY backend, model
+        ORDER BY SUM(cost_usd) DESC
+    ''', (f'-{int(days)} days',))
+    rows = c.fetchall()
+    conn.close()
+
+    return [
+        {
+            'backend': r[0],
+            'model': r[1],
+            'calls': r[2],
+            'input_tokens': r[3],
+            'output_tokens': r[4],
+            'cache_read_tokens': r[5],
+            'cache_write_tokens': r[6],
+            'cost_usd': r[7],
+            # share of prompt tokens served from the cache
+            'cache_hit_rate': r[5] / (r[3] + r[5] + r[6]) if r[3] + r[5] + r[6] else 0.0
+        }
+        for r in rows
+    ]
+
+
+def main():
+    from database import init_db
+
+    parser = argparse.ArgumentParser(description='LLM token usage and spend')
+    parser.add_argument('--days', type=int, default=1, help='look back this many days')
+    args = parser.parse_args()
+
+    init_db()
+    stats = usage_stats(args.days)
+    print(f"\n💸 LLM usage, last {args.days} day(s)\n")
+    if not stats:
+        print("   No LLM calls logged")
+    for row in stats:
+        print(f"   {row['backend']:<8} {row['model']:<28} {row['calls']:>6} calls  "
+              f"{row['input_tokens']:>9} in  {row['output_tokens']:>8} out  "
+              f"cache {row['cache_hit_rate']:.0%}  ${row['cost_usd']:.2f}")
+
+    spent = spent_today()
+    budget = f" of ${DAILY_BUDGET_USD:.2f} budget" if DAILY_BUDGET_USD else " (no daily budget set)"
+    print(f"\n   Today (UTC): ${spent:.2f}{budget}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,12 @@
 """
-Direct manipulation version - runs checks every second
+Direct manipulation version - checks for listing pages every second
 """
 import asyncio
 import os
 from playwright.async_api import async_playwright
 from database import init_db, DB_PATH
+from enrichment import enrich_listing_page
+from page_cleanup import CLEANUP_INIT_SCRIPT
 import sqlite3
 
 USER_DATA_DIR = os.path.expanduser('~/.fb-marketplace-scout-profile')
@@ -56,6 +58,14 @@ async def main():
         pages = context.pages
         page = pages[0] if pages else await context.new_page()
 
+        # Hide ads/sidebar as FB renders - future documents get the init script,
+        # the one already open gets it injected directly
+        await page.add_init_script(CLEANUP_INIT_SCRIPT)
+        try:
+            await page.evaluate(CLEANUP_INIT_SCRIPT)
+        except:
+            pass
+
         print("✅ Browser ready - navigate to Marketplace")
         print("👀 Starting watch loop...\n")
 
@@ -65,79 +75,23 @@ async def main():
             try:
                 url = page.url
 
-                # Main loop - runs every second
-
-                # 1. Remove ads
-                try:
-                    await page.evaluate('''
-                        () => {
-                            // Remove sponsored posts
-                            document.querySelectorAll('*').forEach(el => {
-                                if (el.textContent?.includes('Sponsored') && el.textContent.length < 100) {
-                                    let parent = el;
-                                    for (let i = 0; i < 8; i++) {
-                                        if (parent?.parentElement) {
-                                            parent = parent.parentElement;
-                                            const rect = parent.getBoundingClientRect();
-                                            if (rect.height > 200 && rect.height < 600) {
-                                                parent.style.display = 'none';
-                                                break;
-                                            }
-                                        }
-                                    }
-                                }
-                            });
-                        }
-                    ''')
-                except:
-                    pass
-
-                # 2. Hide sidebar
-                try:
-                    await page.evaluate('''
-                        () => {
-                            // Hide 360px wide divs (sidebar)
-                            document.querySelectorAll('div').forEach(el => {
-                                const w = getComputedStyle(el).width;
-                                if (w === '360px') {
-                                    el.style.display = 'none';
-                                }
-                            });
-                        }
-                    ''')
-                except:
-                    pass
-
-                # 3. If on listing page, show overlay
+                # Main loop - runs every second (ads/sidebar are handled in-page)
+                # If on listing page, show overlay
                 if '/marketplace/item/' in url:
                     if url != last_url:
                         print(f"\n📋 Listing: {url.split('/marketplace/item/')[1].split('/')[0]}")
                         last_url = url
 
+                        # Store details on first view (scraped once, then served from the DB)
+                        details = await enrich_listing_page(page)
+
                         # Get evaluation
                         ev = get_evaluation(url)
 
                         if ev and ev['evaluated']:
                             print(f"   Flip: {ev['flip']}/10, Weird: {ev['weird']}/10, Scam: {ev['scam']}/10")
 
-                            # Get description
-                            try:
-                                desc = await page.evaluate('''
-                                    () => {
-                                        let longest = '';
-                                        document.querySelectorAll('div, span').forEach(el => {
-                                            const txt = (el.textContent || '').trim();
-                                            if (txt.length > 100 && txt.length < 2000 && txt.length > longest.length) {
-                                                if (!txt.includes('Send seller') && !txt.includes('Save to')) {
-                                                    longest = txt;
-                                                }
-                                            }
-                                        });
-                                        return longest;
-                                    }
-                                ''')
-                            except:
-                                desc = ""
+                            desc = (details or {}).get('description') or ""
 
                             if desc:
                                 print(f"   📝 {desc[:80]}...")
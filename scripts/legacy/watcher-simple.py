@@ -6,6 +6,8 @@ import os
 from playwright.async_api import async_playwright
 from database import init_db, add_listing, get_listing_stats, DB_PATH
 import sqlite3
+from extractors import DESCRIPTION_EXTRACT_JS
+from page_cleanup import CLEANUP_INIT_SCRIPT
 
 USER_DATA_DIR = os.path.expanduser('~/.fb-marketplace-scout-profile')
 
@@ -55,6 +57,9 @@ async def main():
         pages = context.pages
         page = pages[0] if pages else await context.new_page()
 
+        # Hide sidebar/ads incrementally as FB renders
+        await page.add_init_script(CLEANUP_INIT_SCRIPT)
+
         print("✅ Browser launched!")
 
         # Navigate to marketplace
@@ -76,46 +81,8 @@ async def main():
                     print(f"\n📋 On listing: {current_url}")
                     last_url = current_url
 
-                    # Hide sidebar
-                    await page.evaluate('''
-                        () => {
-                            // Hide left sidebar
-                            document.querySelectorAll('div').forEach(el => {
-                                const style = window.getComputedStyle(el);
-                                if (style.width === '360px' || style.maxWidth === '360px') {
-                                    el.style.display = 'none';
-                                }
-                            });
-
-                            // Hide navigation
-                            const nav = document.querySelector('div[role="navigation"]');
-                            if (nav) nav.style.display = 'none';
-                        }
-                    ''')
-
                     # Get description
-                    description = await page.evaluate('''
-                        () => {
-                            // Get all text from page
-                            const allText = document.body.innerText;
-
-                            // Look for the description section
-                            // Usually the longest paragraph
-                            let longest = '';
-                            document.querySelectorAll('div, span, p').forEach(el => {
-                                const text = (el.textContent || '').trim();
-                                if (text.length > 100 && text.length < 2000 && text.length > longest.length) {
-                                    // Skip if it's navigation or buttons
-                                    if (!text.includes('Send seller a message') &&
-                                        !text.includes('Save to list')) {
-                                        longest = text;
-                                    }
-                                }
-                            });
-
-                            return longest;
-                        }
-                    ''')
+                    description = await page.evaluate(DESCRIPTION_EXTRACT_JS)
 
                     if description:
                         print(f"   📝 Description: {description[:100]}...")
@@ -2,17 +2,34 @@
 FB Marketplace DOM Watcher
 Connects to your existing browser session, watches for listings, extracts data
 """
+import argparse
 import asyncio
 import os
-from playwright.async_api import async_playwright
-from database import init_db, add_listing, get_listing_stats
+from database import init_db, upsert_listing, get_listing_stats
 import json
 import sqlite3
-from database import DB_PATH
+from database import DB_PATH, extract_item_id, normalize_listing_url, get_listing_details
+from comparables import observe_listing, price_against_comparables
+from near_duplicates import index_listing
+from sellers import observe_seller_listing
+from enrichment import DetailPrefetcher, enrich_listing_page
+from page_cleanup import CLEANUP_INIT_SCRIPT
+from seen_items import SeenItems, card_key
+from metrics import COUNT_BUCKETS, counter, gauge, histogram, start_dumper
+from rubric import current_rubric
+import profiler
 
 # User data directory for persistent Chrome profile
 USER_DATA_DIR = os.path.expanduser('~/.fb-marketplace-scout-profile')
 
+# Visit detail pages of new listings in a background tab (SCOUT_PREFETCH_DETAILS=1)
+PREFETCH_DETAILS = os.environ.get('SCOUT_PREFETCH_DETAILS') == '1'
+
+SCAN_SECONDS = histogram('scout_scan_seconds', 'Duration of one pass over the feed')
+NEW_PER_SCAN = histogram('scout_scan_new_listings', 'New listings saved per feed pass', buckets=COUNT_BUCKETS)
+WATCHER_ERRORS = counter('scout_watcher_errors_total', 'Exceptions in the watcher loop')
+PREFETCH_QUEUE_DEPTH = gauge('scout_prefetch_queue_depth', 'Listings waiting for background detail fetch')
+
 
 def get_listing_evaluation(listing_url):
     """
@@ -29,7 +46,8 @@ def get_listing_evaluation(listing_url):
         base_url = listing_url.split('?')[0]
 
         c.execute('''
-            SELECT evaluated, flip_score, weirdness_score, scam_likelihood, notes, title, price
+            SELECT evaluated, flip_score, weirdness_score, scam_likelihood, notes, title, price,
+                   rubric_version
             FROM listings
             WHERE listing_url LIKE ?
         ''', (f'{base_url}%',))
@@ -45,7 +63,8 @@ def get_listing_evaluation(listing_url):
                 'scam_likelihood': result[3] or 0,
                 'notes': result[4] or '',
                 'title': result[5] or '',
-                'price': result[6] or ''
+                'price': result[6] or '',
+                'rubric_version': result[7]
             }
         return None
     except Exception as e:
@@ -64,6 +83,9 @@ async def inject_overlay_if_listing_page(page):
 
         print(f"📋 On listing page: {url}")
 
+        # Store description/condition/photos on first view (DB hit afterwards)
+        details = await enrich_listing_page(page)
+
         # Get evaluation data
         evaluation = get_listing_evaluation(url)
 
@@ -113,53 +135,15 @@ async def inject_overlay_if_listing_page(page):
             ''')
             return
 
-        # Try to get listing description from the page
-        try:
-            description = await page.evaluate('''
-                () => {
-                    // Try to find the description text on the page
-                    // Look for the largest text block that's not a button or navigation
-                    let longestText = '';
-
-                    // Get all text-containing elements
-                    document.querySelectorAll('div, span, p').forEach(el => {
-                        const text = el.textContent?.trim() || '';
-                        const parent = el.parentElement;
-
-                        // Skip if it's a button, link, or navigation
-                        if (el.tagName === 'BUTTON' || el.tagName === 'A' ||
-                            parent?.tagName === 'BUTTON' || parent?.tagName === 'A' ||
-                            el.getAttribute('role') === 'button') {
-                            return;
-                        }
-
-                        // Skip if too short or too long
-                        if (text.length < 30 || text.length > 3000) {
-                            return;
-                        }
-
-                        // Skip if it contains mostly metadata (price, location, etc.)
-                        if (text.match(/\\$\\d+/) && text.length < 100) {
-                            return;
-                        }
-
-                        // This might be the description - keep the longest one
-                        if (text.length > longestText.length) {
-                            longestText = text;
-                        }
-                    });
-
-                    return longestText || null;
-                }
-            ''')
-        except:
-            description = None
+        description = details['description'] if details else None
 
         # Show evaluated overlay with scores
         flip_score = evaluation['flip_score']
         weirdness_score = evaluation['weirdness_score']
         scam_likelihood = evaluation['scam_likelihood']
         notes = evaluation['notes']
+        rubric = current_rubric()
+        stale = evaluation['rubric_version'] != rubric.version
 
         # Color coding
         flip_color = '#4caf50' if flip_score >= 7 else '#ff9800' if flip_score >= 4 else '#666'
@@ -226,7 +210,7 @@ async def inject_overlay_if_listing_page(page):
                 {f'<div style="border-top: 1px solid #3a3b3c; padding-top: 12px; margin-top: 12px; margin-bottom: 12px;"><div style="font-size: 12px; font-weight: bold; color: #b0b3b8; margin-bottom: 8px;">📝 Description</div><div style="font-size: 13px; color: #e4e6eb; line-height: 1.5; white-space: pre-wrap; max-height: 300px; overflow-y: auto; padding: 8px; background: #242526; border-radius: 4px;">{description[:1500]}</div></div>' if description and len(description) > 20 else ''}
 
                 <div style="font-size: 11px; color: #8a8d91; text-align: center; margin-top: 8px;">
-                    Seymour, CT • Friday pickups only
+                    {rubric.overlay_footer}{' • scored under an older rubric' if stale else ''}
                 </div>
             </div>
         '''
@@ -333,213 +317,278 @@ async def extract_listing_data(element):
         return None
 
 
-async def watch_marketplace(page):
+async def discover_cards(page, seen):
+    """
+    Extract the listing cards currently in the DOM that haven't been seen in
+    this exact state (a repriced card gets a new key). Each yielded card is
+    marked seen.
+
+    Args:
+        page: Playwright page showing a Marketplace feed
+        seen (SeenItems): item IDs already handled
+
+    Yields:
+        dict: raw listing data from extract_listing_data()
+    """
+    # Pull every card's href and text in one round trip
+    cards = await page.eval_on_selector_all(
+        'a[href*="/marketplace/item/"]',
+        'els => els.map(el => [el.getAttribute("href"), el.textContent])'
+    )
+    new_cards = []
+    for index, (href, text) in enumerate(cards):
+        item_id = extract_item_id(href)
+        if item_id:
+            key = card_key(item_id, text)
+            if key not in seen:
+                new_cards.append((index, item_id, key))
+
+    if not new_cards:
+        return
+
+    # Find all listing cards on the page
+    # Facebook uses various container classes, this is a general selector
+    listing_cards = await page.query_selector_all('a[href*="/marketplace/item/"]')
+
+    try:
+        for index, item_id, key in new_cards:
+            if index >= len(listing_cards) or key in seen:
+                continue
+
+            # Get parent container
+            parent = await listing_cards[index].evaluate_handle('el => el.closest("div[role=\'article\']") || el.parentElement')
+
+            listing_data = await extract_listing_data(parent)
+            await parent.dispose()
+
+            # Skip if the feed re-rendered between calls and this is a different card
+            if not listing_data or extract_item_id(listing_data['listing_url']) != item_id:
+                continue
+
+            seen.add(key)
+            yield listing_data
+    finally:
+        # Handles pin DOM nodes in the browser until disposed
+        for card in listing_cards:
+            await card.dispose()
+
+
+def normalize_listing(listing_data):
+    """Canonical URL, and blank fields as None (so they never count as changes), in place"""
+    listing_data['listing_url'] = normalize_listing_url(listing_data['listing_url'])
+    for field in ('title', 'price', 'seller_name', 'location'):
+        if listing_data.get(field) == '':
+            listing_data[field] = None
+    return listing_data
+
+
+def ingest_listing(listing_data):
+    """
+    Save a normalized card and update the comparables, seller and
+    near-duplicate indexes for new listings
+
+    Returns:
+        dict: upsert_listing() result plus 'matches' - near-duplicate
+            (listing_id, similarity) pairs found for a new listing
+    """
+    result = upsert_listing(listing_data)
+    result['matches'] = []
+    if result['created']:
+        observe_listing(result['listing_id'], listing_data['title'], listing_data['price'])
+        comparables = price_against_comparables(listing_data['title'], listing_data['price'], result['listing_id'])
+        observe_seller_listing(listing_data['seller_name'], comparables and comparables['price_ratio'])
+        details = get_listing_details(listing_data['listing_url'])
+        result['matches'] = index_listing(result['listing_id'], listing_data['title'],
+                                          details and details['description'])
+        if result['matches']:
+            print(f"🔁 Near-duplicate text: {listing_data['title']}")
+
+    for change in result['changes']:
+        if change['field'] == 'price':
+            observe_listing(result['listing_id'], listing_data['title'], change['new_value'])
+        if change['price_delta'] is not None and change['price_delta'] < 0:
+            print(f"📉 Price drop: {listing_data['title']} "
+                  f"{change['old_value']} → {change['new_value']}")
+        else:
+            print(f"✏️  {change['field'].capitalize()} changed: "
+                  f"{change['old_value']} → {change['new_value']}")
+
+    return result
+
+
+async def scan_feed(page, seen, prefetcher=None):
+    """
+    One pass over the listing cards currently in the DOM - extracts unseen
+    cards and saves them. Shared by the watcher and the headless crawler.
+
+    Args:
+        page: Playwright page showing a Marketplace feed
+        seen (SeenItems): item IDs already handled
+        prefetcher (DetailPrefetcher): optional - new listings are queued for
+            background detail-page enrichment
+
+    Returns:
+        list: listing dicts that were new to the database
+    """
+    saved = []
+
+    async for listing_data in discover_cards(page, seen):
+        # Save to database (or log what changed on a listing we already have)
+        result = ingest_listing(normalize_listing(listing_data))
+        if result['created']:
+            saved.append(listing_data)
+            if prefetcher:
+                prefetcher.submit(listing_data['listing_url'])
+
+    return saved
+
+
+async def watch_marketplace(page, prefetcher=None):
     """
     Main watcher loop - monitors DOM for new listing cards
+
+    Args:
+        page: Playwright page to watch
+        prefetcher (DetailPrefetcher): optional - new listings are queued for
+            background detail-page enrichment
     """
     print("👀 Watching for new listings...")
 
-    seen_urls = set()
+    seen = SeenItems()
     listing_count = 0
 
     while True:
         try:
-            # Find all listing cards on the page
-            # Facebook uses various container classes, this is a general selector
-            listing_cards = await page.query_selector_all('a[href*="/marketplace/item/"]')
-
-            for card in listing_cards:
-                # Get parent container
-                parent = await card.evaluate_handle('el => el.closest("div[role=\'article\']") || el.parentElement')
+            with SCAN_SECONDS.time():
+                new = await scan_feed(page, seen, prefetcher)
+            NEW_PER_SCAN.observe(len(new))
+            if prefetcher:
+                PREFETCH_QUEUE_DEPTH.set(prefetcher.queue.qsize())
 
-                listing_data = await extract_listing_data(parent)
-
-                if listing_data and listing_data['listing_url'] not in seen_urls:
-                    seen_urls.add(listing_data['listing_url'])
-
-                    # Save to database
-                    listing_id = add_listing(listing_data)
-                    if listing_id:
-                        listing_count += 1
-                        print(f"📦 [{listing_count}] {listing_data['title']} - {listing_data['price']}")
+            for listing_data in new:
+                listing_count += 1
+                print(f"📦 [{listing_count}] {listing_data['title']} - {listing_data['price']}")
 
             # Wait before next scan
             await asyncio.sleep(2)
 
         except Exception as e:
+            WATCHER_ERRORS.inc(error=e.__class__.__name__)
             print(f"⚠️  Watcher error: {e}")
             await asyncio.sleep(5)
 
 
+async def open_watcher_page(p):
+    """
+    Launch the logged-in browser profile with the overlay and page tweaks
+    installed, and point it at Marketplace
+
+    Returns:
+        tuple: (context, page)
+    """
+    # Launch persistent browser context
+    # This saves cookies/session between runs
+    context = await p.chromium.launch_persistent_context(
+        USER_DATA_DIR,
+        headless=False,
+        viewport={'width': 1920, 'height': 1080},
+        args=[
+            '--start-maximized',
+            '--disable-blink-features=AutomationControlled'
+        ]
+    )
+
+    # Get existing pages or create new one
+    pages = context.pages
+    if pages:
+        page = pages[0]
+    else:
+        page = await context.new_page()
+
+    print("\n✅ Browser launched!")
+    print("📝 If this is your first time, log into Facebook")
+    print("🛍️  Navigate to: https://www.facebook.com/marketplace")
+    print("📜 Scroll through listings - I'll watch and save them!")
+    print("⌨️  Press Ctrl+C to stop\n")
+
+    # Monitor for listing page navigation and inject overlay
+    async def on_page_load():
+        await inject_overlay_if_listing_page(page)
+
+    page.on('load', lambda: asyncio.create_task(on_page_load()))
+
+    # Hide ads/sidebar incrementally as FB renders (MutationObserver, no timers)
+    await page.add_init_script(CLEANUP_INIT_SCRIPT)
+
+    # Make image clicks open the listing page on every page
+    await page.add_init_script("""
+        // Make image clicks navigate to listing page instead of showing lightbox
+        document.addEventListener('click', function(e) {
+            // Find if we clicked on a listing image
+            let target = e.target;
+            let attempts = 0;
+            while (target && attempts < 10) {
+                // Check if this is an image in a marketplace listing
+                if (target.tagName === 'IMG' || target.tagName === 'A') {
+                    // Find the listing URL
+                    let parent = target;
+                    for (let i = 0; i < 15; i++) {
+                        if (parent) {
+                            let link = parent.querySelector('a[href*="/marketplace/item/"]');
+                            if (link) {
+                                // Found listing link - navigate to it instead
+                                let url = link.href;
+                                if (url && url.includes('/marketplace/item/')) {
+                                    e.preventDefault();
+                                    e.stopPropagation();
+                                    window.location.href = url;
+                                    console.log('🔗 Navigating to listing:', url);
+                                    return;
+                                }
+                            }
+                            parent = parent.parentElement;
+                        }
+                    }
+                }
+                target = target.parentElement;
+                attempts++;
+            }
+        }, true);
+    """)
+
+    # Navigate to marketplace
+    try:
+        await page.goto('https://www.facebook.com/marketplace', timeout=10000)
+    except:
+        print("⚠️  Couldn't auto-navigate, please navigate to Marketplace manually")
+
+    return context, page
+
+
 async def main():
     """Launch browser and start watching"""
+    from playwright.async_api import async_playwright
 
     # Initialize database
     print("🗄️  Initializing database...")
     init_db()
+    start_dumper('watcher')
 
     print("\n🚀 Starting FB Marketplace Scout...")
     print(f"📁 Browser profile: {USER_DATA_DIR}")
 
     async with async_playwright() as p:
-        # Launch persistent browser context
-        # This saves cookies/session between runs
-        context = await p.chromium.launch_persistent_context(
-            USER_DATA_DIR,
-            headless=False,
-            viewport={'width': 1920, 'height': 1080},
-            args=[
-                '--start-maximized',
-                '--disable-blink-features=AutomationControlled'
-            ]
-        )
-
-        # Get existing pages or create new one
-        pages = context.pages
-        if pages:
-            page = pages[0]
-        else:
-            page = await context.new_page()
-
-        print("\n✅ Browser launched!")
-        print("📝 If this is your first time, log into Facebook")
-        print("🛍️  Navigate to: https://www.facebook.com/marketplace")
-        print("📜 Scroll through listings - I'll watch and save them!")
-        print("⌨️  Press Ctrl+C to stop\n")
-
-        # Monitor for listing page navigation and inject overlay
-        async def on_page_load():
-            await inject_overlay_if_listing_page(page)
-
-        page.on('load', lambda: asyncio.create_task(on_page_load()))
-
-        # Inject ad-removal code on every page
-        await page.add_init_script("""
-            // Hide Facebook sidebar to give more screen space
-            function hideSidebar() {
-                // Hide left navigation sidebar
-                const leftNav = document.querySelector('div[role="navigation"]');
-                if (leftNav) {
-                    leftNav.style.display = 'none';
-                }
-
-                // Hide the entire left column container
-                const leftColumn = document.querySelector('#mount_0_0_nC > div > div:nth-child(1) > div > div.x9f619.x1n2onr6.x1ja2u2z > div > div > div.x78zum5.xdt5ytf.x1t2pt76.x1n2onr6.x1ja2u2z.x10cihs4 > div.x9f619.x2lah0s.x1nhvcw1.x1qjc9v5.xozqiw3.x1q0g3np.x78zum5.x1iyjqo2.x1t2pt76.x1n2onr6.x1ja2u2z > div.x9f619.x1n2onr6.x78zum5.xdt5ytf.x193iq5w.xeuugli.x2lah0s.x1t2pt76.x1xzczws.x1cvmir6.x1vjfegm.x1daaz14 > div');
-                if (leftColumn) {
-                    leftColumn.style.display = 'none';
-                }
-
-                // Also try to hide by more generic selectors
-                document.querySelectorAll('div[style*="width"]').forEach(el => {
-                    const style = window.getComputedStyle(el);
-                    if (style.width === '360px' || style.maxWidth === '360px') {
-                        // This is likely a sidebar
-                        el.style.display = 'none';
-                    }
-                });
+        context, page = await open_watcher_page(p)
 
-                // Maximize main content area
-                const mainContent = document.querySelector('div[role="main"]');
-                if (mainContent) {
-                    mainContent.style.maxWidth = '100%';
-                    mainContent.style.width = '100%';
-                }
-            }
-
-            // Run sidebar hiding
-            hideSidebar();
-            setInterval(hideSidebar, 2000);
-
-            // Make image clicks navigate to listing page instead of showing lightbox
-            document.addEventListener('click', function(e) {
-                // Find if we clicked on a listing image
-                let target = e.target;
-                let attempts = 0;
-                while (target && attempts < 10) {
-                    // Check if this is an image in a marketplace listing
-                    if (target.tagName === 'IMG' || target.tagName === 'A') {
-                        // Find the listing URL
-                        let parent = target;
-                        for (let i = 0; i < 15; i++) {
-                            if (parent) {
-                                let link = parent.querySelector('a[href*="/marketplace/item/"]');
-                                if (link) {
-                                    // Found listing link - navigate to it instead
-                                    let url = link.href;
-                                    if (url && url.includes('/marketplace/item/')) {
-                                        e.preventDefault();
-                                        e.stopPropagation();
-                                        window.location.href = url;
-                                        console.log('🔗 Navigating to listing:', url);
-                                        return;
-                                    }
-                                }
-                                parent = parent.parentElement;
-                            }
-                        }
-                    }
-                    target = target.parentElement;
-                    attempts++;
-                }
-            }, true);
-
-            // Remove Facebook Marketplace ads (like fb-marketplace-clean)
-            function removeAds() {
-                // Remove "Sponsored" elements
-                document.querySelectorAll('*').forEach(el => {
-                    if (el.textContent.includes('Sponsored') &&
-                        el.textContent.length < 100 &&
-                        el.textContent.length > 0) {
-                        let parent = el;
-                        for (let i = 0; i < 10; i++) {
-                            if (parent.parentElement) {
-                                parent = parent.parentElement;
-                                const rect = parent.getBoundingClientRect();
-                                if (rect.height > 200 && rect.height < 600) {
-                                    parent.style.display = 'none';
-                                    break;
-                                }
-                            }
-                        }
-                    }
-                });
-
-                // Remove ad links
-                document.querySelectorAll('a[href*="/ads/"]').forEach(el => {
-                    let parent = el;
-                    for (let i = 0; i < 10; i++) {
-                        if (parent.parentElement) {
-                            parent = parent.parentElement;
-                            const rect = parent.getBoundingClientRect();
-                            if (rect.height > 200 && rect.height < 600) {
-                                parent.style.display = 'none';
-                                break;
-                            }
-                        }
-                    }
-                });
-            }
-
-            // Run immediately and continuously
-            if (document.readyState === 'loading') {
-                document.addEventListener('DOMContentLoaded', removeAds);
-            } else {
-                removeAds();
-            }
-            setInterval(removeAds, 2000);
-
-            console.log('🚀 FB Marketplace Scout: Ad removal active');
-        """)
-
-        # Navigate to marketplace
-        try:
-            await page.goto('https://www.facebook.com/marketplace', timeout=10000)
-        except:
-            print("⚠️  Couldn't auto-navigate, please navigate to Marketplace manually")
+        prefetcher = None
+        if PREFETCH_DETAILS:
+            prefetcher = DetailPrefetcher(context)
+            prefetcher.start()
+            print("🗂️  Background detail prefetch enabled")
 
         # Start watching
         try:
-            await watch_marketplace(page)
+            await watch_marketplace(page, prefetcher)
         except KeyboardInterrupt:
             print("\n\n👋 Shutting down...")
             stats = get_listing_stats()
@@ -549,4 +598,7 @@ async def main():
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Watch FB Marketplace for new listings')
+    profiler.add_arguments(parser)
+    profiler.install_from_args('watcher', parser.parse_args())
     asyncio.run(main())